@@ -2,16 +2,41 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
+from openpyxl.utils import get_column_letter, column_index_from_string, coordinate_to_tuple
 import os
 from datetime import datetime, timedelta
 import warnings
 import io
 import tempfile
-import zipfile
+import weakref
 import plotly.express as px
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from dat_reader import (
+    expand_uploads, last_timestamp, logger_table_key, normalize_channels, parse_files, peek_metadata,
+    read_data_chunks, record_numbers, station_name, statistic_channels
+)
+from conflicts import (
+    CONFLICT_POLICIES, DEFAULT_POLICY, PAGE_SIZE as CONFLICTS_PAGE_SIZE,
+    ConflictTable, resolve_duplicates
+)
+from daily_statistics import count_outliers, day_extremes, extreme_variables
+from export import (EXPORT_FORMATS, export_daily_statistics, export_hourly_snapshots, export_measurements,
+                    spooled_export)
+from history_store import ATTRIBUTE_COLUMNS, get_history_store
+from parse_cache import get_parse_cache
+from provenance import SourceIndex, row_sources
+from resample import detect_interval, format_interval, native_rows
+from sheet_templates import (
+    AUTO_DAILY_TEMPLATE, DAILY_SHEET_TEMPLATES, DEFAULT_DAILY_TEMPLATE, UNKNOWN_DAILY_TEMPLATE, DailyWritePlan,
+    check_daily_template, detect_daily_template
+)
+from snapping import DEFAULT_SNAPPING_POLICY, DEFAULT_TOLERANCE, SNAPPING_POLICIES
+from snapshots import DEFAULT_STEP
+import session_memory
+import shared_datasets
+from timeseries_store import TimeSeriesStore
 warnings.filterwarnings('ignore')
 
 # Configuração da página
@@ -227,12 +252,15 @@ st.markdown("""
 class ExactWeatherProcessor:
     """
     Processador de dados meteorológicos com busca EXATA
-    NÃO faz médias ou inferências - apenas busca dados pontuais com tolerância de ±10 minutos
+    Sem inferências - busca dados pontuais com tolerância (padrão ±10 minutos). Os dados são os
+    registrados para loggers de 10 ou 15 minutos; arquivos de 1 ou 5 minutos viram médias de 10 minutos
     """
     def __init__(self):
-        self.consolidated_data = {}  # {timestamp: {variavel: valor}}
+        self.files_ingested = 0
+        # Nome do arquivo de cada ordem global de ingestão (origem dos valores consolidados)
+        self.source_files = SourceIndex()
         self.processed_sheets = []
-        self.conflicts_detected = []
+        self.conflicts_detected = ConflictTable([])
         self.excel_path = None
         
         # Mapeamento de colunas para análise diária
@@ -245,7 +273,8 @@ class ExactWeatherProcessor:
             'Velocidade_Vento': {'start_num': 157}  # FA até GE (157-187)
         }
 
-        # Mapeamento de colunas para análise mensal
+        # Mapeamento de colunas para análise mensal (Min, Max, Avg e Outliers a partir de start_col;
+        # 'std_col' opcional: coluna do desvio padrão, ver _monthly_std_column)
         self.monthly_column_mapping = {
             'Temperatura': {'start_col': 'B', 'rows': (3, 33)},      # B3:E33
             'Piranometro_1': {'start_col': 'H', 'rows': (3, 33)},   # H3:K33  
@@ -271,161 +300,684 @@ class ExactWeatherProcessor:
             'LoggTemp_Avg': 'LogTemp'
         }
 
-    def process_dat_files(self, dat_files):
-        """Processa múltiplos arquivos .dat consolidando por TIMESTAMP exato"""
+        # Escala (divisor) e casas decimais de cada canal .dat → variável consolidada
+        self.variable_scaling = {
+            'Temp_Avg': ('Temperatura', 1, 2),
+            'Pir1_Avg': ('Piranometro_1', 1000, 3),
+            'Pir2_Avg': ('Piranometro_2', 1000, 3),
+            'PirALB_Avg': ('Piranometro_Alab', 1000, 3),
+            'RH_Avg': ('Umidade_Relativa', 1, 2),
+            'Ane_Avg': ('Velocidade_Vento', 1, 2),
+            'Batt_Avg': ('Bateria', 1, 2),
+            'LitBatt_Avg': ('LitBatt', 1, 2),
+            'LoggTemp_Avg': ('LogTemp', 1, 2)
+        }
+
+        # Alinhamento da grade horária das abas diárias: política (snapping.SNAPPING_POLICIES) e
+        # tolerância por variável em minutos (ausentes: 10 minutos)
+        self.snapping_policy = DEFAULT_SNAPPING_POLICY
+        self.snapping_tolerances = {}
+        # Resultado do alinhamento na última atualização do Excel (DataFrame por variável)
+        self.snapping_report = None
+        # Grade das abas diárias (sheet_templates.DAILY_SHEET_TEMPLATES, ou reconhecida pela coluna A)
+        # e modelo usado em cada aba na última atualização do Excel
+        self.daily_template = AUTO_DAILY_TEMPLATE
+        self.daily_sheet_templates = {}
+        # Avisos da última atualização sobre a grade das abas diárias (abas puladas ou não conferidas)
+        self.daily_template_warnings = []
+        # Última atualização com extremos reais, e coluna do desvio de cada variável por aba mensal
+        self.true_extremes = False
+        self.monthly_std_columns = {}
+        # Planos de gravação das abas diárias: {(modelo, variáveis): DailyWritePlan}
+        self._daily_write_plans = {}
+
+        # Séries consolidadas por estação (nome da linha 1 do cabeçalho TOA5/TOB)
+        # Cada série: índice ordenado + um array float64 por variável (NaN = ausente)
+        self.station_stores = {}
+        self.station = None
+        # Série da estação selecionada (usada pelo Excel, preview e dashboard)
+        self.consolidated_data = self._new_store()
+        self.evicted = False
+
+        # Dados compartilhados com outras sessões (chave em shared_datasets) ou None
+        self.shared_key = None
+        self._shared_finalizer = None
+
+        # Histórico local persistente (HistoryStore ou None) e meses dele já carregados na sessão
+        # {(estação, ano, mês)}
+        self.history = None
+        self._history_months_loaded = set()
+        # Linhas do histórico incorporadas à série da sessão: {(estação, ano, mês): linhas}
+        self.history_rows_merged = {}
+
+        # Marca incremental por logger/tabela: {(estação, logger, série, tabela): (último RECORD, último TIMESTAMP)}
+        self.ingest_watermarks = {}
+
+        # Orçamento de memória para leitura: arquivos maiores são lidos em blocos
+        self.ingest_budget_bytes = int(float(os.environ.get('MEDICOES_INGEST_BUDGET_MB', 256)) * 1024 * 1024)
+        
+        # Estações do último conjunto de uploads: (chave dos uploads, estações)
+        self._upload_stations = None
+
+    def _new_store(self):
+        """Série consolidada vazia, despejada em disco acima do orçamento da sessão"""
+        return TimeSeriesStore(
+            (name for name, _, _ in self.variable_scaling.values()),
+            memory_budget=session_memory.session_budget_bytes(),
+            spill_dir=session_memory.spill_dir(),
+            statistics=(name for name, _, _ in statistic_channels(self.variable_scaling).values()),
+            decimals={name: decimals for name, _, decimals in self.variable_scaling.values()}
+        )
+
+    def select_station(self, station):
+        """Seleciona (criando se preciso) a série consolidada de uma estação"""
+        if station not in self.station_stores:
+            self.station_stores[station] = self._new_store()
+        self.station = station
+        self.consolidated_data = self.station_stores[station]
+
+    def stations(self):
+        """Estações com dados consolidados, em ordem alfabética"""
+        return sorted(station for station, store in self.station_stores.items() if len(store) > 0)
+
+    def stations_in_uploads(self, dat_files):
+        """
+        Estações dos arquivos enviados, lendo só o cabeçalho de cada um
+        
+        Chamado a cada rerun do Streamlit: o resultado fica guardado para o mesmo conjunto de
+        uploads, sem reabrir os .zip/.gz.
+        """
+        key = tuple((getattr(f, 'file_id', None), f.name, f.size) for f in dat_files)
+        if self._upload_stations is not None and self._upload_stations[0] == key:
+            return list(self._upload_stations[1])
+        
+        stations = set()
+        members, _ = expand_uploads(dat_files)
+        for member in members:
+            try:
+                with member.reading() as stream:
+                    stations.add(station_name(peek_metadata(stream)))
+            except Exception:
+                continue
+        self._upload_stations = (key, sorted(stations))
+        return sorted(stations)
+
+    def _history_signature(self):
+        """Estado do histórico local (parte da chave dos dados compartilhados)"""
+        return self.history.signature() if self.history is not None else None
+
+    def _use_shared(self, key, dataset):
+        """Passa a usar os dados compartilhados de um lote (mesmos objetos, sem cópia)"""
+        self._release_shared()
+        self.shared_key = key
+        # A referência é devolvida também quando a sessão é descartada sem liberar os dados
+        self._shared_finalizer = weakref.finalize(self, shared_datasets.release, key)
+        
+        self.station_stores = dict(dataset['stores'])
+        self.conflicts_detected = dataset['conflicts']
+        self.file_processing_info = list(dataset['files'])
+        self.ingest_watermarks = dict(dataset['watermarks'])
+        self.files_ingested = max(self.files_ingested, dataset['files_ingested'])
+        self.source_files.update(dataset['sources'])
+        self._history_months_loaded = set(dataset['history_months'])
+        self.history_rows_merged = dict(dataset['history_merged'])
+        
+        stations = self.stations()
+        if stations:
+            self.select_station(self.station if self.station in stations else stations[0])
+
+    def _release_shared(self):
+        """Devolve a referência aos dados compartilhados"""
+        if self._shared_finalizer is not None:
+            self._shared_finalizer()
+        self.shared_key = None
+        self._shared_finalizer = None
+
+    def _detach_shared(self):
+        """Troca as séries compartilhadas (somente leitura) por cópias próprias"""
+        if self.shared_key is None:
+            return
+        self.station_stores = {
+            station: store.copy() if store.frozen else store
+            for station, store in self.station_stores.items()
+        }
+        if self.station in self.station_stores:
+            self.consolidated_data = self.station_stores[self.station]
+        self._release_shared()
+
+    def _station_history(self):
+        """Histórico da estação selecionada"""
+        return self.history.station(self.station)
+
+    def memory_usage(self):
+        """
+        Bytes da sessão em memória e despejados em disco (séries das estações + conflitos)
+        
+        Séries e conflitos compartilhados são contados no cache compartilhado, não na sessão.
+        """
+        memory = 0 if self.shared_key is not None else self.conflicts_detected.nbytes()
+        disk = 0
+        for store in self.station_stores.values():
+            if store.frozen:
+                continue
+            if store.spilled:
+                disk += store.nbytes()
+            else:
+                memory += store.nbytes()
+        return {'memoria': memory, 'disco': disk}
+
+    def spill_to_disk(self):
+        """Move as séries consolidadas para arquivos mapeados em disco"""
+        for store in self.station_stores.values():
+            store.spill()
+
+    def release_memory(self):
+        """Libera os dados da sessão (sessão ociosa removida por falta de memória)"""
+        self._release_shared()
+        self.station_stores = {}
+        self.station = None
+        self.consolidated_data = self._new_store()
+        self.conflicts_detected = ConflictTable([])
+        self.source_files = SourceIndex()
+        self.file_processing_info = []
+        self._history_months_loaded = set()
+        self.history_rows_merged = {}
+        if self.excel_path and os.path.exists(self.excel_path):
+            os.remove(self.excel_path)
+        self.excel_path = None
+        self.evicted = True
+
+    def process_dat_files(self, dat_files, incremental=False, policy=DEFAULT_POLICY):
+        """
+        Processa múltiplos arquivos .dat consolidando por TIMESTAMP exato
+        
+        Timestamps repetidos são resolvidos pela política de conflitos escolhida
+        (ver conflicts.CONFLICT_POLICIES; padrão: último arquivo prevalece).
+        Com incremental=True, cada arquivo é lido apenas a partir do último RECORD já ingerido
+        do mesmo logger e tabela (o prefixo já visto é pulado sem passar pelo parser). Com o
+        histórico local ativo, valem também as marcas gravadas nele por sessões anteriores;
+        sem histórico, o modo incremental vale só dentro da sessão.
+        
+        Cada estação (linha 1 do cabeçalho) tem sua própria série: arquivos de estações
+        diferentes nunca conflitam entre si. A leitura de todos os arquivos, de todas as
+        estações, é feita em paralelo no pool de processos.
+        
+        Em uma sessão vazia, um lote idêntico já consolidado por outra sessão é reaproveitado
+        do cache compartilhado (shared_datasets), sem reprocessar nem copiar.
+        """
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        total_files = len(dat_files)
-        self.file_processing_info = []
-        self.conflicts_detected = []
+        # Arquivos .zip/.gz são abertos em memória: cada .dat interno vira um membro
+        members, archive_errors = expand_uploads(dat_files)
+        
+        # Marcas gravadas no histórico por sessões anteriores (os registros já estão no histórico)
+        if incremental and self.history is not None:
+            self._load_history_watermarks()
+        
+        # Sessão vazia: o mesmo lote pode já estar consolidado por outra sessão
+        batch_digest = None
+        if not self.stations() and not self.ingest_watermarks and not archive_errors:
+            status_text.text("Verificando dados compartilhados...")
+            batch_digest = shared_datasets.batch_digest(members, policy, self.variable_scaling)
+            shared_key = shared_datasets.dataset_key(batch_digest, self._history_signature())
+            dataset = shared_datasets.acquire(shared_key)
+            if dataset is not None:
+                self._use_shared(shared_key, dataset)
+                progress_bar.progress(1.0)
+                status_text.text("Lote já consolidado em outra sessão - usando os dados compartilhados")
+                self._show_file_processing_summary()
+                return len(self.consolidated_data) > 0
+        
+        # Séries compartilhadas não são alteradas: a sessão passa a ter cópias próprias
+        self._detach_shared()
         
-        # ETAPA 1: Ler todos os arquivos e consolidar
-        for i, uploaded_file in enumerate(dat_files):
-            status_text.text(f"Processando {i+1}/{total_files}: {uploaded_file.name}")
-            try:
-                uploaded_file.seek(0)
-                data = pd.read_csv(uploaded_file, skiprows=4, parse_dates=[0])
-                data.columns = [
-                    'TIMESTAMP', 'RECORD',
-                    'Ane_Min', 'Ane_Max', 'Ane_Avg', 'Ane_Std',
-                    'Temp_Min', 'Temp_Max', 'Temp_Avg', 'Temp_Std',
-                    'RH_Min', 'RH_Max', 'RH_Avg', 'RH_Std',
-                    'Pir1_Min', 'Pir1_Max', 'Pir1_Avg', 'Pir1_Std',
-                    'Pir2_Min', 'Pir2_Max', 'Pir2_Avg', 'Pir2_Std',
-                    'PirALB_Min', 'PirALB_Max', 'PirALB_Avg', 'PirALB_Std',
-                    'Batt_Min', 'Batt_Max', 'Batt_Avg', 'Batt_Std',
-                    'LoggTemp_Min', 'LoggTemp_Max', 'LoggTemp_Avg', 'LoggTemp_Std',
-                    'LitBatt_Min', 'LitBatt_Max', 'LitBatt_Avg', 'LitBatt_Std'
-                ]
-                
-                # Consolidar dados timestamp por timestamp
-                for _, row in data.iterrows():
-                    timestamp = row['TIMESTAMP']
-                                 
-                    # Extrair dados das variáveis (incluindo novas para análise mensal)
-                    new_data = {
-                        'Temperatura': round(row['Temp_Avg'], 2) if not pd.isna(row['Temp_Avg']) else None,
-                        'Piranometro_1': round(row['Pir1_Avg'] / 1000, 3) if not pd.isna(row['Pir1_Avg']) else None,
-                        'Piranometro_2': round(row['Pir2_Avg'] / 1000, 3) if not pd.isna(row['Pir2_Avg']) else None,
-                        'Piranometro_Alab': round(row['PirALB_Avg'] / 1000, 3) if not pd.isna(row['PirALB_Avg']) else None,
-                        'Umidade_Relativa': round(row['RH_Avg'], 2) if not pd.isna(row['RH_Avg']) else None,
-                        'Velocidade_Vento': round(row['Ane_Avg'], 2) if not pd.isna(row['Ane_Avg']) else None,
-                        # Novas variáveis para análise mensal
-                        'Bateria': round(row['Batt_Avg'], 2) if not pd.isna(row['Batt_Avg']) else None,
-                        'LitBatt': round(row['LitBatt_Avg'], 2) if not pd.isna(row['LitBatt_Avg']) else None,
-                        'LogTemp': round(row['LoggTemp_Avg'], 2) if not pd.isna(row['LoggTemp_Avg']) else None
-                    }
-                    
-                    # Verificar se já existe dados para este timestamp
-                    if timestamp in self.consolidated_data:
-                        # CONFLITO DETECTADO!
-                        conflict_info = {
-                            'timestamp': timestamp,
-                            'arquivo_anterior': 'dados_anteriores',
-                            'arquivo_atual': uploaded_file.name,
-                            'dados_anteriores': self.consolidated_data[timestamp].copy(),
-                            'dados_novos': new_data.copy()
-                        }
-                        self.conflicts_detected.append(conflict_info)
-                        
-                        # Usar último arquivo (sobrescrever)
-                        self.consolidated_data[timestamp] = new_data
-                    else:
-                        # Novo timestamp, adicionar
-                        self.consolidated_data[timestamp] = new_data
-                
-                # Info do arquivo processado
-                self.file_processing_info.append({
-                    'arquivo': uploaded_file.name,
-                    'registros': len(data),
-                    'periodo_inicio': data['TIMESTAMP'].min().strftime('%Y-%m-%d %H:%M'),
-                    'periodo_fim': data['TIMESTAMP'].max().strftime('%Y-%m-%d %H:%M'),
-                    'status': 'Processado com sucesso'
-                })
-                
-            except Exception as e:
-                self.file_processing_info.append({
-                    'arquivo': uploaded_file.name,
-                    'registros': 0,
-                    'periodo_inicio': 'N/A',
-                    'periodo_fim': 'N/A',
-                    'status': f'Erro: {str(e)}'
-                })
-            
-            progress_bar.progress((i + 1) / total_files)
+        self.file_processing_info = []
+        self.conflicts_detected = ConflictTable((name for name, _, _ in self.variable_scaling.values()), policy)
+        # Origem dos conflitos: linhas já consolidadas passam a contar como "dados anteriores"
+        for store in self.station_stores.values():
+            store.reset_sources()
+        selected_station = self.station
+        if self.history is not None:
+            self.files_ingested = max(self.files_ingested, self.history.next_sequence())
+        self._sequence_base = self.files_ingested
+        
+        for name, message in archive_errors:
+            self._add_file_info(name, 0, None, None, f"Erro: {message}")
+        
+        # ETAPA 1: Ler e normalizar os arquivos em paralelo (pool de processos), em lotes cujo
+        # tamanho somado cabe no orçamento de memória; cada lote é consolidado, na ordem de
+        # upload, antes de o próximo ser lido. Arquivos maiores que o orçamento são lidos em blocos.
+        watermarks = [self._watermark_for(member) if incremental else None for member in members]
+        batch = []
+        batch_bytes = 0
+        parsed = 0
+        
+        def report_progress(done, total, name):
+            status_text.text(f"Processando {parsed + done}/{len(members)}: {name}")
+            progress_bar.progress((parsed + done) / len(members))
+        
+        def flush():
+            nonlocal batch, batch_bytes, parsed
+            self._consolidate_batch(batch, report_progress)
+            parsed += len(batch)
+            batch, batch_bytes = [], 0
+        
+        for i, member in enumerate(members):
+            if member.size > self.ingest_budget_bytes:
+                flush()
+                self._consolidate_streaming(member, status_text, watermarks[i])
+                parsed += 1
+                continue
+            if batch and batch_bytes + member.size > self.ingest_budget_bytes:
+                flush()
+            batch.append((member, watermarks[i]))
+            batch_bytes += member.size
+        flush()
+        
+        if self.history is not None:
+            status_text.text("Gravando histórico local...")
+            self._save_history()
+        
+        # Grade horária de cada mês calculada uma vez, já com a série completa
+        status_text.text("Montando grade horária...")
+        for store in self.station_stores.values():
+            for year, month, _, _ in store.month_slices():
+                self._snapshot_cube(store, year, month)
+        
+        # Mantém a estação que já estava selecionada; senão, a primeira com dados
+        stations = self.stations()
+        if stations:
+            self.select_station(selected_station if selected_station in stations else stations[0])
+        
+        # Lote processado a partir de uma sessão vazia: disponível para as outras sessões
+        if batch_digest is not None and stations:
+            shared_key = shared_datasets.dataset_key(batch_digest, self._history_signature())
+            self._use_shared(shared_key, shared_datasets.publish(shared_key, {
+                'stores': dict(self.station_stores),
+                'conflicts': self.conflicts_detected,
+                'files': list(self.file_processing_info),
+                'watermarks': dict(self.ingest_watermarks),
+                'files_ingested': self.files_ingested,
+                'sources': self.source_files.copy(),
+                'history_months': set(self._history_months_loaded),
+                'history_merged': dict(self.history_rows_merged)
+            }))
         
         status_text.text("Consolidação concluída com sucesso!")
         
-        # Mostrar conflitos se detectados
-        if self.conflicts_detected:
-            self._show_conflicts()
-        
         # Mostrar resumo do processamento
         self._show_file_processing_summary()
         
         return len(self.consolidated_data) > 0
 
-    def _show_conflicts(self):
-        """Mostra conflitos detectados entre arquivos"""
+    def _consolidate_batch(self, batch, report_progress):
+        """
+        Lê em paralelo e consolida, na ordem de upload, um lote de arquivos
+        
+        batch: lista de (DataMember, marca incremental ou None), com tamanho somado dentro
+        de ingest_budget_bytes - só os bytes deste lote ficam em memória ao mesmo tempo.
+        """
+        if not batch:
+            return
+        
+        named_contents = [(member.name, *member.payload(), after) for member, after in batch]
+        results = parse_files(
+            named_contents,
+            self.variable_scaling,
+            on_progress=report_progress,
+            cache=get_parse_cache()
+        )
+        del named_contents
+        
+        # ETAPA 2: Consolidar na ordem de upload, resolvendo repetições pela política
+        for result in results:
+            if result['erro'] is not None:
+                self._add_file_info(result['arquivo'], 0, None, None, f"Erro: {result['erro']}")
+                continue
+            
+            timestamps = pd.DatetimeIndex(result['timestamps'])
+            if len(timestamps) == 0:
+                self._add_file_info(result['arquivo'], 0, None, None, 'Sem registros novos')
+                continue
+            
+            self.select_station(station_name(result['metadata']))
+            file_id = self._register_file(result['arquivo'])
+            interval = detect_interval(timestamps)
+            self._consolidate_file_data(timestamps, result['variables'], file_id,
+                                        result['records'], timestamps.max(), interval)
+            self._update_watermark(result['metadata'], result['records'], timestamps)
+            self._add_file_info(result['arquivo'], len(timestamps), timestamps.min(), timestamps.max(),
+                                'Processado com sucesso', interval, self.station)
+
+    def _watermark_for(self, member):
+        """Marca incremental do logger/tabela do arquivo (None se ainda não ingerido)"""
+        try:
+            with member.reading() as stream:
+                return self.ingest_watermarks.get(logger_table_key(peek_metadata(stream)))
+        except Exception:
+            return None
+
+    def _load_history_watermarks(self):
+        """Une às marcas da sessão as marcas incrementais gravadas no histórico local"""
+        for key, (last_record, last_time) in self.history.watermarks().items():
+            previous = self.ingest_watermarks.get(key)
+            if previous is not None:
+                last_record = max(last_record, previous[0])
+                last_time = max(last_time, previous[1])
+            self.ingest_watermarks[key] = (last_record, last_time)
+
+    def _update_watermark(self, metadata, records, timestamps):
+        """Avança a marca incremental com o maior RECORD e o maior TIMESTAMP ingeridos"""
+        if metadata is None or len(timestamps) == 0:
+            return
+        
+        key = logger_table_key(metadata)
+        last_record = int(np.max(records))
+        last_time = np.datetime64(np.max(np.asarray(timestamps, dtype='datetime64[ns]')), 'ns')
+        
+        previous = self.ingest_watermarks.get(key)
+        if previous is not None:
+            last_record = max(last_record, previous[0])
+            last_time = max(last_time, previous[1])
+        self.ingest_watermarks[key] = (last_record, last_time)
+
+    def _register_file(self, file_name):
+        """Registra um arquivo de origem: id na tabela de conflitos e ordem global de ingestão"""
+        self.files_ingested += 1
+        file_id = self.conflicts_detected.add_file(file_name)
+        self.source_files.add(self._sequence_base + file_id, file_name, self.station)
+        return file_id
+
+    def _consolidate_streaming(self, member, status_text, after=None):
+        """
+        Consolida um arquivo grande em blocos de tamanho fixo
+        
+        Cada bloco é lido, normalizado e incorporado aos dados consolidados antes do próximo,
+        então a memória de leitura fica limitada por ingest_budget_bytes.
+        """
+        records = 0
+        period_start = None
+        period_end = None
+        interval = None
+        
+        try:
+            with member.reading() as stream:
+                self.select_station(station_name(peek_metadata(stream)))
+            file_id = self._register_file(member.name)
+            
+            # Política "arquivo mais recente" compara pelo último TIMESTAMP do arquivo inteiro
+            file_end = None
+            if CONFLICT_POLICIES[self.conflicts_detected.policy].needs_file_end:
+                with member.reading() as stream:
+                    file_end = last_timestamp(stream, self.ingest_budget_bytes)
+            
+            with member.reading() as stream:
+                chunks = read_data_chunks(stream, self.ingest_budget_bytes, after)
+                for chunk_num, (data, metadata, schema) in enumerate(chunks, start=1):
+                    status_text.text(f"Consolidando {member.name} (bloco {chunk_num})...")
+                    
+                    timestamps = pd.DatetimeIndex(data['TIMESTAMP'])
+                    records_read = record_numbers(data)
+                    variables = normalize_channels(data, self.variable_scaling)
+                    del data
+                    
+                    records += len(timestamps)
+                    if interval is None:
+                        interval = detect_interval(timestamps)
+                    if len(timestamps) > 0:
+                        chunk_start, chunk_end = timestamps.min(), timestamps.max()
+                        period_start = chunk_start if period_start is None else min(period_start, chunk_start)
+                        period_end = chunk_end if period_end is None else max(period_end, chunk_end)
+                    
+                    self._consolidate_file_data(timestamps, variables, file_id, records_read,
+                                                period_end if file_end is None else file_end, interval)
+                    self._update_watermark(metadata, records_read, timestamps)
+            
+            if records == 0:
+                if after is not None:
+                    self._add_file_info(member.name, 0, None, None, 'Sem registros novos')
+                    return
+                raise ValueError("Arquivo sem registros")
+            
+            self._add_file_info(member.name, records, period_start, period_end,
+                                'Processado com sucesso (leitura em blocos)', interval, self.station)
+        except Exception as e:
+            self._add_file_info(member.name, records, None, None, f"Erro: {str(e)}")
+
+    def _add_file_info(self, file_name, records, period_start, period_end, status, interval=None, station=None):
+        """Registra o resultado do processamento de um arquivo (interval: intervalo de gravação detectado)"""
+        self.file_processing_info.append({
+            'arquivo': file_name,
+            'estacao': station or 'N/A',
+            'registros': records,
+            'periodo_inicio': period_start.strftime('%Y-%m-%d %H:%M') if period_start is not None else 'N/A',
+            'periodo_fim': period_end.strftime('%Y-%m-%d %H:%M') if period_end is not None else 'N/A',
+            'intervalo': format_interval(interval),
+            'status': status
+        })
+
+    def _consolidate_file_data(self, timestamps, variables, file_id, records, newest, interval=None):
+        """
+        Consolida os canais normalizados de um arquivo de forma vetorizada
+        
+        interval: intervalo de gravação do arquivo (np.timedelta64 ou None), guardado por linha
+        para as visões de 10 minutos tratarem cada linha pela resolução do seu arquivo.
+        
+        Timestamps repetidos (no arquivo ou já consolidados) são resolvidos em uma única
+        passada pela política da tabela de conflitos. Com a política padrão equivale ao loop
+        linha a linha: o último registro sobrescreve o anterior. Cada repetição vira uma
+        linha da tabela de conflitos, na ordem do arquivo.
+        """
+        n_rows = len(timestamps)
+        store = self.consolidated_data
+        if self.history is not None:
+            self._load_history_months(self._months_of(timestamps))
+        
+        values = np.column_stack([variables[name] for name in store.variables])
+        # Canais Min/Max/Std que o arquivo não tiver ficam NaN
+        statistics = np.full((n_rows, len(store.statistics)), np.nan, dtype=np.float32)
+        for i, name in enumerate(store.statistics):
+            if name in variables:
+                statistics[:, i] = variables[name]
+        sequence = self._sequence_base + file_id
+        newest = pd.Timestamp(newest).value
+        records = np.asarray(records, dtype=np.int64)
+        
+        # Duplicatas dentro do arquivo e timestamps já consolidados, detectados em bloco
+        first_in_file = ~pd.Index(timestamps).duplicated(keep='first')
+        store_positions, in_store = store.locate(timestamps)
+        
+        if first_in_file.all() and not in_store.any():
+            winners = np.arange(n_rows)
+        else:
+            stored = first_in_file & in_store
+            winners = self._resolve_conflicts(timestamps, values, store_positions[stored], stored,
+                                              file_id, sequence, records, newest)
+        
+        store.upsert(timestamps[winners], values[winners], {
+            'sequencia': sequence,
+            'record': records[winners],
+            'recente': newest,
+            'intervalo': 0 if interval is None else interval // np.timedelta64(1, 's'),
+            'fonte': file_id
+        }, statistics[winners])
+
+    def _months_of(self, timestamps):
+        """(ano, mês) distintos de um conjunto de timestamps"""
+        numbers = np.unique(np.asarray(timestamps, dtype='datetime64[ns]').astype('datetime64[M]').astype(np.int64))
+        return [(1970 + number // 12, number % 12 + 1) for number in numbers.tolist()]
+
+    def _load_history_months(self, months):
+        """Carrega na série da estação selecionada as partições do histórico ainda não lidas"""
+        store = self.consolidated_data
+        history = self._station_history()
+        for year, month in months:
+            if (self.station, year, month) in self._history_months_loaded:
+                continue
+            self._history_months_loaded.add((self.station, year, month))
+            
+            loaded = history.read_month(year, month, store.variables + store.statistics)
+            if loaded is None:
+                continue
+            
+            if store.frozen:
+                self._detach_shared()
+                store = self.consolidated_data
+            
+            timestamps, values, attributes = loaded
+            # Linhas já consolidadas na sessão têm prioridade sobre o histórico
+            _, found = store.locate(timestamps)
+            attributes['fonte'] = -1
+            n_variables = len(store.variables)
+            store.upsert(timestamps[~found], values[~found, :n_variables],
+                         {name: (value[~found] if np.ndim(value) else value) for name, value in attributes.items()},
+                         values[~found, n_variables:])
+            if (~found).any():
+                self.history_rows_merged[(self.station, year, month)] = int((~found).sum())
+
+    def history_merge_message(self):
+        """Aviso das linhas do histórico local incorporadas aos dados da sessão (None se nenhuma)"""
+        if not self.history_rows_merged:
+            return None
+        total = sum(self.history_rows_merged.values())
+        months = ", ".join(f"{month:02d}/{year} ({station})"
+                           for station, year, month in sorted(self.history_rows_merged))
+        return (f"Histórico local: {total:,} registro(s) de sessões anteriores incorporado(s) aos dados "
+                f"consolidados, em {months}")
+
+    def _save_history(self):
+        """Acrescenta ao histórico de cada estação as linhas gravadas neste processamento"""
+        for station, store in self.station_stores.items():
+            written = np.flatnonzero(store.attribute('fonte') >= 0)
+            self.history.station(station).append(
+                store.index.to_numpy()[written],
+                store.values()[written],
+                store.variables,
+                {name: store.attribute(name)[written] for name in ATTRIBUTE_COLUMNS},
+                {name: store.statistic(name)[written] for name in store.statistics}
+            )
+        self.history.set_next_sequence(self.files_ingested)
+        self.history.add_source_files(self.source_files.items())
+        self.history.save_watermarks(self.ingest_watermarks)
+
+    def _resolve_conflicts(self, timestamps, values, store_positions, stored, file_id, sequence, records, newest):
+        """
+        Aplica a política de conflitos às linhas de um arquivo/bloco
+        
+        O registro já consolidado de cada timestamp entra como uma linha anterior às do arquivo,
+        e a política escolhe o vencedor de cada grupo de uma vez. Registra os conflitos e
+        retorna as posições das linhas do arquivo que devem ser gravadas.
+        """
+        policy = CONFLICT_POLICIES[self.conflicts_detected.policy]
+        store = self.consolidated_data
+        n_stored = len(store_positions)
+        n_rows = len(timestamps)
+        
+        # Valores e atributos: registros consolidados primeiro, depois as linhas do arquivo
+        values = np.vstack([store.values()[store_positions], values])
+        attributes = {
+            'sequencia': np.concatenate([store.attribute('sequencia')[store_positions], np.full(n_rows, sequence)]),
+            'record': np.concatenate([store.attribute('record')[store_positions], records]),
+            'recente': np.concatenate([store.attribute('recente')[store_positions], np.full(n_rows, newest)]),
+            'preenchidos': (~np.isnan(values)).sum(axis=1)
+        }
+        
+        all_timestamps = np.concatenate([timestamps[stored].to_numpy(), timestamps.to_numpy()])
+        group_codes, _ = pd.factorize(all_timestamps)
+        holder_before, took_over, is_final = resolve_duplicates(
+            group_codes, np.asarray(policy.priority(attributes), dtype=np.int64), policy.replace_on_tie
+        )
+        
+        # Conflitos: linhas do arquivo que encontraram um registro anterior para o timestamp
+        conflict_rows = n_stored + np.flatnonzero(holder_before[n_stored:] >= 0)
+        holders = holder_before[conflict_rows]
+        if len(conflict_rows) > 0:
+            previous_ids = np.full(len(conflict_rows), file_id, dtype=np.int32)
+            from_store = holders < n_stored
+            previous_ids[from_store] = store.attribute('fonte')[store_positions[holders[from_store]]]
+            
+            # NaN dos dois lados conta como igual
+            old_values, new_values = values[holders], values[conflict_rows]
+            changed = ~((old_values == new_values) | (np.isnan(old_values) & np.isnan(new_values)))
+            self.conflicts_detected.append(
+                timestamps[conflict_rows - n_stored],
+                previous_ids,
+                np.full(len(conflict_rows), file_id, dtype=np.int32),
+                took_over[conflict_rows],
+                changed
+            )
+        
+        return np.flatnonzero(is_final[n_stored:])
+
+    def show_conflicts(self):
+        """Mostra os conflitos detectados entre arquivos, uma página por vez"""
+        conflicts = self.conflicts_detected
+        total = len(conflicts)
+        summary = conflicts.summary()
+        
         st.markdown("---")
         st.markdown("### Conflitos Detectados")
         
         st.markdown(f"""
         <div class="warning-box">
-            <h4>{len(self.conflicts_detected)} conflito(s) encontrado(s)</h4>
-            <p>Timestamps idênticos em múltiplos arquivos. Usando dados do último arquivo processado.</p>
+            <h4>{total} conflito(s) encontrado(s)</h4>
+            <p>Timestamps idênticos em múltiplos arquivos. Política: {CONFLICT_POLICIES[summary['politica']].label}.</p>
+            <p>{summary['substituidos']:,} registro(s) substituído(s): {summary['valores_alterados']:,} valor(es) alterado(s),
+            {summary['valores_mantidos']:,} valor(es) divergente(s) mantido(s).</p>
         </div>
         """, unsafe_allow_html=True)
         
-        # Mostrar detalhes dos conflitos
+        # Mostrar detalhes dos conflitos (apenas a página atual vira DataFrame)
         with st.expander("Ver Detalhes dos Conflitos"):
-            for i, conflict in enumerate(self.conflicts_detected[:10]):  # Mostrar só os primeiros 10
-                st.markdown(f"**Conflito {i+1}: {conflict['timestamp']}**")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.markdown("*Dados Anteriores:*")
-                    st.json(conflict['dados_anteriores'])
-                with col2:
-                    st.markdown(f"*Dados Novos ({conflict['arquivo_atual']}):*")
-                    st.json(conflict['dados_novos'])
-                st.markdown("---")
-            
-            if len(self.conflicts_detected) > 10:
-                st.info(f"Mostrando apenas os primeiros 10 conflitos de {len(self.conflicts_detected)} total.")
-
-    def _find_closest_timestamp(self, target_time, available_timestamps):
+            changed = {name: count for name, count in conflicts.changed_counts().items() if count > 0}
+            if changed:
+                st.markdown("*Valores alterados por variável:* " +
+                            ", ".join(f"{name}: {count:,}" for name, count in changed.items()))
+            else:
+                st.markdown("*Nenhum valor foi alterado pela política.*")
+            
+            n_pages = max(1, -(-total // CONFLICTS_PAGE_SIZE))
+            if st.session_state.get('conflicts_page', 1) > n_pages:
+                st.session_state['conflicts_page'] = 1
+            page = st.number_input("Página", min_value=1, max_value=n_pages, value=1, step=1,
+                                   key="conflicts_page")
+            
+            start = (int(page) - 1) * CONFLICTS_PAGE_SIZE
+            stop = min(start + CONFLICTS_PAGE_SIZE, total)
+            st.dataframe(conflicts.page(start, stop), use_container_width=True)
+            st.caption(f"Conflitos {start + 1}–{stop} de {total} (✔ = variável com valor diferente; "
+                       f"Substituído = o registro novo prevaleceu)")
+
+    def _snapshot_cube(self, store, year, month, step=DEFAULT_STEP):
+        """Grade de horários do mês com a política de alinhamento e as tolerâncias configuradas"""
+        return store.snapshot_cube(year, month, self.snapping_policy, self._snapping_tolerances(), step)
+
+    def _snapping_tolerances(self):
+        return {variable: pd.Timedelta(minutes=minutes) for variable, minutes in self.snapping_tolerances.items()}
+
+    def update_excel_file(self, excel_file, all_history_months=False, station=None, true_extremes=False):
         """
-        Busca o timestamp mais próximo dentro da tolerância de ±10 minutos
+        Atualiza Excel com dados exatos
         
-        Args:
-            target_time: datetime alvo (ex: 2025-06-22 10:00:00)
-            available_timestamps: lista de timestamps disponíveis
-            
-        Returns:
-            timestamp mais próximo ou None se nenhum estiver dentro da tolerância
+        Preenche os meses presentes na série consolidada (os meses tocados pelos arquivos,
+        já completados com o histórico local). Com all_history_months=True, todas as partições
+        do histórico são carregadas e todos os meses são preenchidos.
+        station escolhe a estação cujos dados vão para o Excel (padrão: a selecionada).
+        Com true_extremes=True, Min/Max das abas mensais vêm dos canais Min/Max do logger (extremos
+        reais do dia) e o desvio padrão combinado do dia é gravado na coluna de desvio da variável
+        ('std_col' do mapeamento mensal ou coluna seguinte a Outliers com cabeçalho "Desv"/"Std");
+        abas sem essa coluna ficam sem o desvio.
         """
-        target_time = pd.to_datetime(target_time)
-        tolerance = timedelta(minutes=10)
-        
-        min_diff = timedelta.max
-        closest_timestamp = None
+        if station is not None:
+            # Estação sem dados nesta sessão só pode vir do histórico
+            if station not in self.station_stores and not (all_history_months and self.history is not None):
+                return False, f"Nenhum dado da estação {station}!"
+            self.select_station(station)
         
-        for ts in available_timestamps:
-            ts_converted = pd.to_datetime(ts)
-            diff = abs(ts_converted - target_time)
-            
-            # Verifica se está dentro da tolerância e é mais próximo
-            if diff <= tolerance and diff < min_diff:
-                min_diff = diff
-                closest_timestamp = ts  # Retorna o timestamp original, não o convertido
+        if all_history_months and self.history is not None and self.station is not None:
+            self._load_history_months(self._station_history().months())
         
-        return closest_timestamp
-
-    def update_excel_file(self, excel_file):
-        """
-        Atualiza Excel com dados exatos
-        """
         if not self.consolidated_data:
             return False, "Nenhum dado processado!"
         
@@ -440,20 +992,29 @@ class ExactWeatherProcessor:
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            # Agrupar dados por mês
-            monthly_data = {}
-            for timestamp, data in self.consolidated_data.items():
-                year_month = f"{timestamp.year}-{timestamp.month:02d}"
-                if year_month not in monthly_data:
-                    monthly_data[year_month] = {}
-                monthly_data[year_month][timestamp] = data
+            # Agrupar dados por mês na visão de 10 minutos (meses já em 10 min ou mais espaçados
+            # são views sem cópia; arquivos de 1 ou 5 min viram médias de 10 min)
+            monthly_data = {
+                f"{year}-{month:02d}": self.consolidated_data.resampled('10min', start, stop)
+                for year, month, start, stop in self.consolidated_data.month_slices()
+            }
+            
+            # Extremos reais e desvio padrão por dia, a partir dos canais estatísticos (opcional)
+            monthly_extremes = {
+                f"{year}-{month:02d}": day_extremes(self.consolidated_data, start, stop)
+                for year, month, start, stop in self.consolidated_data.month_slices()
+            } if true_extremes else {}
             
             total_months = len(monthly_data)
+            snapping_reports = []
+            self.daily_template_warnings = []
+            self.true_extremes = true_extremes
+            self.monthly_std_columns = {}
             sheets_updated = 0
             total_cells_updated = 0
             
             # Processar cada mês - ANÁLISES DIÁRIAS
-            for i, (year_month, month_timestamps) in enumerate(monthly_data.items()):
+            for i, (year_month, month_data) in enumerate(monthly_data.items()):
                 year, month = year_month.split('-')
                 month_num = int(month)
                 
@@ -463,7 +1024,16 @@ class ExactWeatherProcessor:
                 sheet_name = self._find_daily_analysis_sheet(wb.sheetnames, month_num)
                 if sheet_name:
                     ws = wb[sheet_name]
-                    cells_updated = self._update_daily_analysis_exact(ws, month_timestamps, int(year), month_num)
+                    template_key = self._daily_sheet_template(ws, sheet_name)
+                    self.daily_sheet_templates[sheet_name] = template_key or UNKNOWN_DAILY_TEMPLATE
+                    if template_key is None:
+                        progress_bar.progress((i + 1) / (total_months * 2))
+                        continue
+                    template = DAILY_SHEET_TEMPLATES[template_key]
+                    cube = self._snapshot_cube(self.consolidated_data, int(year), month_num, template.step)
+                    cells_updated = self._update_daily_analysis_exact(ws, cube, template_key)
+                    if cube is not None:
+                        snapping_reports.append(cube.report())
                     
                     if cells_updated > 0:
                         sheets_updated += 1
@@ -472,9 +1042,14 @@ class ExactWeatherProcessor:
                 
                 progress_bar.progress((i + 1) / (total_months * 2))  # Ajustar para incluir análise mensal
             
+            # Alinhamento somado sobre os meses com aba diária
+            self.snapping_report = (pd.concat(snapping_reports).groupby(level=0, sort=False).sum()
+                                    if snapping_reports else None)
+            
             # PROCESSAR ANÁLISES MENSAIS
             status_text.text("Processando análises mensais...")
-            monthly_sheets_updated, monthly_cells_updated = self._process_monthly_analysis(wb, monthly_data)
+            monthly_sheets_updated, monthly_cells_updated = self._process_monthly_analysis(wb, monthly_data,
+                                                                                           monthly_extremes)
 
             # Atualizar totais
             sheets_updated += monthly_sheets_updated
@@ -512,72 +1087,55 @@ class ExactWeatherProcessor:
         
         return None
 
-    def _update_daily_analysis_exact(self, ws, month_timestamps, year, month):
-        """
-        Atualiza análise diária usando busca exata
+    def _daily_sheet_template(self, ws, sheet_name):
         """
-        cells_updated = 0
-        
-        # Para cada horário da planilha (00:00 a 23:00)
-        for hour in range(24):
-            row_num = hour + 3  # Linha 3 = 00:00, Linha 4 = 01:00, etc.
-            
-            # Para cada dia do mês (1 a 31)
-            for day in range(1, 32):
-                # Construir timestamp alvo
-                try:
-                    target_datetime = datetime(year, month, day, hour, 0, 0)
-                except ValueError:
-                    # Dia inválido para o mês (ex: 31 de fevereiro)
-                    continue
-                
-                # Buscar timestamp mais próximo dentro da tolerância
-                available_timestamps = list(month_timestamps.keys())
-                closest_timestamp = self._find_closest_timestamp(target_datetime, available_timestamps)
-                
-                if closest_timestamp is None:
-                    # Nenhum dado dentro da tolerância - deixar vazio
-                    continue
-                
-                # Obter dados do timestamp encontrado
-                data = month_timestamps[closest_timestamp]
-                
-                # Atualizar cada variável
-                for variable, value in data.items():
-                    if value is None:
-                        continue
-                    
-                    col_letter = self._get_column_for_variable_and_day(variable, day)
-                    if col_letter:
-                        try:
-                            ws[f'{col_letter}{row_num}'] = value
-                            cells_updated += 1
-                        except Exception:
-                            # Continua processamento mesmo com erro
-                            pass
-        
-        return cells_updated
+        Modelo da aba diária (escolhido ou reconhecido pela coluna A)
 
-    def _get_column_for_variable_and_day(self, variable, day_number):
-        """
-        Calcula letra da coluna para análise diária
+        No modo automático, abas com a coluna A não reconhecida são gravadas com a grade padrão
+        de 24 linhas, como antes dos modelos de aba (aviso em daily_template_warnings).
+
+        Returns:
+            chave de DAILY_SHEET_TEMPLATES, ou None se a aba não deve ser gravada (grade
+            escolhida diferente da coluna A; aviso em daily_template_warnings)
         """
-        if variable not in self.column_mapping:
-            return None
-        
-        # Verificar se o dia está no range válido (1-31)
-        if day_number < 1 or day_number > 31:
+        if self.daily_template == AUTO_DAILY_TEMPLATE:
+            template_key = detect_daily_template(ws)
+            if template_key == UNKNOWN_DAILY_TEMPLATE:
+                self.daily_template_warnings.append(
+                    f"{sheet_name}: grade da coluna A não reconhecida; gravada com a grade padrão "
+                    f"('{DAILY_SHEET_TEMPLATES[DEFAULT_DAILY_TEMPLATE].label}')")
+                return DEFAULT_DAILY_TEMPLATE
+            return template_key
+
+        conflict = check_daily_template(ws, self.daily_template)
+        if conflict:
+            self.daily_template_warnings.append(f"{sheet_name}: {conflict}; aba não atualizada")
             return None
+        if detect_daily_template(ws) == UNKNOWN_DAILY_TEMPLATE:
+            self.daily_template_warnings.append(
+                f"{sheet_name}: grade da coluna A não reconhecida; gravada com a grade escolhida "
+                f"('{DAILY_SHEET_TEMPLATES[self.daily_template].label}')")
+        return self.daily_template
+
+    def _update_daily_analysis_exact(self, ws, cube, template_key=DEFAULT_DAILY_TEMPLATE):
+        """
+        Atualiza análise diária usando busca exata
         
-        start_col_num = self.column_mapping[variable]['start_num']
-        target_col_num = start_col_num + (day_number - 1)
-        
-        # Verificar se a coluna está dentro dos limites válidos
-        if target_col_num > 187:  # Última coluna GE = 187
-            return None
-            
-        col_letter = get_column_letter(target_col_num)
-        return col_letter
+        cube: grade do mês (SnapshotCube: valor de cada variável por dia e horário, NaN = ausente),
+        com o mesmo intervalo entre horários do modelo da aba (template_key)
+        Horários sem dado dentro da tolerância ficam vazios.
+        """
+        if cube is None:
+            return 0
+        return self._daily_write_plan(template_key, cube.variables).apply(ws, cube)
+
+    def _daily_write_plan(self, template_key, variables):
+        """Plano de gravação (coordenadas inteiras) do modelo, calculado uma vez por sessão"""
+        key = (template_key, tuple(variables))
+        if key not in self._daily_write_plans:
+            self._daily_write_plans[key] = DailyWritePlan(DAILY_SHEET_TEMPLATES[template_key],
+                                                          self.column_mapping, variables)
+        return self._daily_write_plans[key]
 
     def _find_monthly_analysis_sheet(self, sheet_names, month_num):
         """Encontra aba de análise mensal para o mês"""
@@ -595,7 +1153,7 @@ class ExactWeatherProcessor:
         
         return None
 
-    def _process_monthly_analysis(self, wb, monthly_data):
+    def _process_monthly_analysis(self, wb, monthly_data, monthly_extremes=None):
         """Processa todas as abas de análise mensal - VERSÃO CORRIGIDA"""
         monthly_sheets_updated = 0
         monthly_cells_updated = 0
@@ -607,15 +1165,15 @@ class ExactWeatherProcessor:
         # Debug do mapeamento de colunas
         self._debug_column_mapping()
         
-        for year_month, month_timestamps in monthly_data.items():
+        for year_month, month_data in monthly_data.items():
             year, month = year_month.split('-')
             month_num = int(month)
             
             print(f"🔍 DEBUG: Processando {year_month} (mês {month_num})")
-            print(f"🔍 DEBUG: Timestamps disponíveis: {len(month_timestamps)}")
+            print(f"🔍 DEBUG: Timestamps disponíveis: {len(month_data)}")
             
             # Verificar variáveis disponíveis
-            common_vars = self._verify_data_variables(month_timestamps)
+            common_vars = self._verify_data_variables(month_data)
             
             # Buscar aba mensal correspondente
             monthly_sheet_name = self._find_monthly_analysis_sheet(wb.sheetnames, month_num)
@@ -629,7 +1187,8 @@ class ExactWeatherProcessor:
                 # Debug adicional: verificar algumas células da planilha
                 self._debug_worksheet_structure(ws_monthly)
                 
-                cells_updated = self._update_monthly_analysis_data(ws_monthly, month_timestamps, int(year), month_num)
+                cells_updated = self._update_monthly_analysis_data(ws_monthly, month_data, int(year), month_num,
+                                                                   (monthly_extremes or {}).get(year_month))
                 print(f"🔍 DEBUG: Células atualizadas na aba mensal: {cells_updated}")
                 
                 if cells_updated > 0:
@@ -648,26 +1207,44 @@ class ExactWeatherProcessor:
         print(f"🔍 DEBUG: RESULTADO FINAL - Abas mensais: {monthly_sheets_updated}, Células: {monthly_cells_updated}")
         return monthly_sheets_updated, monthly_cells_updated
 
-    def _update_monthly_analysis_data(self, ws, month_timestamps, year, month):
-        """Atualiza análise mensal com estatísticas diárias - VERSÃO CORRIGIDA"""
+    def _update_monthly_analysis_data(self, ws, month_data, year, month, extremes=None):
+        """
+        Atualiza análise mensal com estatísticas diárias - VERSÃO CORRIGIDA
+        
+        extremes: DataFrame de day_extremes do mês (Min/Max reais e desvio padrão) ou None
+        """
         cells_updated = 0
         
         print(f"🔍 DEBUG: Iniciando update da aba mensal para {month}/{year}")
-        print(f"🔍 DEBUG: Total de timestamps disponíveis: {len(month_timestamps)}")
+        print(f"🔍 DEBUG: Total de timestamps disponíveis: {len(month_data)}")
         
         # Verificar quais variáveis temos nos dados
-        if not month_timestamps:
+        if len(month_data) == 0:
             print("❌ DEBUG: Nenhum timestamp disponível")
             return 0
             
-        sample_data = next(iter(month_timestamps.values()))
-        available_variables = list(sample_data.keys())
+        available_variables = list(month_data.columns)
         print(f"🔍 DEBUG: Variáveis disponíveis nos dados: {available_variables}")
         
         # Verificar quais variáveis estão no mapeamento
         mapped_variables = list(self.monthly_column_mapping.keys())
         print(f"🔍 DEBUG: Variáveis no mapeamento: {mapped_variables}")
         
+        # Limites [início, fim) de cada dia no mês (índice ordenado - fatias sem cópia)
+        day_numbers = month_data.index.day.to_numpy()
+        month_values = month_data.to_numpy()
+        coverage = self.consolidated_data.coverage
+        
+        # Extremos reais por dia: {dia: {coluna: valor}}, e coluna do desvio padrão de cada variável
+        # (None: a aba não tem coluna de desvio para a variável, e o desvio não é gravado)
+        extreme_days = {}
+        std_columns = {}
+        if extremes is not None:
+            extreme_days = dict(zip(extremes.index.day.tolist(), extremes.to_dict('records')))
+            std_columns = {variable: self._monthly_std_column(ws, info)
+                           for variable, info in self.monthly_column_mapping.items()}
+            self.monthly_std_columns[ws.title] = std_columns
+        
         # Para cada dia do mês (1 a 31)
         for day in range(1, 32):
             try:
@@ -677,14 +1254,15 @@ class ExactWeatherProcessor:
                 # Dia inválido para o mês (ex: 31 de fevereiro)
                 continue
             
-            # Filtrar todos os timestamps do dia
-            day_timestamps = [ts for ts in month_timestamps.keys() if ts.day == day]
-            
-            if not day_timestamps:
+            if coverage.day_count(year, month, day) == 0:
                 # Não há dados para este dia - deixar células vazias
                 continue
             
-            print(f"🔍 DEBUG: Dia {day} - {len(day_timestamps)} timestamps encontrados")
+            # Filtrar todos os timestamps do dia
+            day_start, day_stop = np.searchsorted(day_numbers, [day, day + 1])
+            
+            day_values_all = month_values[day_start:day_stop]
+            print(f"🔍 DEBUG: Dia {day} - {day_stop - day_start} timestamps encontrados")
             
             # Processar cada variável
             variables_processed = 0
@@ -696,11 +1274,8 @@ class ExactWeatherProcessor:
                     continue
                 
                 # Coletar todos os valores do dia para esta variável
-                day_values = []
-                for ts in day_timestamps:
-                    value = month_timestamps[ts].get(variable)
-                    if value is not None:
-                        day_values.append(value)
+                column = day_values_all[:, available_variables.index(variable)]
+                day_values = column[~np.isnan(column)].tolist()
                 
                 if not day_values:
                     # Não há dados válidos para esta variável neste dia
@@ -718,6 +1293,17 @@ class ExactWeatherProcessor:
                 # Calcular outliers
                 outliers_count = self._calculate_outliers(day_values)
                 
+                # Extremos reais (canais Min/Max) e desvio padrão combinado, se pedidos
+                std_val = None
+                day_extremes_row = extreme_days.get(day, {})
+                if f"{variable}_Std" in day_extremes_row:
+                    if not np.isnan(day_extremes_row[f"{variable}_Min_Real"]):
+                        min_val = float(day_extremes_row[f"{variable}_Min_Real"])
+                    if not np.isnan(day_extremes_row[f"{variable}_Max_Real"]):
+                        max_val = float(day_extremes_row[f"{variable}_Max_Real"])
+                    if not np.isnan(day_extremes_row[f"{variable}_Std"]):
+                        std_val = float(day_extremes_row[f"{variable}_Std"])
+                
                 # Obter posições das colunas
                 col_info = self.monthly_column_mapping[variable]
                 start_col = col_info['start_col']
@@ -735,7 +1321,6 @@ class ExactWeatherProcessor:
                     continue
                 
                 # Calcular letras das colunas (Min, Max, Avg, Outliers)
-                from openpyxl.utils import column_index_from_string
                 start_col_num = column_index_from_string(start_col)
                 
                 min_col = get_column_letter(start_col_num)      # Coluna Min
@@ -750,6 +1335,9 @@ class ExactWeatherProcessor:
                     ws[f'{avg_col}{target_row}'] = round(avg_val, 3)
                     ws[f'{out_col}{target_row}'] = int(outliers_count)
                     cells_updated += 4
+                    if std_val is not None and std_columns.get(variable):
+                        ws[f'{std_columns[variable]}{target_row}'] = round(std_val, 3)
+                        cells_updated += 1
                     print(f"✅ DEBUG: {variable} dia {day} - Min: {min_val:.3f}, Max: {max_val:.3f}, Avg: {avg_val:.3f}, Out: {outliers_count} (linha {target_row})")
                 except Exception as e:
                     print(f"❌ DEBUG: Erro ao preencher {variable} dia {day} na linha {target_row}: {e}")
@@ -762,6 +1350,22 @@ class ExactWeatherProcessor:
         print(f"🔍 DEBUG: Total de células atualizadas na análise mensal: {cells_updated}")
         return cells_updated
 
+    def _monthly_std_column(self, ws, col_info):
+        """
+        Coluna do desvio padrão de uma variável na aba mensal, ou None se a aba não tiver
+
+        Vale a coluna 'std_col' do mapeamento; sem ela, a coluna seguinte a Outliers, desde que o
+        cabeçalho (linha acima da primeira linha da variável) a identifique como desvio padrão.
+        """
+        if col_info.get('std_col'):
+            return col_info['std_col']
+        start_row, _ = col_info['rows']
+        column = get_column_letter(column_index_from_string(col_info['start_col']) + 4)
+        header = ws[f'{column}{start_row - 1}'].value if start_row > 1 else None
+        if isinstance(header, str) and header.strip().lower().startswith(('desv', 'std')):
+            return column
+        return None
+
     def _debug_worksheet_structure(self, ws):
         """Debug da estrutura da planilha para entender o layout"""
         print(f"🔍 DEBUG: Analisando estrutura da aba {ws.title}")
@@ -792,7 +1396,6 @@ class ExactWeatherProcessor:
             start_col = mapping['start_col']
             start_row, end_row = mapping['rows']
             
-            from openpyxl.utils import column_index_from_string
             start_col_num = column_index_from_string(start_col)
             
             min_col = get_column_letter(start_col_num)
@@ -809,14 +1412,13 @@ class ExactWeatherProcessor:
             print(f"    Exemplo dia 1: linha {start_row if start_row <= 33 else 37}")
             print("")
 
-    def _verify_data_variables(self, month_timestamps):
+    def _verify_data_variables(self, month_data):
         """Verifica quais variáveis estão disponíveis nos dados"""
-        if not month_timestamps:
+        if len(month_data) == 0:
             print("❌ DEBUG: Nenhum timestamp disponível")
             return []
         
-        sample_data = next(iter(month_timestamps.values()))
-        available_vars = list(sample_data.keys())
+        available_vars = list(month_data.columns)
         mapped_vars = list(self.monthly_column_mapping.keys())
         
         print("🔍 DEBUG: Verificação de variáveis:")
@@ -838,27 +1440,9 @@ class ExactWeatherProcessor:
         return common_vars
 
     def _calculate_outliers(self, values):
-        """Calcula número de outliers usando a fórmula padrão"""
-        if len(values) < 2:
-            return 0
-        
+        """Calcula número de outliers usando a fórmula padrão (média ± 1,5 × IQR)"""
         try:
-            # Calcular quartis e IQR
-            q1 = np.percentile(values, 25)
-            q3 = np.percentile(values, 75)
-            iqr = q3 - q1
-            
-            # Calcular média
-            mean_val = np.mean(values)
-            
-            # Calcular limites
-            l_sup = mean_val + 1.5 * iqr
-            l_inf = mean_val - 1.5 * iqr
-            
-            # Contar outliers
-            outliers = np.sum((np.array(values) < l_inf) | (np.array(values) > l_sup))
-            
-            return int(outliers)
+            return count_outliers(values)
         except Exception as e:
             print(f"❌ Erro no cálculo de outliers: {e}")
             return 0
@@ -914,11 +1498,231 @@ class ExactWeatherProcessor:
             # Tabela detalhada
             st.markdown("#### Detalhes por Arquivo")
             df_display = df_files.copy()
-            df_display.columns = ['Arquivo', 'Registros', 'Início', 'Fim', 'Status']
+            df_display.columns = ['Arquivo', 'Estação', 'Registros', 'Início', 'Fim', 'Intervalo', 'Status']
             df_display['Registros'] = df_display['Registros'].apply(lambda x: f"{x:,}" if x > 0 else "0")
             
             st.dataframe(df_display, use_container_width=True)
 
+    def cell_provenance(self, sheet_name, cell, year=None):
+        """
+        Origem de uma célula do Excel: arquivos e RECORDs das medições que formaram o valor
+
+        "MM-Analise Diaria": o registro encontrado para o horário (as medições do intervalo de
+        10 minutos, se o registro é uma média de arquivo mais rápido que 10 minutos). "MM-Analise Mensal": Min/Max vêm do intervalo de 10 minutos
+        com o extremo do dia; Avg/Outliers, de todas as medições do dia. Se a última atualização
+        usou os extremos reais, Min/Max vêm da medição com o extremo do canal Min/Max do logger e
+        o desvio padrão, dos canais Std de todas as medições do dia.
+        year escolhe o ano se a série tiver o mesmo mês em mais de um ano (padrão: o mais recente).
+
+        Returns:
+            dict com 'variavel', 'descricao' e 'origem' (DataFrame Timestamp/Valor/Arquivo/RECORD)
+            ou None se a célula não corresponder a nenhum valor preenchido
+        """
+        try:
+            month = int(sheet_name.split('-')[0])
+            row, col = coordinate_to_tuple(cell.strip().upper())
+        except Exception:
+            return None
+
+        store = self.consolidated_data
+        months = [(y, start, stop) for y, m, start, stop in store.month_slices()
+                  if m == month and (year is None or y == year)]
+        if not months:
+            return None
+        year, start, stop = months[-1]
+        view = store.resampled('10min', start, stop)
+        # Linhas de arquivos de 10 minutos ou mais espaçados entram na visão como estão; as demais
+        # viram a média do intervalo [t, t + 10 min) (ver resample)
+        native = native_rows(store.index[start:stop], store.attribute('intervalo')[start:stop], '10min')
+
+        if "Analise Diaria" in sheet_name:
+            template_key = self.daily_sheet_templates.get(sheet_name, DEFAULT_DAILY_TEMPLATE)
+            if template_key == UNKNOWN_DAILY_TEMPLATE:
+                # Aba não gravada na última atualização: grade desconhecida
+                return None
+            template = DAILY_SHEET_TEMPLATES[template_key]
+            located = self._daily_cell_position(row, col, template)
+            if located is None:
+                return None
+            variable, day, slot = located
+            try:
+                target = datetime(year, month, day) + timedelta(minutes=slot * template.step_minutes)
+            except ValueError:
+                return None
+            # Sem registros na janela da tolerância (índice de cobertura): nada a procurar na grade
+            tolerance = pd.Timedelta(self._snapping_tolerances().get(variable, DEFAULT_TOLERANCE))
+            if not store.coverage.has_data(target - tolerance, target + tolerance):
+                return None
+            closest = self._snapshot_cube(store, year, month, template.step).matched_timestamp(day, slot, variable)
+            if closest is None:
+                return None
+            first = closest
+            description = f"{variable} em {target:%d/%m/%Y %H:%M}: medição de {closest:%d/%m/%Y %H:%M}"
+        elif "Analise Mensal" in sheet_name:
+            located = self._monthly_cell_position(row, col, self.monthly_std_columns.get(sheet_name))
+            if located is None:
+                return None
+            variable, day, statistic = located
+            if store.coverage.day_count(year, month, day) == 0:
+                return None
+            day_start = pd.Timestamp(year, month, 1) + pd.Timedelta(days=day - 1)
+            day_end = day_start + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+            day_view = view[variable][day_start:day_end].dropna()
+            if day_view.empty:
+                return None
+            day_bounds = store.range_bounds(day_start, day_end)
+            # Extremos reais: a linha do canal Min/Max do logger com o extremo do dia; desvio
+            # padrão: todas as linhas do dia (Avg e Std de cada intervalo)
+            channel = f"{variable}_{statistic}"
+            if (self.true_extremes and statistic in ('Min', 'Max', 'Std') and variable in extreme_variables(store)
+                    and not np.isnan(store.statistic(channel)[slice(*day_bounds)]).all()):
+                channel_values = store.statistic(channel)[slice(*day_bounds)]
+                if statistic == 'Std':
+                    bounds = day_bounds
+                    description = (f"{variable} desvio padrão de {day_start:%d/%m/%Y}: Avg e Std de todas as "
+                                   "medições do dia")
+                else:
+                    extreme = np.nanargmin(channel_values) if statistic == 'Min' else np.nanargmax(channel_values)
+                    bounds = (day_bounds[0] + int(extreme), day_bounds[0] + int(extreme) + 1)
+                    description = (f"{variable} {statistic} de {day_start:%d/%m/%Y}: canal {statistic} do logger, "
+                                   f"medição de {store.index[bounds[0]]:%H:%M}")
+                sources = SourceIndex(self.history.source_files() if self.history is not None else None)
+                sources.update(self.source_files)
+                return {
+                    'variavel': variable,
+                    'descricao': description,
+                    'origem': row_sources(store, *bounds, variable, sources, statistic=channel)
+                }
+            if statistic == 'Std':
+                return None
+            if statistic in ('Min', 'Max'):
+                first = day_view.idxmin() if statistic == 'Min' else day_view.idxmax()
+                description = f"{variable} {statistic} de {day_start:%d/%m/%Y}: medição de {first:%H:%M}"
+            else:
+                first = None
+                bounds = day_bounds
+                description = f"{variable} {statistic} de {day_start:%d/%m/%Y}: todas as medições do dia"
+        else:
+            return None
+
+        include = None
+        if first is not None:
+            # Registro nativo: só a própria linha; média: as linhas de arquivos rápidos do intervalo
+            position = int(np.searchsorted(store.index[start:stop], first)) + start
+            if position < stop and store.index[position] == first and native[position - start]:
+                bounds = (position, position + 1)
+            else:
+                bounds = store.range_bounds(first, first + pd.Timedelta(minutes=10) - pd.Timedelta(1, 'ns'))
+                include = ~native[bounds[0] - start:bounds[1] - start]
+
+        sources = SourceIndex(self.history.source_files() if self.history is not None else None)
+        sources.update(self.source_files)
+        return {
+            'variavel': variable,
+            'descricao': description,
+            'origem': row_sources(store, *bounds, variable, sources, include)
+        }
+
+    def _daily_cell_position(self, row, col, template=DAILY_SHEET_TEMPLATES[DEFAULT_DAILY_TEMPLATE]):
+        """(variável, dia, horário) de uma célula da aba de análise diária (horário 0 = 00:00)"""
+        slot = template.slot(row)
+        if slot is None:
+            return None
+        for variable, info in self.column_mapping.items():
+            if info['start_num'] <= col < info['start_num'] + 31:
+                return variable, col - info['start_num'] + 1, slot
+        return None
+
+    def _monthly_cell_position(self, row, col, std_columns=None):
+        """
+        (variável, dia, estatística) de uma célula da aba de análise mensal
+
+        std_columns: {variável: coluna do desvio padrão} da aba na última atualização ('Std')
+        """
+        std_columns = std_columns or {}
+        for variable, info in self.monthly_column_mapping.items():
+            start_row, end_row = info['rows']
+            if not start_row <= row <= end_row:
+                continue
+            day = row - 2 if start_row <= 33 else row - 36
+            offset = col - column_index_from_string(info['start_col'])
+            if 0 <= offset < 4:
+                return variable, day, ['Min', 'Max', 'Avg', 'Outliers'][offset]
+            if std_columns.get(variable) and col == column_index_from_string(std_columns[variable]):
+                return variable, day, 'Std'
+        return None
+
+    def show_provenance(self):
+        """Consulta da origem de uma célula do Excel (arquivo e RECORD de cada medição)"""
+        if not self.consolidated_data:
+            return
+
+        with st.expander("🔎 Origem de um valor do Excel"):
+            col1, col2 = st.columns(2)
+            with col1:
+                sheet_name = st.text_input("Aba:", value="01-Analise Diaria", key="provenance_sheet")
+            with col2:
+                cell = st.text_input("Célula:", value="B3", key="provenance_cell")
+
+            result = self.cell_provenance(sheet_name, cell)
+            if result is None:
+                st.info("Nenhum valor consolidado corresponde a esta célula.")
+                return
+
+            origin = result['origem']
+            st.markdown(f"**{result['descricao']}** - {len(origin)} medição(ões) de "
+                        f"{origin['Arquivo'].nunique()} arquivo(s)")
+            st.dataframe(origin, use_container_width=True)
+
+    def show_export(self):
+        """Download das medições consolidadas e das estatísticas diárias (Parquet/Arrow/CSV)"""
+        store = self.consolidated_data
+        if not store:
+            return
+        
+        st.markdown("---")
+        st.markdown("### Exportar Dados Consolidados")
+        fmt = st.radio(
+            "Formato:",
+            list(EXPORT_FORMATS),
+            format_func=lambda key: EXPORT_FORMATS[key][0],
+            horizontal=True,
+            key="export_format"
+        )
+        _, extension, mime = EXPORT_FORMATS[fmt]
+        prefix = f"{self.station}_" if self.station else ""
+        
+        # O arquivo só é gerado no clique, lote a lote, a partir das colunas da série, em disco
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button(
+                label=f"📥 Medições ({len(store):,} registros)",
+                data=lambda: spooled_export(export_measurements(store, fmt), extension),
+                file_name=f"{prefix}medicoes{extension}",
+                mime=mime,
+                key="export_measurements",
+                use_container_width=True
+            )
+        with col2:
+            st.download_button(
+                label="📥 Estatísticas Diárias (Min/Max/Avg/Outliers)",
+                data=lambda: spooled_export(export_daily_statistics(store, fmt), extension),
+                file_name=f"{prefix}estatisticas_diarias{extension}",
+                mime=mime,
+                key="export_daily",
+                use_container_width=True
+            )
+        with col3:
+            st.download_button(
+                label="📥 Valores Horários (abas diárias)",
+                data=lambda: spooled_export(export_hourly_snapshots(store, fmt, self.snapping_policy,
+                                                                    self._snapping_tolerances()), extension),
+                file_name=f"{prefix}valores_horarios{extension}",
+                mime=mime,
+                key="export_hourly",
+                use_container_width=True
+            )
+
     def get_updated_excel_file(self):
         """Retorna o arquivo Excel atualizado"""
         if self.excel_path and os.path.exists(self.excel_path):
@@ -933,25 +1737,24 @@ class ExactWeatherProcessor:
         
         st.markdown("---")
         st.markdown("### Análise dos Dados Consolidados")
+        if len(self.stations()) > 1:
+            st.caption(f"Estação: {self.station} (outras estações no seletor do dashboard)")
+        history_message = self.history_merge_message()
+        if history_message:
+            st.info(history_message)
         
-        # Converter para DataFrame para visualização
-        preview_data = []
-        for timestamp, data in self.consolidated_data.items():
-            row = {'Timestamp': timestamp}
-            row.update(data)
-            preview_data.append(row)
+        # DataFrame sobre os arrays da série consolidada (já ordenada por Timestamp)
+        df_preview = self.consolidated_data.frame().reset_index()
         
-        if preview_data:
-            df_preview = pd.DataFrame(preview_data)
-            df_preview = df_preview.sort_values('Timestamp')
-            
+        if len(df_preview) > 0:
             # Estatísticas gerais
             st.markdown("#### Estatísticas Gerais")
-            col1, col2, col3 = st.columns(3)
+            coverage = self.consolidated_data.coverage
+            col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                first_timestamp = min(self.consolidated_data.keys())
-                last_timestamp = max(self.consolidated_data.keys())
+                first_timestamp = self.consolidated_data.index[0]
+                last_timestamp = self.consolidated_data.index[-1]
                 period_days = (last_timestamp - first_timestamp).days + 1
                 st.metric("Período Total", f"{period_days} dias")
             
@@ -961,13 +1764,26 @@ class ExactWeatherProcessor:
             
             with col3:
                 # Agrupar por mês
-                months = set()
-                for ts in self.consolidated_data.keys():
-                    months.add(f"{ts.year}-{ts.month:02d}")
+                months = list(self.consolidated_data.month_slices())
                 st.metric("Meses Cobertos", len(months))
             
-            # Gráficos para conferência das variáveis
-            self._create_variable_charts(df_preview)
+            with col4:
+                covered_months = coverage.months()
+                completeness = np.mean([coverage.month_completeness(year, month) for year, month in covered_months])
+                st.metric("Completude", f"{completeness:.1%}")
+            
+            # Mapa de completude (gerado só do índice de cobertura)
+            self._create_completeness_heatmap()
+            
+            # Gráficos para conferência das variáveis, na resolução escolhida
+            resolution = st.radio(
+                "Resolução dos gráficos:",
+                ['10min', 'hora', 'dia'],
+                format_func={'10min': '10 minutos', 'hora': 'Horária', 'dia': 'Diária'}.get,
+                horizontal=True,
+                key="preview_resolution"
+            )
+            self._create_variable_charts(self.consolidated_data.resampled(resolution).reset_index())
             
             # Preview da tabela de dados
             st.markdown("#### Preview dos Dados (Primeiros 100 registros)")
@@ -976,6 +1792,47 @@ class ExactWeatherProcessor:
         else:
             st.info("Nenhum dado disponível para preview.")
 
+    def _create_completeness_heatmap(self):
+        """Mapa de calor da completude por dia e hora do mês escolhido"""
+        coverage = self.consolidated_data.coverage
+        covered_months = coverage.months()
+        if not covered_months:
+            return
+        
+        st.markdown("#### Completude dos Dados")
+        year, month = st.selectbox(
+            "Mês:",
+            covered_months,
+            index=len(covered_months) - 1,
+            format_func=lambda key: f"{key[1]:02d}/{key[0]}",
+            key="coverage_month"
+        )
+        
+        grid = coverage.completeness(year, month) * 100
+        counts = [[coverage.hour_count(year, month, day, hour) for hour in range(24)]
+                  for day in range(1, grid.shape[0] + 1)]
+        fig = go.Figure(data=go.Heatmap(
+            z=grid,
+            x=[f"{hour:02d}:00" for hour in range(24)],
+            y=list(range(1, grid.shape[0] + 1)),
+            zmin=0,
+            zmax=100,
+            colorscale='RdYlGn',
+            colorbar=dict(title='%'),
+            customdata=counts,
+            hovertemplate='Dia %{y} %{x}<br>Completude: %{z:.0f}%<br>Registros: %{customdata}<extra></extra>'
+        ))
+        fig.update_layout(
+            title=f"Registros recebidos / esperados pelo intervalo de gravação - {month:02d}/{year}",
+            xaxis_title="Hora",
+            yaxis_title="Dia",
+            yaxis=dict(autorange='reversed'),
+            height=600
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Completude do mês: {coverage.month_completeness(year, month):.1%} "
+                   f"({coverage.month_count(year, month):,} registros)")
+
     def _create_variable_charts(self, df):
         """Cria gráficos para conferência das variáveis meteorológicas"""
         st.markdown("#### Gráficos de Conferência das Variáveis")
@@ -1152,7 +2009,6 @@ class ExactWeatherProcessor:
             start_col = col_info['start_col']
             start_row, end_row = col_info['rows']
             
-            from openpyxl.utils import column_index_from_string
             start_col_num = column_index_from_string(start_col)
             
             # Ler dados de cada dia
@@ -1230,6 +2086,17 @@ class ExactWeatherProcessor:
         st.markdown('<div class="dashboard-filters">', unsafe_allow_html=True)
         st.markdown("### 🔧 Filtros de Análise")
         
+        # Estação analisada (quando o lote tem mais de uma)
+        stations = self.stations()
+        if len(stations) > 1:
+            station = st.selectbox(
+                "Estação:",
+                options=stations,
+                index=stations.index(self.station) if self.station in stations else 0,
+                key="dashboard_station"
+            )
+            self.select_station(station)
+        
         col1, col2 = st.columns([2, 1])
         
         with col1:
@@ -1240,8 +2107,7 @@ class ExactWeatherProcessor:
             
             # Meses dos dados consolidados
             if self.consolidated_data:
-                for timestamp in self.consolidated_data.keys():
-                    available_months.add(timestamp.month)
+                available_months.update(month for _, month, _, _ in self.consolidated_data.month_slices())
             
             # Meses do Excel
             if excel_data:
@@ -1308,40 +2174,45 @@ class ExactWeatherProcessor:
             st.warning("Dados consolidados não disponíveis para análise diária.")
             return
         
-        # Filtrar dados pelos meses selecionados
-        filtered_data = []
-        for timestamp, data in self.consolidated_data.items():
-            if timestamp.month in selected_months:
-                row = {'Timestamp': timestamp}
-                row.update(data)
-                filtered_data.append(row)
-        
-        if not filtered_data:
+        # Filtrar dados pelos meses selecionados (fatias mensais da série, já ordenadas)
+        store = self.consolidated_data
+        selected_slices = [
+            (year, month, start, stop)
+            for year, month, start, stop in store.month_slices()
+            if month in selected_months
+        ]
+        
+        if not selected_slices:
             st.warning("Nenhum dado encontrado para os meses selecionados.")
             return
         
-        df_filtered = pd.DataFrame(filtered_data)
-        df_filtered = df_filtered.sort_values('Timestamp')
+        df_filtered = pd.concat([
+            store.resampled('10min', start, stop) for _, _, start, stop in selected_slices
+        ]).reset_index()
         
-        # Estatísticas resumidas
+        # Estatísticas resumidas: registros da visão de 10 minutos exibida na tabela e nos gráficos
+        total_records = len(df_filtered)
+        first_timestamp = store.index[selected_slices[0][2]]
+        last_timestamp = store.index[selected_slices[-1][3] - 1]
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total de Registros", f"{len(df_filtered):,}")
+            st.metric("Total de Registros", f"{total_records:,}")
         with col2:
-            period_days = (df_filtered['Timestamp'].max() - df_filtered['Timestamp'].min()).days + 1
+            period_days = (last_timestamp - first_timestamp).days + 1
             st.metric("Período (dias)", period_days)
         with col3:
-            avg_records_per_day = len(df_filtered) / period_days if period_days > 0 else 0
+            avg_records_per_day = total_records / period_days if period_days > 0 else 0
             st.metric("Registros/Dia", f"{avg_records_per_day:.1f}")
         with col4:
-            months_count = df_filtered['Timestamp'].dt.month.nunique()
+            months_count = len({month for _, month, _, _ in selected_slices})
             st.metric("Meses Analisados", months_count)
         
-        # Gráficos combinados para múltiplos meses
-        self._create_combined_daily_charts(df_filtered, selected_months)
+        # Gráficos combinados para múltiplos meses (médias por hora a partir da grade horária)
+        cubes = [self._snapshot_cube(store, year, month) for year, month, _, _ in selected_slices]
+        self._create_combined_daily_charts(df_filtered, selected_months, cubes)
 
-    def _create_combined_daily_charts(self, df, selected_months):
+    def _create_combined_daily_charts(self, df, selected_months, cubes):
         """Cria gráficos combinados para análise diária"""
         df_clean = df.dropna()
         
@@ -1437,11 +2308,13 @@ class ExactWeatherProcessor:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown("#### ⏰ Padrões Diários - Médias por Hora")
         
-        df_hourly = df_clean.copy()
-        df_hourly['Hora'] = df_hourly['Timestamp'].dt.hour
-        
-        # Calcular médias por hora para cada mês
-        hourly_stats = df_hourly.groupby(['Hora', 'Mes_Nome'])[['Temperatura', 'Umidade_Relativa', 'Velocidade_Vento']].mean().reset_index()
+        # Médias por hora de cada mês sobre os valores horários das abas diárias (grade horária)
+        month_names = {1: 'JAN', 2: 'FEV', 3: 'MAR', 4: 'ABR', 5: 'MAI', 6: 'JUN',
+                       7: 'JUL', 8: 'AGO', 9: 'SET', 10: 'OUT', 11: 'NOV', 12: 'DEZ'}
+        hourly_stats = pd.concat([
+            cube.hourly_means().assign(Mes_Nome=month_names[cube.month]).reset_index()
+            for cube in cubes if cube is not None
+        ]).groupby(['Hora', 'Mes_Nome'])[['Temperatura', 'Umidade_Relativa', 'Velocidade_Vento']].mean().reset_index()
         
         fig_hourly = px.line(hourly_stats, x='Hora', y='Temperatura', 
                            color='Mes_Nome',
@@ -1595,6 +2468,12 @@ class ExactWeatherProcessor:
         st.markdown('</div>', unsafe_allow_html=True)
 
 
+def _session_id():
+    """Identificador da sessão do Streamlit ('local' fora do servidor)"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'local'
+
+
 def main():
     # Cabeçalho principal com logo da CSN
     st.markdown("""
@@ -1619,6 +2498,15 @@ def main():
     if 'processing_completed' not in st.session_state:
         st.session_state.processing_completed = False
     
+    # Orçamento de memória: registrar uso da sessão (pode liberar sessões ociosas)
+    session_id = _session_id()
+    memory_usage = session_memory.track(session_id, st.session_state.processor)
+    if st.session_state.processor.evicted:
+        st.warning("Os dados desta sessão foram liberados por inatividade para economizar memória do servidor. "
+                   "Processe os arquivos novamente (os meses do histórico local são recarregados).")
+        st.session_state.processor.evicted = False
+        st.session_state.processing_completed = False
+    
     # Sidebar com instruções
     with st.sidebar:
         st.markdown("### Instruções de Uso")
@@ -1638,7 +2526,8 @@ def main():
         st.markdown("### Funcionalidades")
         st.markdown("""
         **Características:**
-        - Busca pontual de dados (sem médias)
+        - Busca pontual de dados: valores exatos para loggers de 10/15 min
+        - Loggers de 1/5 min: médias de 10 minutos
         - Tolerância de ±10 minutos
         - Zero inferências ou preenchimentos
         - Detecção de conflitos entre arquivos
@@ -1667,6 +2556,53 @@ def main():
         - 🎯 Comparativos de outliers
         - ⏰ Padrões diários e sazonais
         """)
+        
+        st.markdown("---")
+        st.markdown("### Cache de Arquivos .dat")
+        parse_cache = get_parse_cache()
+        cache_stats = parse_cache.stats()
+        st.markdown(f"""
+        - Arquivos em cache: **{cache_stats['arquivos']}**
+        - Uso: **{cache_stats['tamanho'] / 1024 / 1024:.1f} MB** de {cache_stats['limite'] / 1024 / 1024:.0f} MB
+        """)
+        if st.button("Limpar Cache", key="clear_parse_cache", use_container_width=True):
+            parse_cache.clear()
+            st.success("Cache limpo!")
+        
+        st.markdown("---")
+        st.markdown("### Histórico Local")
+        use_history = st.checkbox(
+            "Usar histórico local",
+            value=False,
+            key="use_history",
+            help="Guarda as medições consolidadas em disco (partições por ano-mês) e completa "
+                 "os meses tocados com os dados de sessões anteriores. A pasta do histórico é do "
+                 "servidor (MEDICOES_HISTORY_DIR) e é a mesma para todos os usuários desta instalação"
+        )
+        history = get_history_store()
+        history_stats = history.stats()
+        if history_stats['meses'] > 0:
+            st.markdown(f"""
+            - Meses no histórico: **{history_stats['meses']}** ({history_stats['primeiro']} a {history_stats['ultimo']})
+            - Estações: **{history_stats['estacoes']}**
+            - Uso: **{history_stats['tamanho'] / 1024 / 1024:.1f} MB**
+            """)
+        else:
+            st.markdown("- Histórico vazio")
+        if st.button("Limpar Histórico", key="clear_history", use_container_width=True):
+            history.clear()
+            st.success("Histórico limpo!")
+    
+        st.markdown("---")
+        st.markdown("### Memória")
+        st.markdown(f"""
+        - Sessão: **{memory_usage['sessao_memoria'] / 1024 / 1024:.1f} MB** de {memory_usage['sessao_limite'] / 1024 / 1024:.0f} MB
+        - Em disco (mapeado): **{memory_usage['sessao_disco'] / 1024 / 1024:.1f} MB**
+        - Servidor: **{memory_usage['global_memoria'] / 1024 / 1024:.1f} MB** de {memory_usage['global_limite'] / 1024 / 1024:.0f} MB ({memory_usage['sessoes']} sessão(ões))
+        - Compartilhado entre sessões: **{memory_usage['compartilhada'] / 1024 / 1024:.1f} MB** ({memory_usage['conjuntos_compartilhados']} conjunto(s) de dados)
+        """)
+    
+    st.session_state.processor.history = get_history_store() if use_history else None
     
     # Layout principal
     col1, col2 = st.columns([1, 1])
@@ -1683,9 +2619,11 @@ def main():
         st.markdown("### Upload dos Arquivos .dat")
         dat_files = st.file_uploader(
             "Selecione os arquivos .dat (múltiplos)",
-            type=['dat'],
+            type=['dat', 'zip', 'gz'],
             accept_multiple_files=True,
-            help="Arquivos de dados meteorológicos (.dat) com timestamps de 10 em 10 minutos"
+            help="Arquivos de dados meteorológicos (.dat) gravados a cada 1, 5, 10 ou 15 minutos "
+                 "(o intervalo é detectado por arquivo; dados mais frequentes viram médias de 10 min). "
+                 "Também aceita .zip com vários .dat e .dat.gz"
         )
     
     # Informações sobre os arquivos carregados
@@ -1705,22 +2643,89 @@ def main():
         st.markdown("---")
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
+            incremental_mode = st.checkbox(
+                "Modo incremental (ler apenas registros novos)",
+                key="incremental_mode",
+                help="Pula os registros já processados, pela marca de RECORD/TIMESTAMP de cada "
+                     "estação, logger e tabela. Com o histórico local ativo, as marcas ficam gravadas "
+                     "junto com ele e valem entre sessões; sem histórico, valem só nesta sessão"
+            )
+            all_history_months = st.checkbox(
+                "Preencher todos os meses do histórico",
+                key="all_history_months",
+                help="Além dos meses dos arquivos enviados, preenche no Excel todos os meses "
+                     "guardados no histórico local"
+            )
+            true_extremes = st.checkbox(
+                "Extremos reais e desvio padrão nas abas mensais",
+                key="true_extremes",
+                help="Min/Max das abas mensais a partir dos canais Min/Max do logger (em vez do "
+                     "mínimo/máximo das médias de 10 minutos) e desvio padrão do dia na coluna de "
+                     "desvio da variável (coluna seguinte a Outliers com cabeçalho \"Desv\" ou "
+                     "\"Std\"); sem essa coluna na aba, o desvio não é gravado"
+            )
+            conflict_policy = st.selectbox(
+                "Política de conflitos (timestamps repetidos)",
+                options=list(CONFLICT_POLICIES),
+                format_func=lambda policy: CONFLICT_POLICIES[policy].label,
+                key="conflict_policy"
+            )
+            daily_template = st.selectbox(
+                "Grade das abas diárias",
+                options=[AUTO_DAILY_TEMPLATE] + list(DAILY_SHEET_TEMPLATES),
+                format_func=lambda key: ("Automática (horários da coluna A)" if key == AUTO_DAILY_TEMPLATE
+                                         else DAILY_SHEET_TEMPLATES[key].label),
+                key="daily_template"
+            )
+            snapping_policy = st.selectbox(
+                "Alinhamento das abas diárias (registro usado em cada horário)",
+                options=list(SNAPPING_POLICIES),
+                format_func=lambda policy: SNAPPING_POLICIES[policy].label,
+                key="snapping_policy"
+            )
+            with st.expander("Tolerância por variável (minutos)"):
+                snapping_tolerances = {
+                    name: st.number_input(name, min_value=0, max_value=60, value=10, step=1,
+                                          key=f"snapping_tolerance_{name}")
+                    for name, _, _ in st.session_state.processor.variable_scaling.values()
+                }
+            # Várias estações no lote: todas são consolidadas, o Excel recebe a escolhida
+            upload_stations = st.session_state.processor.stations_in_uploads(dat_files)
+            excel_station = None
+            if len(upload_stations) > 1:
+                excel_station = st.selectbox(
+                    "Estação para o Excel",
+                    options=upload_stations,
+                    key="excel_station",
+                    help="Os arquivos de cada estação são consolidados separadamente; "
+                         "o Excel anual é preenchido com a estação escolhida"
+                )
+            elif upload_stations:
+                excel_station = upload_stations[0]
             if st.button("Processar Dados - Atualizar Excel", use_container_width=True):
-                with st.spinner("Processando dados com busca pontual..."):
+                with st.spinner("Processando dados com busca pontual..."), session_memory.busy(session_id):
+                    st.session_state.processor.snapping_policy = snapping_policy
+                    st.session_state.processor.snapping_tolerances = snapping_tolerances
+                    st.session_state.processor.daily_template = daily_template
                     # Processar arquivos .dat
-                    success = st.session_state.processor.process_dat_files(dat_files)
+                    success = st.session_state.processor.process_dat_files(
+                        dat_files, incremental=incremental_mode, policy=conflict_policy
+                    )
                     
                     if success:
                         st.success("Arquivos .dat processados e consolidados com sucesso!")
                         
-                        # Mostrar preview dos dados com gráficos
-                        st.session_state.processor.show_data_preview_and_charts()
-                        
                         # Atualizar Excel
                         st.markdown("### Atualizando Excel ...")
                         excel_file.seek(0)  # Reset file pointer
-                        success, message = st.session_state.processor.update_excel_file(excel_file)
+                        success, message = st.session_state.processor.update_excel_file(
+                            excel_file, all_history_months=all_history_months, station=excel_station,
+                            true_extremes=true_extremes
+                        )
                         
+                        for warning in st.session_state.processor.daily_template_warnings:
+                            st.warning(warning)
+
                         if success:
                             st.success(f"{message}")
                             
@@ -1730,6 +2735,13 @@ def main():
                                 for sheet in st.session_state.processor.processed_sheets:
                                     st.markdown(f"- {sheet}")
                             
+                            # Resultado do alinhamento das abas diárias
+                            if st.session_state.processor.snapping_report is not None:
+                                st.markdown("### Alinhamento das Abas Diárias")
+                                st.dataframe(st.session_state.processor.snapping_report, use_container_width=True)
+                                st.caption("Horários preenchidos, preenchidos com registro fora do horário "
+                                           "exato e vazios (sem registro na tolerância), por variável")
+                            
                             # Botão de download
                             st.markdown("### Download do Arquivo Atualizado")
                             updated_excel = st.session_state.processor.get_updated_excel_file()
@@ -1750,6 +2762,20 @@ def main():
                     else:
                         st.error("Erro ao processar arquivos .dat")
     
+    # Preview dos dados com gráficos (fora do botão: o mês do mapa de completude e a resolução
+    # dos gráficos disparam reruns)
+    if st.session_state.processing_completed:
+        st.session_state.processor.show_data_preview_and_charts()
+    
+    # Conflitos da última consolidação (fora do botão para a paginação sobreviver aos reruns)
+    if len(st.session_state.processor.conflicts_detected) > 0:
+        st.session_state.processor.show_conflicts()
+    
+    # Exportação dos dados consolidados (fora do botão para sobreviver aos reruns)
+    if st.session_state.processing_completed:
+        st.session_state.processor.show_export()
+        st.session_state.processor.show_provenance()
+    
     # Exibir Dashboard automaticamente se processamento foi concluído
     if st.session_state.processing_completed and st.session_state.processor.consolidated_data:
         st.markdown("---")
@@ -1771,7 +2797,7 @@ def main():
         if not dat_files:
             st.markdown("""
             **Sobre o Processamento Automático:**
-            - **Análise Diária:** Busca pontual com tolerância ±10min
+            - **Análise Diária:** Busca pontual com tolerância ±10min (valores exatos de loggers de 10/15 min; médias de 10 min para loggers de 1/5 min)
             - **Análise Mensal:** Estatísticas diárias automáticas (Min/Max/Avg/Outliers)
             - Detecta automaticamente tipo de aba (Diária vs Mensal)
             - Processa 9 variáveis meteorológicas
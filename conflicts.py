@@ -0,0 +1,159 @@
+"""
+Resolução e registro de conflitos de timestamp entre arquivos .dat
+
+Cada conflito ocupa uma linha com o timestamp, o arquivo que tinha o valor anterior, o arquivo
+que chegou depois, se o valor foi substituído e uma máscara de quais variáveis diferem. Os blocos
+ficam em arrays NumPy e só viram DataFrame página a página, na exibição.
+
+A escolha de qual registro prevalece é feita por uma política (CONFLICT_POLICIES), aplicada em
+uma única passada vetorizada sobre todas as repetições de um arquivo ou bloco.
+"""
+import numpy as np
+import pandas as pd
+
+# Valor anterior já estava consolidado antes deste processamento
+PREVIOUS_DATA_ID = -1
+PREVIOUS_DATA_LABEL = 'dados_anteriores'
+
+# Conflitos por página na exibição
+PAGE_SIZE = 50
+
+
+class ConflictPolicy:
+    """
+    Política de resolução: o registro de maior prioridade prevalece
+    
+    priority recebe os atributos das linhas ('sequencia', 'record', 'recente', 'preenchidos')
+    e retorna um array int64. Em empate, replace_on_tie decide se a linha que chega depois vence.
+    needs_file_end indica que a prioridade depende do último TIMESTAMP do arquivo inteiro.
+    """
+
+    def __init__(self, label, priority, replace_on_tie, needs_file_end=False):
+        self.label = label
+        self.priority = priority
+        self.replace_on_tie = replace_on_tie
+        self.needs_file_end = needs_file_end
+
+
+CONFLICT_POLICIES = {
+    'ultimo_arquivo': ConflictPolicy(
+        'Último arquivo processado prevalece', lambda rows: rows['sequencia'], True),
+    'primeiro_arquivo': ConflictPolicy(
+        'Primeiro arquivo processado prevalece', lambda rows: -rows['sequencia'], False),
+    'maior_record': ConflictPolicy(
+        'Maior número de RECORD prevalece', lambda rows: rows['record'], True),
+    'arquivo_recente': ConflictPolicy(
+        'Arquivo mais recente (último TIMESTAMP) prevalece', lambda rows: rows['recente'], True,
+        needs_file_end=True),
+    'mais_preenchido': ConflictPolicy(
+        'Registro com mais canais preenchidos prevalece', lambda rows: rows['preenchidos'], True)
+}
+DEFAULT_POLICY = 'ultimo_arquivo'
+
+
+def resolve_duplicates(group_codes, priority, replace_on_tie):
+    """
+    Resolve timestamps repetidos em uma passada, respeitando a ordem das linhas
+    
+    Equivale a processar as linhas uma a uma, mantendo para cada timestamp o registro de
+    maior prioridade visto até o momento.
+    
+    Returns:
+        (holder_before, took_over, is_final): linha que detinha o timestamp antes de cada
+        linha (-1 se nenhuma), máscara das linhas que passaram a detê-lo e máscara das
+        linhas que prevalecem ao final
+    """
+    n_rows = len(group_codes)
+    position = np.arange(n_rows)
+    
+    # Posição global de cada linha na ordenação (prioridade, desempate) - maior vence
+    order = np.lexsort((position if replace_on_tie else -position, priority))
+    rank = np.empty(n_rows, dtype=np.int64)
+    rank[order] = position
+    
+    holder_rank = pd.Series(rank).groupby(group_codes).cummax()
+    before = holder_rank.groupby(group_codes).shift(1).to_numpy()
+    has_holder = ~np.isnan(before)
+    
+    holder_before = np.full(n_rows, -1, dtype=np.int64)
+    holder_before[has_holder] = order[before[has_holder].astype(np.int64)]
+    took_over = holder_rank.to_numpy() == rank
+    is_final = holder_rank.groupby(group_codes).transform('max').to_numpy() == rank
+    return holder_before, took_over, is_final
+
+
+class ConflictTable:
+    """Conflitos detectados em um processamento, armazenados em colunas"""
+
+    def __init__(self, variables, policy=DEFAULT_POLICY):
+        self.variables = list(variables)
+        self.policy = policy
+        self.files = []
+        self._blocks = []
+
+    def add_file(self, name):
+        """Registra um arquivo de origem e retorna seu id"""
+        self.files.append(name)
+        return len(self.files) - 1
+
+    def file_name(self, file_id):
+        return PREVIOUS_DATA_LABEL if file_id == PREVIOUS_DATA_ID else self.files[file_id]
+
+    def append(self, timestamps, previous_ids, current_ids, replaced, changed):
+        """Acrescenta um bloco de conflitos (changed: matriz conflitos × variáveis)"""
+        if len(timestamps) == 0:
+            return
+        self._blocks.append((
+            np.asarray(timestamps, dtype='datetime64[ns]'),
+            np.asarray(previous_ids, dtype=np.int32),
+            np.asarray(current_ids, dtype=np.int32),
+            np.asarray(replaced, dtype=bool),
+            np.asarray(changed, dtype=bool)
+        ))
+
+    def _columns(self):
+        """Colunas concatenadas (os blocos são unidos uma única vez, sob demanda)"""
+        if not self._blocks:
+            return (np.empty(0, dtype='datetime64[ns]'), np.empty(0, dtype=np.int32),
+                    np.empty(0, dtype=np.int32), np.empty(0, dtype=bool),
+                    np.empty((0, len(self.variables)), dtype=bool))
+        if len(self._blocks) > 1:
+            self._blocks = [tuple(np.concatenate(parts) for parts in zip(*self._blocks))]
+        return self._blocks[0]
+
+    def __len__(self):
+        return sum(len(block[0]) for block in self._blocks)
+
+    def nbytes(self):
+        return sum(column.nbytes for block in self._blocks for column in block)
+
+    def changed_counts(self):
+        """Quantidade de valores alterados pela política, por variável"""
+        _, _, _, replaced, changed = self._columns()
+        return dict(zip(self.variables, changed[replaced].sum(axis=0).tolist()))
+
+    def summary(self):
+        """Resumo da política aplicada: conflitos, substituições e valores alterados/mantidos"""
+        _, _, _, replaced, changed = self._columns()
+        return {
+            'politica': self.policy,
+            'conflitos': len(replaced),
+            'substituidos': int(replaced.sum()),
+            'valores_alterados': int(changed[replaced].sum()),
+            'valores_mantidos': int(changed[~replaced].sum())
+        }
+
+    def page(self, start, stop):
+        """DataFrame de exibição apenas para as linhas [start, stop)"""
+        timestamps, previous_ids, current_ids, replaced, changed = (
+            column[start:stop] for column in self._columns()
+        )
+        page = pd.DataFrame({
+            'Timestamp': timestamps,
+            'Arquivo Anterior': [self.file_name(file_id) for file_id in previous_ids.tolist()],
+            'Arquivo Atual': [self.file_name(file_id) for file_id in current_ids.tolist()],
+            'Substituído': replaced
+        }, index=pd.RangeIndex(start + 1, start + 1 + len(timestamps), name='Conflito'))
+        for i, name in enumerate(self.variables):
+            page[name] = changed[:, i]
+        return page
@@ -0,0 +1,126 @@
+"""
+Estatísticas diárias da série consolidada (Min/Max/Avg/Outliers por variável)
+
+As mesmas estatísticas das abas "Analise Mensal", calculadas sobre a visão de 10 minutos
+de cada mês: mínimo, máximo e média por dia com np.*.reduceat sobre as fatias diárias do
+índice ordenado, e outliers pela fórmula das planilhas.
+
+Com os canais Min/Max/Std do logger, cada dia também tem os extremos reais (menor Min e maior
+Max registrados, não o extremo das médias) e o desvio padrão do dia combinado a partir do
+Avg e do Std de cada intervalo: var = média(Std² + Avg²) - média(Avg)², todos os intervalos
+do dia com o mesmo peso.
+"""
+import numpy as np
+import pandas as pd
+
+STATISTICS = ['Min', 'Max', 'Avg', 'N', 'Outliers']
+EXTREME_STATISTICS = ['Min_Real', 'Max_Real', 'Std']
+
+
+def count_outliers(values):
+    """Quantidade de valores fora de média ± 1,5 × IQR (fórmula das abas mensais)"""
+    if len(values) < 2:
+        return 0
+
+    values = np.asarray(values, dtype=np.float64)
+    q1 = np.percentile(values, 25)
+    q3 = np.percentile(values, 75)
+    iqr = q3 - q1
+    mean_val = np.mean(values)
+    return int(np.sum((values < mean_val - 1.5 * iqr) | (values > mean_val + 1.5 * iqr)))
+
+
+def _day_statistics(month_data):
+    """Estatísticas de cada dia de um mês (DataFrame da visão de 10 minutos)"""
+    days = month_data.index.normalize()
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    stops = np.r_[starts[1:], len(days)]
+    values = month_data.to_numpy()
+
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        columns = {
+            'Min': np.fmin.reduceat(values, starts, axis=0),
+            'Max': np.fmax.reduceat(values, starts, axis=0),
+            'Avg': sums / counts,
+            'N': counts
+        }
+
+    outliers = np.zeros(counts.shape, dtype=np.int64)
+    for day, (start, stop) in enumerate(zip(starts.tolist(), stops.tolist())):
+        for i in range(values.shape[1]):
+            column = values[start:stop, i]
+            outliers[day, i] = count_outliers(column[valid[start:stop, i]])
+    columns['Outliers'] = outliers
+
+    frame = pd.DataFrame(
+        {f"{variable}_{name}": columns[name][:, i]
+         for i, variable in enumerate(month_data.columns) for name in STATISTICS},
+        index=pd.DatetimeIndex(days[starts], name='Data')
+    )
+    return frame
+
+
+def extreme_variables(store):
+    """Variáveis da série com os três canais Min/Max/Std"""
+    return [variable for variable in store.variables
+            if all(f"{variable}_{name}" in store.statistics for name in ('Min', 'Max', 'Std'))]
+
+
+def day_extremes(store, start=0, stop=None):
+    """
+    Extremos reais e desvio padrão combinado de cada dia do intervalo [start, stop) da série
+
+    Calculado sobre as linhas na resolução original, com os canais estatísticos do logger.
+
+    Returns:
+        DataFrame indexado por 'Data', colunas '<variável>_<Min_Real|Max_Real|Std>'
+    """
+    stop = len(store) if stop is None else stop
+    variables = extreme_variables(store)
+    days = store.index[start:stop].to_numpy().astype('datetime64[D]')
+    if len(days) == 0 or not variables:
+        return pd.DataFrame(columns=[f"{variable}_{name}" for variable in variables for name in EXTREME_STATISTICS],
+                            index=pd.DatetimeIndex([], name='Data'))
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+
+    columns = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for variable in variables:
+            minimums = store.statistic(f"{variable}_Min")[start:stop].astype(np.float64)
+            maximums = store.statistic(f"{variable}_Max")[start:stop].astype(np.float64)
+            means = store.column(variable)[start:stop]
+            deviations = store.statistic(f"{variable}_Std")[start:stop].astype(np.float64)
+
+            valid = ~(np.isnan(means) | np.isnan(deviations))
+            counts = np.add.reduceat(valid, starts)
+            mean_of_means = np.add.reduceat(np.where(valid, means, 0.0), starts) / counts
+            mean_of_squares = np.add.reduceat(np.where(valid, deviations ** 2 + means ** 2, 0.0), starts) / counts
+
+            columns[f"{variable}_Min_Real"] = np.fmin.reduceat(minimums, starts)
+            columns[f"{variable}_Max_Real"] = np.fmax.reduceat(maximums, starts)
+            columns[f"{variable}_Std"] = np.sqrt(np.maximum(mean_of_squares - mean_of_means ** 2, 0.0))
+
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(days[starts], name='Data'))
+
+
+def daily_statistics(store):
+    """
+    Estatísticas diárias de toda a série (uma linha por dia com dados)
+
+    Returns:
+        DataFrame indexado por 'Data', colunas '<variável>_<Min|Max|Avg|N|Outliers>' e, para as
+        variáveis com canais estatísticos, '<variável>_<Min_Real|Max_Real|Std>'
+    """
+    frames = [
+        _day_statistics(store.resampled('10min', start, stop)).join(day_extremes(store, start, stop))
+        for _, _, start, stop in store.month_slices()
+    ]
+    if not frames:
+        return pd.DataFrame(
+            columns=[f"{variable}_{name}" for variable in store.variables for name in STATISTICS],
+            index=pd.DatetimeIndex([], name='Data')
+        )
+    return pd.concat(frames)
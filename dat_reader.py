@@ -0,0 +1,840 @@
+"""
+Leitura de arquivos de dados do datalogger Campbell Scientific (formato TOA5)
+
+Arquivos binários TOB1/TOB3 são identificados pela primeira linha e lidos por tob_reader.
+
+O cabeçalho de 4 linhas do TOA5 descreve o arquivo:
+    linha 1: "TOA5", estação, modelo do logger, nº de série, versão do SO, programa, assinatura, tabela
+    linha 2: nomes dos campos
+    linha 3: unidades
+    linha 4: tipo de processamento (Min, Max, Avg, Std...)
+
+O esquema (nomes, tipos e formato do TIMESTAMP) é compilado uma única vez por assinatura de
+programa do logger e reaproveitado nos arquivos seguintes, sem inferência de tipos ou datas.
+
+Arquivos compactados (.zip e .dat.gz) são lidos em memória, sem extração para disco: cada
+arquivo .dat interno vira um membro independente, descompactado no próprio processo do pool.
+"""
+import csv
+import gzip
+import io
+import multiprocessing
+import os
+import struct
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from tob_reader import environment_metadata, is_tob, read_tob, read_tob_chunks
+
+# Formato fixo do TIMESTAMP gravado pelos loggers CR1000X
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+TIMESTAMP_FORMAT_FRACTIONAL = '%Y-%m-%d %H:%M:%S.%f'
+
+# Valores usados pelo logger para leituras inválidas
+NA_VALUES = ['NAN', '-NAN', 'NaN', '']
+
+# Campos fixos do TOA5
+TIMESTAMP_FIELD = 'TIMESTAMP'
+RECORD_FIELD = 'RECORD'
+
+HEADER_LINES = 4
+
+# Estação dos arquivos sem nome na linha 1 do cabeçalho
+UNKNOWN_STATION = 'Sem estação'
+
+# Estimativa de memória de trabalho por valor lido (texto, float64, temporários da normalização)
+BYTES_PER_VALUE_ESTIMATE = 40
+MIN_CHUNK_ROWS = 1000
+
+# Versão do leitor/normalização (alterar invalida o cache de arquivos já lidos)
+PARSER_VERSION = 'toa5-3'
+
+# Canais estatísticos gravados pelo logger junto com cada média (Temp_Avg → Temp_Min/Max/Std)
+AVERAGE_SUFFIX = '_Avg'
+STATISTIC_SUFFIXES = ('Min', 'Max', 'Std')
+
+# Cache de esquemas compilados por assinatura do programa do logger
+_SCHEMA_CACHE = {}
+
+# Extensões aceitas para arquivos compactados
+ZIP_EXTENSION = '.zip'
+GZIP_EXTENSION = '.gz'
+DATA_EXTENSION = '.dat'
+
+# Compressões que podem ser desfeitas nos processos do pool
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_DEFLATE = 'deflate'
+
+# Tamanho fixo do cabeçalho local de um membro ZIP (antes do nome e do campo extra)
+ZIP_LOCAL_HEADER_SIZE = 30
+
+# Janela final da busca binária por RECORD (lida linha a linha)
+SEEK_WINDOW_BYTES = 64 * 1024
+
+# Pool de processos compartilhado (criado sob demanda e reaproveitado entre execuções)
+_EXECUTOR = None
+
+
+class TOA5Schema:
+    """Esquema compilado de uma tabela TOA5 (nomes, unidades, processamento e tipos)"""
+
+    def __init__(self, signature, fields, units, processing):
+        self.signature = signature
+        self.fields = fields
+        self.units = dict(zip(fields, units))
+        self.processing = dict(zip(fields, processing))
+
+        # Mapa de tipos: TIMESTAMP lido como texto e convertido com formato fixo,
+        # RECORD inteiro e todos os demais canais float64
+        self.dtypes = {}
+        for field in fields:
+            if field == TIMESTAMP_FIELD:
+                self.dtypes[field] = str
+            elif field == RECORD_FIELD:
+                self.dtypes[field] = np.int64
+            else:
+                self.dtypes[field] = np.float64
+
+        # Definido no primeiro arquivo lido com este esquema
+        self.timestamp_format = None
+
+    def parse_timestamps(self, values):
+        """Converte a coluna TIMESTAMP usando o formato fixo do esquema"""
+        if self.timestamp_format is None:
+            sample = values.iloc[0] if len(values) > 0 else ''
+            self.timestamp_format = TIMESTAMP_FORMAT_FRACTIONAL if '.' in sample else TIMESTAMP_FORMAT
+        return pd.to_datetime(values, format=self.timestamp_format)
+
+
+def parse_header(header_lines):
+    """
+    Interpreta as 4 linhas de cabeçalho TOA5
+
+    Returns:
+        (metadata, fields, units, processing)
+    """
+    if len(header_lines) < HEADER_LINES:
+        raise ValueError("Cabeçalho TOA5 incompleto")
+
+    rows = [next(csv.reader([line])) if line.strip() else [] for line in header_lines[:HEADER_LINES]]
+    environment, fields, units, processing = rows
+
+    if not environment or environment[0] != 'TOA5':
+        raise ValueError("Arquivo não está no formato TOA5")
+
+    if TIMESTAMP_FIELD not in fields:
+        raise ValueError("Campo TIMESTAMP não encontrado no cabeçalho")
+
+    metadata = environment_metadata(environment, environment[7] if len(environment) > 7 else '')
+
+    units = units + [''] * (len(fields) - len(units))
+    processing = processing + [''] * (len(fields) - len(processing))
+
+    return metadata, fields, units[:len(fields)], processing[:len(fields)]
+
+
+def get_schema(metadata, fields, units, processing):
+    """Retorna o esquema compilado para a assinatura do programa, criando-o na primeira vez"""
+    signature = (
+        metadata['logger'],
+        metadata['programa'],
+        metadata['assinatura'],
+        metadata['tabela'],
+        tuple(fields)
+    )
+
+    schema = _SCHEMA_CACHE.get(signature)
+    if schema is None:
+        schema = TOA5Schema(signature, fields, units, processing)
+        _SCHEMA_CACHE[signature] = schema
+    return schema
+
+
+def read_header_lines(file_obj):
+    """Lê as linhas de cabeçalho deixando o arquivo posicionado no primeiro registro"""
+    lines = []
+    for _ in range(HEADER_LINES):
+        line = file_obj.readline()
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        lines.append(line.rstrip('\r\n'))
+    return lines
+
+
+def _open_toa5(file_obj):
+    """Lê o cabeçalho e devolve (metadata, schema, argumentos do read_csv)"""
+    file_obj.seek(0)
+    metadata, fields, units, processing = parse_header(read_header_lines(file_obj))
+    schema = get_schema(metadata, fields, units, processing)
+
+    csv_kwargs = {
+        'header': None,
+        'names': schema.fields,
+        'dtype': schema.dtypes,
+        'na_values': NA_VALUES,
+        'keep_default_na': False
+    }
+    return metadata, schema, csv_kwargs
+
+
+def new_rows_mask(records, timestamps, after):
+    """
+    Registros ainda não ingeridos em relação à marca (último RECORD, último TIMESTAMP)
+
+    Um registro é considerado já visto apenas se RECORD e TIMESTAMP não passam da marca,
+    assim um RECORD reiniciado pelo logger (com horário novo) não é descartado.
+    """
+    if after is None:
+        return np.ones(len(records), dtype=bool)
+    after_record, after_timestamp = after
+    seen = (np.asarray(records) <= after_record) & (np.asarray(timestamps) <= np.datetime64(after_timestamp, 'ns'))
+    return ~seen
+
+
+def _line_fields(line, record_index, timestamp_index):
+    """(RECORD, TIMESTAMP em texto) de uma linha de dados TOA5 (None se não for possível ler)"""
+    try:
+        row = next(csv.reader([line.decode('utf-8', errors='replace')]))
+        return int(row[record_index]), row[timestamp_index]
+    except (StopIteration, IndexError, ValueError):
+        return None
+
+
+def _seek_after_record(file_obj, schema, after):
+    """
+    Posiciona o arquivo no primeiro registro novo em relação à marca (último RECORD, último TIMESTAMP)
+
+    Busca binária pelo RECORD, por posição em bytes, lendo só uma linha por passo, sem passar
+    pelo parser. O salto só é aceito se os RECORDs lidos (primeiro, último, passos da busca e
+    trecho final) forem crescentes na ordem do arquivo e a última linha pulada não passar do
+    TIMESTAMP da marca. Um RECORD reiniciado no meio do arquivo faz a leitura começar do
+    início dos dados (os registros já vistos são descartados pela marca).
+    """
+    after_record, after_timestamp = after
+    record_index = schema.fields.index(RECORD_FIELD)
+    timestamp_index = schema.fields.index(TIMESTAMP_FIELD)
+    data_start = file_obj.tell()
+    end = file_obj.seek(0, os.SEEK_END)
+    # RECORDs lidos por posição: precisam ser crescentes para a busca valer
+    probes = []
+
+    def record_at(position):
+        # Primeira linha completa a partir de position: (início da linha, RECORD)
+        file_obj.seek(position)
+        if position > data_start:
+            file_obj.readline()
+        line_start = file_obj.tell()
+        line = file_obj.readline()
+        fields = _line_fields(line, record_index, timestamp_index) if line.strip() else None
+        if fields is None:
+            return line_start, None
+        probes.append((line_start, fields[0]))
+        return line_start, fields[0]
+
+    _, first_record = record_at(data_start)
+    _, last_record = record_at(max(data_start, end - SEEK_WINDOW_BYTES))
+    if first_record is None or last_record is None or first_record > last_record:
+        file_obj.seek(data_start)
+        return
+
+    low, high = data_start, end
+    while high - low > SEEK_WINDOW_BYTES:
+        middle = (low + high) // 2
+        line_start, record = record_at(middle)
+        if record is not None and record <= after_record and line_start < high:
+            low = line_start
+        else:
+            high = middle
+
+    # Trecho final: avançar linha a linha até o primeiro registro novo
+    file_obj.seek(low)
+    last_skipped = None
+    while True:
+        position = file_obj.tell()
+        line = file_obj.readline()
+        if not line.strip():
+            break
+        fields = _line_fields(line, record_index, timestamp_index)
+        if fields is None:
+            break
+        probes.append((position, fields[0]))
+        if fields[0] > after_record:
+            break
+        last_skipped = fields[1]
+
+    records = np.array([record for _, record in sorted(probes)])
+    monotonic = bool(np.all(records[1:] >= records[:-1]))
+    if last_skipped is not None and monotonic:
+        skipped_time = schema.parse_timestamps(pd.Series([last_skipped])).iloc[0]
+        monotonic = skipped_time <= pd.Timestamp(after_timestamp)
+    file_obj.seek(position if monotonic else data_start)
+
+
+def _can_seek_cheaply(file_obj):
+    """Arquivos em memória ou em disco (não vale para fluxos descompactados)"""
+    return isinstance(file_obj, (io.BytesIO, io.BufferedReader))
+
+
+def read_toa5(file_obj, after=None):
+    """
+    Lê um arquivo TOA5 usando os nomes de campo do próprio cabeçalho
+
+    Args:
+        file_obj: arquivo aberto (texto ou binário) ou UploadedFile do Streamlit
+        after: marca (último RECORD, último TIMESTAMP) já ingerida - os registros anteriores
+               são pulados sem leitura quando possível e descartados pela marca
+
+    Returns:
+        (data, metadata, schema) - DataFrame com TIMESTAMP já convertido
+    """
+    metadata, schema, csv_kwargs = _open_toa5(file_obj)
+
+    if after is not None and RECORD_FIELD in schema.fields and _can_seek_cheaply(file_obj):
+        _seek_after_record(file_obj, schema, after)
+
+    data = pd.read_csv(file_obj, **csv_kwargs)
+    data[TIMESTAMP_FIELD] = schema.parse_timestamps(data[TIMESTAMP_FIELD])
+
+    if after is not None:
+        data = data[new_rows_mask(record_numbers(data), data[TIMESTAMP_FIELD], after)].reset_index(drop=True)
+
+    return data, metadata, schema
+
+
+def record_numbers(data):
+    """Coluna RECORD como int64 (-1 quando o arquivo não tem o campo)"""
+    if RECORD_FIELD in data.columns:
+        return data[RECORD_FIELD].to_numpy(dtype=np.int64)
+    return np.full(len(data), -1, dtype=np.int64)
+
+
+def chunk_rows_for_budget(schema, budget_bytes):
+    """Número de registros por bloco para que a leitura caiba no orçamento de memória"""
+    bytes_per_row = len(schema.fields) * BYTES_PER_VALUE_ESTIMATE
+    return max(MIN_CHUNK_ROWS, int(budget_bytes // bytes_per_row))
+
+
+def read_toa5_chunks(file_obj, budget_bytes, after=None):
+    """
+    Lê um arquivo TOA5 em blocos de tamanho fixo
+
+    O tamanho do bloco é calculado a partir do orçamento de memória e do número de campos,
+    então o pico de memória da leitura não depende do tamanho do arquivo.
+
+    Yields:
+        (data, metadata, schema) para cada bloco, com TIMESTAMP já convertido
+    """
+    metadata, schema, csv_kwargs = _open_toa5(file_obj)
+    chunk_rows = chunk_rows_for_budget(schema, budget_bytes)
+
+    if after is not None and RECORD_FIELD in schema.fields and _can_seek_cheaply(file_obj):
+        _seek_after_record(file_obj, schema, after)
+
+    with pd.read_csv(file_obj, chunksize=chunk_rows, **csv_kwargs) as reader:
+        for data in reader:
+            data[TIMESTAMP_FIELD] = schema.parse_timestamps(data[TIMESTAMP_FIELD])
+            if after is not None:
+                data = data[new_rows_mask(record_numbers(data), data[TIMESTAMP_FIELD], after)]
+            yield data, metadata, schema
+
+
+def _as_file(source):
+    """Abre caminhos locais e envolve bytes para leitura como arquivo"""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb')
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+
+def _peek(source):
+    """Primeiros bytes do arquivo, para identificar o formato"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read(16)
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:16])
+    source.seek(0)
+    first = source.read(16)
+    source.seek(0)
+    return first.encode() if isinstance(first, str) else first
+
+
+def read_data_file(source, after=None):
+    """
+    Lê um arquivo de dados do logger em qualquer formato suportado (TOA5, TOB1, TOB3)
+
+    Args:
+        source: caminho local, bytes ou arquivo aberto/UploadedFile
+        after: marca (último RECORD, último TIMESTAMP) para leitura incremental
+
+    Returns:
+        (data, metadata, schema) com os mesmos nomes de campo em todos os formatos
+    """
+    if is_tob(_peek(source)):
+        return read_tob(source, after)
+    return read_toa5(_as_file(source), after)
+
+
+def read_data_chunks(source, budget_bytes, after=None):
+    """Lê um arquivo de dados em blocos limitados pelo orçamento de memória (qualquer formato)"""
+    if is_tob(_peek(source)):
+        return read_tob_chunks(source, budget_bytes, after)
+    return read_toa5_chunks(_as_file(source), budget_bytes, after)
+
+
+def last_timestamp(source, budget_bytes):
+    """
+    Último TIMESTAMP de um arquivo de dados, sem consolidá-lo
+
+    Arquivos TOA5 em memória ou em disco leem só o trecho final; os formatos binários e
+    os fluxos descompactados são percorridos em blocos.
+    """
+    if not is_tob(_peek(source)):
+        file_obj = _as_file(source)
+        _, schema, _ = _open_toa5(file_obj)
+        if _can_seek_cheaply(file_obj):
+            data_start = file_obj.tell()
+            end = file_obj.seek(0, os.SEEK_END)
+            window_start = max(data_start, end - SEEK_WINDOW_BYTES)
+            file_obj.seek(window_start)
+            lines = file_obj.read().splitlines()
+            if window_start > data_start:
+                lines = lines[1:]  # primeira linha do trecho pode estar incompleta
+            index = schema.fields.index(TIMESTAMP_FIELD)
+            values = [next(csv.reader([line.decode('utf-8', errors='replace')]))[index]
+                      for line in lines if line.strip()]
+            if values:
+                return schema.parse_timestamps(pd.Series(values)).max()
+
+    newest = None
+    for data, _, _ in read_data_chunks(source, budget_bytes):
+        if len(data) > 0:
+            chunk_newest = data[TIMESTAMP_FIELD].max()
+            newest = chunk_newest if newest is None else max(newest, chunk_newest)
+    return newest
+
+
+def peek_metadata(file_obj):
+    """
+    Metadados do arquivo (estação, logger, tabela...) lendo só as primeiras linhas
+
+    Usado para localizar a marca incremental antes de enviar o arquivo ao pool.
+    """
+    file_obj.seek(0)
+    lines = []
+    for _ in range(2):
+        line = file_obj.readline()
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.rstrip('\r\n')
+        lines.append(next(csv.reader([line])) if line else [])
+    file_obj.seek(0)
+
+    environment, second = lines
+    if environment and environment[0] == 'TOB3':
+        return environment_metadata(environment, second[0] if second else '')
+    return environment_metadata(environment, environment[7] if len(environment) > 7 else '')
+
+
+def station_name(metadata):
+    """Nome da estação da linha 1 do cabeçalho (arquivos sem nome ficam em UNKNOWN_STATION)"""
+    return (metadata or {}).get('estacao') or UNKNOWN_STATION
+
+
+def logger_table_key(metadata):
+    """Identifica a tabela de um logger para a marca incremental"""
+    return (metadata['estacao'], metadata['logger'], metadata['serie'], metadata['tabela'])
+
+
+class DataMember:
+    """
+    Arquivo de dados a processar: upload direto ou arquivo interno de um .zip/.gz
+
+    payload() devolve os bytes a enviar ao pool (possivelmente ainda compactados) e open()
+    devolve um arquivo legível com descompactação em fluxo, para a leitura em blocos.
+    Em um upload direto, open() devolve o próprio arquivo enviado (owns_reader=False).
+    """
+
+    def __init__(self, name, size, payload_func, open_func, owns_reader=True):
+        self.name = name
+        self.size = size
+        self._payload_func = payload_func
+        self._open_func = open_func
+        self.owns_reader = owns_reader
+
+    def payload(self):
+        """(conteúdo, compressão) - compressão None, 'gzip' ou 'deflate'"""
+        return self._payload_func()
+
+    def open(self):
+        return self._open_func()
+
+    @contextmanager
+    def reading(self):
+        """open() que fecha o leitor do .zip/.gz ao sair (o upload direto continua aberto)"""
+        reader = self.open()
+        try:
+            yield reader
+        finally:
+            if self.owns_reader:
+                reader.close()
+
+
+def _plain_member(uploaded_file):
+    """Upload .dat sem compressão"""
+    def payload():
+        uploaded_file.seek(0)
+        return uploaded_file.read(), None
+
+    def open_file():
+        uploaded_file.seek(0)
+        return uploaded_file
+
+    uploaded_file.seek(0, os.SEEK_END)
+    size = uploaded_file.tell()
+    uploaded_file.seek(0)
+    return DataMember(uploaded_file.name, size, payload, open_file, owns_reader=False)
+
+
+def _gzip_member(uploaded_file):
+    """Upload .dat.gz: descompactado no processo do pool"""
+    uploaded_file.seek(0)
+    compressed = uploaded_file.read()
+    if compressed[:2] != b'\x1f\x8b':
+        raise ValueError("Arquivo .gz inválido")
+
+    # ISIZE: tamanho descompactado (módulo 2^32) nos últimos 4 bytes
+    size = struct.unpack('<I', compressed[-4:])[0]
+    name = uploaded_file.name[:-len(GZIP_EXTENSION)]
+
+    return DataMember(
+        name,
+        size,
+        lambda: (compressed, COMPRESSION_GZIP),
+        lambda: gzip.GzipFile(fileobj=io.BytesIO(compressed))
+    )
+
+
+def _zip_members(uploaded_file):
+    """Arquivos .dat dentro de um .zip, lidos direto do buffer do upload"""
+    uploaded_file.seek(0)
+    buffer = uploaded_file.getvalue() if hasattr(uploaded_file, 'getvalue') else uploaded_file.read()
+    archive = zipfile.ZipFile(io.BytesIO(buffer))
+    members = []
+
+    for info in archive.infolist():
+        if info.is_dir() or not info.filename.lower().endswith(DATA_EXTENSION):
+            continue
+
+        def payload(info=info):
+            if info.flag_bits & 0x1 or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                # Criptografado ou outro método: descompactar aqui mesmo
+                return archive.read(info), None
+
+            # Dados compactados brutos do membro, descompactados no pool
+            offset = info.header_offset
+            name_len, extra_len = struct.unpack('<HH', buffer[offset + 26:offset + ZIP_LOCAL_HEADER_SIZE])
+            start = offset + ZIP_LOCAL_HEADER_SIZE + name_len + extra_len
+            raw = buffer[start:start + info.compress_size]
+            compression = COMPRESSION_DEFLATE if info.compress_type == zipfile.ZIP_DEFLATED else None
+            return raw, compression
+
+        members.append(DataMember(
+            f"{uploaded_file.name}/{info.filename}",
+            info.file_size,
+            payload,
+            lambda info=info: archive.open(info)
+        ))
+
+    if not members:
+        raise ValueError("Nenhum arquivo .dat encontrado no .zip")
+    return members
+
+
+def expand_uploads(uploaded_files):
+    """
+    Converte os uploads em membros de dados, abrindo .zip e .gz em memória
+
+    Returns:
+        (membros na ordem de upload, lista de (nome, mensagem) dos arquivos com erro)
+    """
+    members = []
+    errors = []
+    for uploaded_file in uploaded_files:
+        name = uploaded_file.name.lower()
+        try:
+            if name.endswith(ZIP_EXTENSION):
+                members.extend(_zip_members(uploaded_file))
+            elif name.endswith(GZIP_EXTENSION):
+                members.append(_gzip_member(uploaded_file))
+            else:
+                members.append(_plain_member(uploaded_file))
+        except Exception as e:
+            errors.append((uploaded_file.name, str(e)))
+    return members, errors
+
+
+def decompress(content, compression):
+    """Desfaz a compressão de um payload de DataMember"""
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(content)
+    if compression == COMPRESSION_DEFLATE:
+        return zlib.decompress(content, -zlib.MAX_WBITS)
+    return content
+
+
+def round_like_python(values, decimals):
+    """
+    Arredonda um array com o mesmo resultado do round() nativo do Python
+
+    np.round multiplica por 10^n antes de arredondar, o que pode mudar casos de empate
+    (ex: 2.675). Esses poucos valores são refeitos com round() para manter os resultados idênticos.
+    """
+    rounded = np.round(values, decimals)
+    scaled = np.abs(values * 10.0 ** decimals)
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    near_tie |= scaled >= 2.0 ** 52
+
+    for pos in np.flatnonzero(near_tie & ~np.isnan(values)):
+        rounded[pos] = round(float(values[pos]), decimals)
+
+    return rounded
+
+
+def statistic_channels(variable_scaling):
+    """
+    Canais Min/Max/Std de cada média do mapeamento, com a mesma escala e arredondamento
+
+    Returns:
+        {canal .dat: (variável estatística, divisor, casas decimais)} - ex: 'Temp_Max' → 'Temperatura_Max'
+    """
+    channels = {}
+    for source_col, (variable, divisor, decimals) in variable_scaling.items():
+        if not source_col.endswith(AVERAGE_SUFFIX):
+            continue
+        prefix = source_col[:-len(AVERAGE_SUFFIX)]
+        for statistic in STATISTIC_SUFFIXES:
+            channels[f"{prefix}_{statistic}"] = (f"{variable}_{statistic}", divisor, decimals)
+    return channels
+
+
+def normalize_channels(data, variable_scaling):
+    """
+    Escala e arredonda todos os canais em uma única passada vetorizada
+
+    Os canais Min/Max/Std das médias (ver statistic_channels) entram na mesma passada; os que
+    o arquivo não tiver são simplesmente omitidos.
+
+    Args:
+        data: DataFrame lido por read_toa5
+        variable_scaling: {canal .dat: (variável, divisor, casas decimais)}
+
+    Returns:
+        {variável: array float64 (float32 nos canais estatísticos) com NaN para dados ausentes}
+    """
+    missing_fields = [field for field in variable_scaling if field not in data.columns]
+    if missing_fields:
+        raise ValueError(f"Canais ausentes no arquivo: {', '.join(missing_fields)}")
+
+    variables = {}
+    for source_col, (variable, divisor, decimals) in variable_scaling.items():
+        values = data[source_col].to_numpy(dtype=float)
+        if divisor != 1:
+            values = values / divisor
+        variables[variable] = round_like_python(values, decimals)
+
+    # Canais estatísticos: guardados em float32, o desempate exato do round() não se aplica
+    for source_col, (variable, divisor, decimals) in statistic_channels(variable_scaling).items():
+        if source_col in data.columns:
+            values = data[source_col].to_numpy(dtype=float)
+            if divisor != 1:
+                values = values / divisor
+            variables[variable] = np.round(values, decimals).astype(np.float32)
+    return variables
+
+
+def parse_and_normalize(name, content, variable_scaling, compression=None, after=None):
+    """
+    Lê e normaliza um arquivo .dat (executado nos processos do pool)
+
+    Com after, apenas os registros posteriores à marca incremental são lidos.
+    Erros são devolvidos no resultado para não interromper os demais arquivos.
+    """
+    try:
+        data, metadata, schema = read_data_file(decompress(content, compression), after)
+        if data.empty and after is None:
+            raise ValueError("Arquivo sem registros")
+        return {
+            'arquivo': name,
+            'timestamps': data[TIMESTAMP_FIELD].to_numpy(),
+            'records': record_numbers(data),
+            'variables': normalize_channels(data, variable_scaling),
+            'metadata': metadata,
+            'erro': None
+        }
+    except Exception as e:
+        return error_result(name, str(e))
+
+
+def error_result(name, message):
+    """Resultado de um arquivo que não pôde ser lido"""
+    return {
+        'arquivo': name,
+        'timestamps': None,
+        'records': None,
+        'variables': None,
+        'metadata': None,
+        'erro': message
+    }
+
+
+def filter_result(result, after):
+    """Aplica a marca incremental a um resultado completo (ex: vindo do cache)"""
+    if after is None or result['erro'] is not None:
+        return result
+    keep = new_rows_mask(result['records'], result['timestamps'], after)
+    filtered = dict(result)
+    filtered['timestamps'] = result['timestamps'][keep]
+    filtered['records'] = result['records'][keep]
+    filtered['variables'] = {name: values[keep] for name, values in result['variables'].items()}
+    return filtered
+
+
+def get_executor():
+    """Retorna o pool de processos compartilhado, dimensionado pelo número de núcleos"""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        # spawn evita fork de um processo com threads (servidor do Streamlit)
+        _EXECUTOR = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _EXECUTOR
+
+
+def reset_executor(executor):
+    """Descarta o pool quebrado (processo encerrado à força); o próximo uso cria outro"""
+    global _EXECUTOR
+    executor.shutdown(wait=False, cancel_futures=True)
+    # Outra sessão pode já ter criado o pool novo
+    if _EXECUTOR is executor:
+        _EXECUTOR = None
+
+
+def parse_files(named_contents, variable_scaling, on_progress=None, cache=None):
+    """
+    Lê e normaliza vários arquivos, em paralelo quando há mais de um
+
+    Args:
+        named_contents: lista de (nome, bytes, compressão, marca incremental ou None) na ordem de upload
+        variable_scaling: mapeamento repassado para normalize_channels
+        on_progress: callback(concluídos, total, nome) chamado no processo principal
+        cache: ParsedFileCache opcional - arquivos já lidos não passam pelo parser
+
+    Returns:
+        lista de resultados de parse_and_normalize na mesma ordem de entrada
+    """
+    total = len(named_contents)
+    results = [None] * total
+    keys = [None] * total
+    pending = []
+    done = 0
+
+    # Arquivos já presentes no cache
+    for i, (name, content, compression, after) in enumerate(named_contents):
+        if cache is not None:
+            keys[i] = cache.key_for(content, variable_scaling, compression)
+            cached = cache.get(keys[i])
+            if cached is not None:
+                cached['arquivo'] = name
+                results[i] = filter_result(cached, after)
+                done += 1
+                if on_progress:
+                    on_progress(done, total, name)
+                continue
+        pending.append(i)
+
+    def store(i, result):
+        results[i] = result
+        # Resultados parciais (incrementais) não representam o arquivo inteiro
+        if cache is not None and named_contents[i][3] is None:
+            cache.put(keys[i], result)
+
+    if len(pending) <= 1 or (os.cpu_count() or 1) <= 1:
+        for i in pending:
+            name, content, compression, after = named_contents[i]
+            store(i, parse_and_normalize(name, content, variable_scaling, compression, after))
+            done += 1
+            if on_progress:
+                on_progress(done, total, name)
+        return results
+
+    def run(indices):
+        """Lê os arquivos no pool; devolve {arquivo interrompido por uma quebra do pool: erro}"""
+        nonlocal done
+
+        def submit_all(executor):
+            return {
+                executor.submit(
+                    parse_and_normalize,
+                    named_contents[i][0],
+                    named_contents[i][1],
+                    variable_scaling,
+                    named_contents[i][2],
+                    named_contents[i][3]
+                ): i
+                for i in indices
+            }
+
+        executor = get_executor()
+        try:
+            futures = submit_all(executor)
+        except BrokenProcessPool:
+            # Pool quebrado em um lote anterior: recria uma vez
+            reset_executor(executor)
+            executor = get_executor()
+            futures = submit_all(executor)
+
+        interrupted = {}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                # Processo do pool encerrado (ex: falta de memória): o arquivo é repetido
+                interrupted[i] = e
+                continue
+            except Exception as e:
+                result = error_result(named_contents[i][0], str(e) or type(e).__name__)
+            store(i, result)
+            done += 1
+            if on_progress:
+                on_progress(done, total, results[i]['arquivo'])
+
+        if interrupted:
+            reset_executor(executor)
+        return interrupted
+
+    interrupted = run(pending)
+    if len(interrupted) > 1:
+        # Não se sabe qual arquivo derrubou o pool: os interrompidos são repetidos em um pool
+        # novo e, se ele quebrar de novo, um por vez
+        interrupted = run(sorted(interrupted))
+        if len(interrupted) > 1:
+            interrupted = {i: e for retried in sorted(interrupted) for i, e in run([retried]).items()}
+
+    # Arquivo que quebrou o pool sozinho: erro só dele
+    for i, error in sorted(interrupted.items()):
+        results[i] = error_result(named_contents[i][0], str(error) or type(error).__name__)
+        done += 1
+        if on_progress:
+            on_progress(done, total, named_contents[i][0])
+
+    return results
@@ -0,0 +1,160 @@
+"""
+Índice de cobertura dos dados consolidados
+
+Para cada mês guarda quantos registros chegaram em cada slot de 10 minutos (grade dias × 144)
+e o intervalo de gravação dos arquivos que os gravaram (o menor do slot). As contagens por hora,
+dia e mês e as somas acumuladas são calculadas uma vez por alteração, então perguntas como "há
+dados neste dia?" ou "há registros entre 09:50 e 10:10?" são respondidas em tempo constante, sem
+percorrer a série. O mapa de completude é gerado só a partir das grades: os registros esperados
+em cada hora vêm do intervalo de gravação (60 para um logger de 1 minuto, 4 para um de 15
+minutos); horas sem registro usam o intervalo mais frequente do mês.
+"""
+import calendar
+
+import numpy as np
+
+from resample import detect_interval
+
+SLOT_MINUTES = 10
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+SLOTS_PER_DAY = 24 * SLOTS_PER_HOUR
+
+# Intervalo de gravação assumido quando não é informado nem detectável (logger de 10 minutos)
+DEFAULT_INTERVAL_SECONDS = SLOT_MINUTES * 60
+
+# Slot sem registro na grade de intervalos
+NO_INTERVAL = np.iinfo(np.int32).max
+
+
+class CoverageIndex:
+    """Registros recebidos × esperados por slot de 10 minutos, com totais por hora/dia/mês"""
+
+    def __init__(self):
+        self._grids = {}      # {(ano, mês): contagens int32 (dias × SLOTS_PER_DAY)}
+        self._intervals = {}  # {(ano, mês): menor intervalo de gravação (s) int32 de cada slot}
+        self._rollups = {}    # {(ano, mês): totais por hora/dia/mês e soma acumulada}
+
+    def add(self, timestamps, intervals=None):
+        """
+        Conta timestamps novos (cada timestamp deve ser contado uma única vez)
+
+        intervals: intervalo de gravação do arquivo de origem de cada timestamp, em segundos
+        (<= 0 ou None = desconhecido: vale o intervalo detectado entre esses timestamps, ou
+        DEFAULT_INTERVAL_SECONDS)
+        """
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        if len(timestamps) == 0:
+            return
+
+        if intervals is None:
+            intervals = np.zeros(len(timestamps), dtype=np.int64)
+        intervals = np.asarray(intervals, dtype=np.int64)
+        unknown = intervals <= 0
+        if unknown.any():
+            detected = detect_interval(timestamps[unknown])
+            fallback = DEFAULT_INTERVAL_SECONDS if detected is None else int(detected.astype(np.int64))
+            intervals = np.where(unknown, fallback, intervals)
+
+        month_numbers = timestamps.astype('datetime64[M]').astype(np.int64)
+        minutes = (timestamps.astype('datetime64[m]') - timestamps.astype('datetime64[M]')).astype(np.int64)
+        slots = minutes // SLOT_MINUTES
+
+        for number in np.unique(month_numbers).tolist():
+            key = (1970 + number // 12, number % 12 + 1)
+            grid = self._grids.get(key)
+            if grid is None:
+                days = calendar.monthrange(*key)[1]
+                grid = self._grids[key] = np.zeros((days, SLOTS_PER_DAY), dtype=np.int32)
+                self._intervals[key] = np.full((days, SLOTS_PER_DAY), NO_INTERVAL, dtype=np.int32)
+            in_month = month_numbers == number
+            counts = np.bincount(slots[in_month], minlength=grid.size)
+            grid += counts.reshape(grid.shape).astype(np.int32)
+            np.minimum.at(self._intervals[key].reshape(-1), slots[in_month], intervals[in_month].astype(np.int32))
+            self._rollups.pop(key, None)
+
+    def months(self):
+        """(ano, mês) com algum registro, em ordem"""
+        return sorted(self._grids)
+
+    def _rollup(self, year, month):
+        """Totais do mês, recalculados só depois de novas contagens"""
+        key = (year, month)
+        rollup = self._rollups.get(key)
+        if rollup is None and key in self._grids:
+            grid = self._grids[key]
+            hours = grid.reshape(grid.shape[0], 24, SLOTS_PER_HOUR).sum(axis=2)
+            expected = self._expected_per_hour(key)
+            filled = np.minimum(hours, expected)
+            rollup = self._rollups[key] = {
+                'horas': hours,
+                'dias': hours.sum(axis=1),
+                'mes': int(hours.sum()),
+                'acumulado': np.r_[0, np.cumsum(grid, dtype=np.int64)],
+                'completude_horas': filled / expected,
+                'completude_mes': float(filled.sum()) / float(expected.sum())
+            }
+        return rollup
+
+    def _expected_per_hour(self, key):
+        """Registros esperados em cada hora do mês (dias × 24) pelo intervalo de gravação"""
+        intervals = self._intervals[key]
+        hour_intervals = intervals.reshape(intervals.shape[0], 24, SLOTS_PER_HOUR).min(axis=2)
+        known = hour_intervals != NO_INTERVAL
+        values, counts = np.unique(hour_intervals[known], return_counts=True)
+        fallback = values[np.argmax(counts)] if len(values) else DEFAULT_INTERVAL_SECONDS
+        hour_intervals = np.where(known, hour_intervals, fallback)
+        return 3600.0 / hour_intervals
+
+    def month_count(self, year, month):
+        rollup = self._rollup(year, month)
+        return rollup['mes'] if rollup else 0
+
+    def day_count(self, year, month, day):
+        rollup = self._rollup(year, month)
+        return int(rollup['dias'][day - 1]) if rollup else 0
+
+    def hour_count(self, year, month, day, hour):
+        rollup = self._rollup(year, month)
+        return int(rollup['horas'][day - 1, hour]) if rollup else 0
+
+    def count_between(self, start, end):
+        """
+        Registros nos slots de 10 minutos que tocam [start, end]
+
+        A resolução é o slot: zero garante que não há dados no intervalo.
+        """
+        start = np.datetime64(start, 'm')
+        end = np.datetime64(end, 'm')
+        total = 0
+        # O intervalo pode atravessar a virada do mês
+        for number in range(int(start.astype('datetime64[M]').astype(np.int64)),
+                            int(end.astype('datetime64[M]').astype(np.int64)) + 1):
+            year, month = 1970 + number // 12, number % 12 + 1
+            rollup = self._rollup(year, month)
+            if rollup is None:
+                continue
+            month_start = np.datetime64(f"{year:04d}-{month:02d}", 'm')
+            cumulative = rollup['acumulado']
+            first = max(int((start - month_start).astype(np.int64)) // SLOT_MINUTES, 0)
+            last = min(int((end - month_start).astype(np.int64)) // SLOT_MINUTES, len(cumulative) - 2)
+            if last >= first:
+                total += int(cumulative[last + 1] - cumulative[first])
+        return total
+
+    def has_data(self, start, end):
+        return self.count_between(start, end) > 0
+
+    def completeness(self, year, month):
+        """Fração dos registros esperados recebidos em cada hora (matriz dias × 24)"""
+        rollup = self._rollup(year, month)
+        if rollup is None:
+            return np.zeros((calendar.monthrange(year, month)[1], 24))
+        return rollup['completude_horas']
+
+    def month_completeness(self, year, month):
+        """Fração dos registros esperados recebidos no mês"""
+        rollup = self._rollup(year, month)
+        return rollup['completude_mes'] if rollup else 0.0
+
+    def nbytes(self):
+        return sum(grid.nbytes for grids in (self._grids, self._intervals) for grid in grids.values())
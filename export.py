@@ -0,0 +1,267 @@
+"""
+Exportação dos dados consolidados em Parquet, Arrow IPC e CSV
+
+Os lotes (RecordBatch) são montados direto sobre as colunas da série consolidada e cada
+lote é escrito e entregue em seguida, como uma sequência de blocos de bytes: o arquivo
+inteiro nunca é montado em memória. As estatísticas diárias (mesmas das abas mensais) e
+os valores horários (mesmos das abas diárias, ver snapshots) também podem ser exportados.
+
+Uso pela linha de comando, a partir do histórico local:
+
+    python export.py --estacao Floriano --formato parquet --saida medicoes.parquet
+    python export.py --estacao Floriano --tipo diario --formato csv --inicio 2025-01 --fim 2025-12
+    python export.py --estacao Floriano --tipo horario --formato csv --alinhamento anterior --tolerancia 30
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from daily_statistics import daily_statistics
+from history_store import HistoryStore, DEFAULT_HISTORY_DIR
+from snapping import DEFAULT_SNAPPING_POLICY, SNAPPING_POLICIES
+from timeseries_store import TimeSeriesStore
+
+# formato: (nome para exibição, extensão, tipo MIME)
+EXPORT_FORMATS = {
+    'parquet': ('Parquet', '.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('Arrow IPC', '.arrow', 'application/vnd.apache.arrow.stream'),
+    'csv': ('CSV', '.csv', 'text/csv')
+}
+
+# Linhas por lote (um row group no Parquet, um bloco no CSV/Arrow)
+BATCH_ROWS = 65536
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino dos writers do pyarrow: guarda os bytes escritos até serem retirados"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        chunk = b''.join(self._chunks)
+        self._chunks = []
+        return chunk
+
+
+def measurement_batches(store, batch_rows=BATCH_ROWS):
+    """
+    Lotes da série consolidada (NaN vira nulo)
+
+    Timestamp, uma coluna float64 por variável e uma float32 por canal estatístico (Min/Max/Std)
+    """
+    index = store.index.to_numpy()
+    for start in range(0, len(store), batch_rows):
+        stop = min(start + batch_rows, len(store))
+        arrays = [pa.array(index[start:stop])]
+        arrays += [pa.array(store.column(variable)[start:stop], from_pandas=True) for variable in store.variables]
+        arrays += [pa.array(store.statistic(name)[start:stop], from_pandas=True) for name in store.statistics]
+        yield pa.RecordBatch.from_arrays(arrays, names=['Timestamp'] + store.variables + store.statistics)
+
+
+def measurement_schema(store):
+    return pa.schema([('Timestamp', pa.timestamp('ns'))]
+                     + [(variable, pa.float64()) for variable in store.variables]
+                     + [(name, pa.float32()) for name in store.statistics])
+
+
+def daily_batches(store, batch_rows=BATCH_ROWS):
+    """Lotes das estatísticas diárias (ver daily_statistics)"""
+    table = pa.Table.from_pandas(daily_statistics(store).reset_index(), preserve_index=False)
+    yield from table.to_batches(max_chunksize=batch_rows)
+
+
+def snapshot_batches(store, policy=DEFAULT_SNAPPING_POLICY, tolerances=None):
+    """Lotes da grade horária, um por mês: Timestamp (hora cheia), variáveis e Desvio_s"""
+    for year, month, _, _ in store.month_slices():
+        cube = store.snapshot_cube(year, month, policy, tolerances)
+        if cube is not None:
+            yield pa.RecordBatch.from_pandas(cube.frame(), schema=snapshot_schema(store), preserve_index=False)
+
+
+def snapshot_schema(store):
+    return pa.schema([('Timestamp', pa.timestamp('ns'))]
+                     + [(variable, pa.float64()) for variable in store.variables]
+                     + [('Desvio_s', pa.int64())])
+
+
+def _csv_batch(batch):
+    """Timestamps em segundos inteiros ficam no formato do TOA5 (AAAA-MM-DD HH:MM:SS)"""
+    columns = []
+    for column in batch.columns:
+        if pa.types.is_timestamp(column.type):
+            try:
+                column = pc.cast(column, pa.timestamp('s'))
+            except pa.ArrowInvalid:
+                pass
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def iter_export(batches, fmt, schema=None):
+    """
+    Escreve os lotes no formato pedido, entregando os bytes lote a lote
+
+    Args:
+        batches: iterável de RecordBatch com o mesmo esquema
+        fmt: 'parquet', 'arrow' ou 'csv'
+        schema: esquema usado se não houver nenhum lote
+    """
+    sink = _ChunkSink()
+    writer = None
+    for batch in batches:
+        if fmt == 'csv':
+            batch = _csv_batch(batch)
+        if writer is None:
+            writer = _open_writer(fmt, sink, batch.schema)
+        writer.write_batch(batch)
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+
+    if writer is None:
+        if schema is None:
+            return
+        writer = _open_writer(fmt, sink, schema)
+    writer.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def _open_writer(fmt, sink, schema):
+    if fmt == 'parquet':
+        return pq.ParquetWriter(sink, schema)
+    if fmt == 'arrow':
+        return pa.ipc.new_stream(sink, schema)
+    if fmt == 'csv':
+        return pa_csv.CSVWriter(sink, schema)
+    raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+
+
+def export_measurements(store, fmt):
+    """Blocos de bytes da série consolidada no formato pedido"""
+    return iter_export(measurement_batches(store), fmt, measurement_schema(store))
+
+
+def export_daily_statistics(store, fmt):
+    """Blocos de bytes das estatísticas diárias no formato pedido"""
+    return iter_export(daily_batches(store), fmt)
+
+
+def export_hourly_snapshots(store, fmt, policy=DEFAULT_SNAPPING_POLICY, tolerances=None):
+    """Blocos de bytes dos valores horários (abas diárias) no formato pedido"""
+    return iter_export(snapshot_batches(store, policy, tolerances), fmt, snapshot_schema(store))
+
+
+def spooled_export(chunks, suffix=''):
+    """
+    Blocos gravados em um arquivo temporário, devolvido aberto para o st.download_button
+
+    Os blocos vão para o disco um de cada vez, sem buffer em memória. O arquivo é apagado
+    logo em seguida e continua legível pelo descritor aberto até ser fechado.
+    """
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        path = f.name
+        try:
+            for chunk in chunks:
+                f.write(chunk)
+        except BaseException:
+            f.close()
+            os.remove(path)
+            raise
+
+    reader = open(path, 'rb')
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return reader
+
+
+def write_export(chunks, path):
+    """Grava os blocos em um arquivo, um de cada vez"""
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def load_history(history, start=None, end=None):
+    """Série consolidada com os meses do histórico entre start e end ('AAAA-MM', inclusivos)"""
+    store = TimeSeriesStore(history.variables(), statistics=history.statistics())
+    n_variables = len(store.variables)
+    for year, month in history.months():
+        key = f"{year:04d}-{month:02d}"
+        if (start and key < start) or (end and key > end):
+            continue
+        timestamps, values, attributes = history.read_month(year, month, store.variables + store.statistics)
+        store.upsert(timestamps, values[:, :n_variables], attributes, values[:, n_variables:])
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta as medições consolidadas do histórico local")
+    parser.add_argument('--historico', default=os.environ.get('MEDICOES_HISTORY_DIR', DEFAULT_HISTORY_DIR),
+                        help="pasta do histórico local")
+    parser.add_argument('--estacao', help="estação (obrigatória se o histórico tiver mais de uma)")
+    parser.add_argument('--tipo', choices=['medicoes', 'diario', 'horario'], default='medicoes',
+                        help="medições consolidadas, estatísticas diárias ou valores horários")
+    parser.add_argument('--formato', choices=list(EXPORT_FORMATS), default='parquet')
+    parser.add_argument('--alinhamento', choices=list(SNAPPING_POLICIES), default=DEFAULT_SNAPPING_POLICY,
+                        help="registro usado em cada hora (tipo horario)")
+    parser.add_argument('--tolerancia', type=float, default=10,
+                        help="tolerância do alinhamento em minutos, todas as variáveis (tipo horario)")
+    parser.add_argument('--inicio', help="primeiro mês (AAAA-MM)")
+    parser.add_argument('--fim', help="último mês (AAAA-MM)")
+    parser.add_argument('--saida', help="arquivo de saída (padrão: <estação>_<tipo><extensão>)")
+    args = parser.parse_args(argv)
+
+    root = HistoryStore(args.historico)
+    stations = root.stations()
+    station = args.estacao or (stations[0] if len(stations) == 1 else None)
+    if station is None:
+        parser.error(f"informe --estacao ({', '.join(stations) or 'histórico vazio'})")
+    history = root.station(station)
+
+    store = load_history(history, args.inicio, args.fim)
+    if len(store) == 0:
+        print(f"Nenhum dado da estação {station} no período", file=sys.stderr)
+        return 1
+
+    if args.tipo == 'horario':
+        tolerance = np.timedelta64(int(args.tolerancia * 60 * 1e9), 'ns')
+        chunks = export_hourly_snapshots(store, args.formato, args.alinhamento,
+                                         {variable: tolerance for variable in store.variables})
+    elif args.tipo == 'diario':
+        chunks = export_daily_statistics(store, args.formato)
+    else:
+        chunks = export_measurements(store, args.formato)
+    output = args.saida or f"{station}_{args.tipo}{EXPORT_FORMATS[args.formato][1]}"
+    write_export(chunks, output)
+    print(f"{len(store)} registros exportados para {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
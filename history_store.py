@@ -0,0 +1,294 @@
+"""
+Histórico local persistente das medições consolidadas
+
+As linhas gravadas em cada processamento são acrescentadas como arquivos Parquet em uma
+pasta por ano-mês (AAAA-MM/parte-*.parquet). Nada é reescrito na gravação: na leitura as
+partes do mês são unidas em ordem e a última gravação de cada timestamp prevalece. Ler um
+mês abre só a pasta desse mês, então atualizar dezembro custa o mesmo que atualizar janeiro.
+Meses com muitas partes são compactados em um único arquivo.
+
+Cada estação tem sua própria pasta (historico/<estação>/AAAA-MM); a ordem global de arquivos
+(sequencia.json), o nome do arquivo de cada ordem (arquivos.json) e as marcas incrementais de
+cada estação/logger/tabela (marcas.json) ficam na raiz e são compartilhados entre as estações.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.expanduser('~'), '.medicoes_floriano', 'historico')
+
+TIMESTAMP_COLUMN = 'Timestamp'
+PART_PREFIX = 'parte-'
+PART_SUFFIX = '.parquet'
+PARTITION_PATTERN = re.compile(r'^(\d{4})-(\d{2})$')
+STATION_NAME_PATTERN = re.compile(r'[^\w.-]+')
+SEQUENCE_FILE = 'sequencia.json'
+SOURCES_FILE = 'arquivos.json'
+WATERMARKS_FILE = 'marcas.json'
+WATERMARK_KEY_FIELDS = ('estacao', 'logger', 'serie', 'tabela')
+
+# Acima deste número de partes o mês é compactado em um único arquivo
+MAX_PARTS_PER_MONTH = 16
+
+# Atributos guardados junto com os valores: resolução de conflitos e intervalo de gravação do
+# arquivo de origem (ausente em partes antigas: lido como 0 = desconhecido)
+ATTRIBUTE_COLUMNS = ['sequencia', 'record', 'recente', 'intervalo']
+
+_HISTORY = None
+
+
+class HistoryStore:
+    """Histórico em partições ano-mês de arquivos Parquet, só com acréscimos"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def station(self, name):
+        """Histórico de uma estação (subpasta com o nome da estação)"""
+        return HistoryStore(os.path.join(self.directory, STATION_NAME_PATTERN.sub('_', name).strip('.') or '_'))
+
+    def stations(self):
+        """Subpastas de estação existentes, em ordem"""
+        return sorted(name for name in os.listdir(self.directory)
+                      if not PARTITION_PATTERN.match(name) and os.path.isdir(os.path.join(self.directory, name)))
+
+    def _partition_dir(self, year, month):
+        return os.path.join(self.directory, f"{year:04d}-{month:02d}")
+
+    def _parts(self, year, month):
+        """Partes do mês em ordem de gravação"""
+        partition = self._partition_dir(year, month)
+        if not os.path.isdir(partition):
+            return []
+        names = sorted(name for name in os.listdir(partition)
+                       if name.startswith(PART_PREFIX) and name.endswith(PART_SUFFIX))
+        return [os.path.join(partition, name) for name in names]
+
+    def months(self):
+        """(ano, mês) de todas as partições existentes, em ordem"""
+        months = []
+        for name in sorted(os.listdir(self.directory)):
+            match = PARTITION_PATTERN.match(name)
+            if match and self._parts(int(match.group(1)), int(match.group(2))):
+                months.append((int(match.group(1)), int(match.group(2))))
+        return months
+
+    def _value_fields(self):
+        """Colunas de valores da parte mais recente (sem Timestamp e atributos)"""
+        for year, month in reversed(self.months()):
+            schema = pq.read_schema(self._parts(year, month)[-1])
+            return [field for field in schema if field.name != TIMESTAMP_COLUMN and field.name not in ATTRIBUTE_COLUMNS]
+        return []
+
+    def variables(self):
+        """Variáveis gravadas no histórico (colunas float64 da parte mais recente)"""
+        return [field.name for field in self._value_fields() if not pa.types.is_float32(field.type)]
+
+    def statistics(self):
+        """Canais estatísticos gravados no histórico (colunas float32 da parte mais recente)"""
+        return [field.name for field in self._value_fields() if pa.types.is_float32(field.type)]
+
+    def read_month(self, year, month, variables):
+        """
+        Lê a partição de um mês
+
+        Returns:
+            (timestamps, valores linhas × variáveis, {atributo: array}) ou None se não houver dados
+        """
+        parts = self._parts(year, month)
+        if not parts:
+            return None
+
+        table = pa.concat_tables([pq.read_table(path) for path in parts], promote_options='default')
+        timestamps = table.column(TIMESTAMP_COLUMN).to_numpy().astype('datetime64[ns]')
+
+        # Última gravação de cada timestamp prevalece (partes lidas em ordem)
+        keep = ~pd.Index(timestamps).duplicated(keep='last')
+        values = np.column_stack([
+            table.column(name).to_numpy(zero_copy_only=False).astype(np.float64)
+            if name in table.column_names else np.full(len(timestamps), np.nan)
+            for name in variables
+        ])
+        attributes = {
+            name: (pc.fill_null(table.column(name), 0).to_numpy().astype(np.int64)
+                   if name in table.column_names else np.zeros(len(timestamps), dtype=np.int64))[keep]
+            for name in ATTRIBUTE_COLUMNS
+        }
+        return timestamps[keep], values[keep], attributes
+
+    def append(self, timestamps, values, variables, attributes, statistics=None):
+        """
+        Acrescenta linhas ao histórico, uma parte nova por mês tocado
+
+        statistics: {canal estatístico: array float32} gravados como colunas float32
+        """
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        if len(timestamps) == 0:
+            return
+
+        months = timestamps.astype('datetime64[M]')
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, months, values = timestamps[order], months[order], values[order]
+        # Atributos sempre int64 no Parquet: as partes de um mês precisam do mesmo esquema
+        attributes = {name: np.asarray(attributes[name], dtype=np.int64)[order] for name in ATTRIBUTE_COLUMNS}
+        statistics = {name: np.asarray(column, dtype=np.float32)[order] for name, column in (statistics or {}).items()}
+
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+        stops = np.r_[starts[1:], len(months)]
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            number = int(months[start].astype(np.int64))
+            year, month = 1970 + number // 12, number % 12 + 1
+
+            columns = {TIMESTAMP_COLUMN: timestamps[start:stop]}
+            columns.update({name: values[start:stop, i] for i, name in enumerate(variables)})
+            columns.update({name: column[start:stop] for name, column in statistics.items()})
+            columns.update({name: attributes[name][start:stop] for name in ATTRIBUTE_COLUMNS})
+            self._write_part(year, month, pa.table(columns))
+
+            if len(self._parts(year, month)) > MAX_PARTS_PER_MONTH:
+                self.compact(year, month)
+
+    def _write_part(self, year, month, table):
+        """Grava uma parte nova (arquivo temporário + rename, nome crescente na ordem de gravação)"""
+        partition = self._partition_dir(year, month)
+        os.makedirs(partition, exist_ok=True)
+        name = f"{PART_PREFIX}{time.time_ns():020d}-{os.getpid()}{PART_SUFFIX}"
+        fd, tmp_path = tempfile.mkstemp(dir=partition, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                pq.write_table(table, tmp_file)
+            os.replace(tmp_path, os.path.join(partition, name))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def compact(self, year, month):
+        """Reescreve o mês como uma única parte, com uma linha por timestamp e todas as colunas"""
+        parts = self._parts(year, month)
+        if len(parts) <= 1:
+            return
+
+        table = pa.concat_tables([pq.read_table(path) for path in parts], promote_options='default')
+        timestamps = table.column(TIMESTAMP_COLUMN).to_numpy()
+        keep = np.flatnonzero(~pd.Index(timestamps).duplicated(keep='last'))
+
+        # A parte compactada é gravada antes de remover as antigas (e é a mais nova na ordem)
+        self._write_part(year, month, table.take(keep))
+        for path in parts:
+            os.remove(path)
+
+    def next_sequence(self):
+        """Próxima ordem global de arquivo (as políticas comparam arquivos entre sessões)"""
+        try:
+            with open(os.path.join(self.directory, SEQUENCE_FILE)) as f:
+                return int(json.load(f)['proxima_sequencia'])
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0
+
+    def set_next_sequence(self, sequence):
+        self._write_json(SEQUENCE_FILE, {'proxima_sequencia': int(sequence)})
+
+    def source_files(self):
+        """Arquivo de origem de cada ordem global: {sequencia: (arquivo, estação)}"""
+        try:
+            with open(os.path.join(self.directory, SOURCES_FILE)) as f:
+                return {int(sequence): (source['arquivo'], source.get('estacao'))
+                        for sequence, source in json.load(f).items()}
+        except (FileNotFoundError, ValueError, KeyError):
+            return {}
+
+    def add_source_files(self, sources):
+        """Acrescenta ao índice de arquivos as entradas (sequencia, (arquivo, estação))"""
+        merged = self.source_files()
+        merged.update(sources)
+        self._write_json(SOURCES_FILE, {
+            str(sequence): {'arquivo': name, 'estacao': station}
+            for sequence, (name, station) in sorted(merged.items())
+        })
+
+    def watermarks(self):
+        """Marcas incrementais gravadas: {(estação, logger, série, tabela): (último RECORD, último TIMESTAMP)}"""
+        try:
+            with open(os.path.join(self.directory, WATERMARKS_FILE)) as f:
+                return {
+                    tuple(mark[field] for field in WATERMARK_KEY_FIELDS):
+                        (int(mark['record']), np.datetime64(mark['timestamp'], 'ns'))
+                    for mark in json.load(f)
+                }
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return {}
+
+    def save_watermarks(self, watermarks):
+        """Grava as marcas incrementais, mantendo o maior RECORD/TIMESTAMP de cada logger/tabela"""
+        merged = self.watermarks()
+        for key, (record, timestamp) in watermarks.items():
+            previous = merged.get(key)
+            if previous is not None:
+                record, timestamp = max(record, previous[0]), max(timestamp, previous[1])
+            merged[key] = (int(record), np.datetime64(timestamp, 'ns'))
+        self._write_json(WATERMARKS_FILE, [
+            dict(zip(WATERMARK_KEY_FIELDS, key), record=record, timestamp=str(timestamp))
+            for key, (record, timestamp) in sorted(merged.items())
+        ])
+
+    def _write_json(self, name, content):
+        """Grava um arquivo JSON da raiz (arquivo temporário + rename)"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(content, f)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    def signature(self):
+        """Identifica o estado do histórico: nomes das partes de todas as estações e a sequência"""
+        names = []
+        for root, _, files in os.walk(self.directory):
+            names.extend(os.path.relpath(os.path.join(root, name), self.directory)
+                         for name in files if name.endswith(PART_SUFFIX))
+        return [sorted(names), self.next_sequence()]
+
+    def stats(self):
+        """Resumo do histórico para exibição (todas as estações)"""
+        stores = [self] + [self.station(name) for name in self.stations()]
+        months = []
+        size = 0
+        for store in stores:
+            for year, month in store.months():
+                months.append((year, month))
+                size += sum(os.path.getsize(path) for path in store._parts(year, month))
+        months.sort()
+        return {
+            'meses': len(months),
+            'estacoes': sum(1 for store in stores[1:] if store.months()),
+            'primeiro': f"{months[0][1]:02d}/{months[0][0]}" if months else None,
+            'ultimo': f"{months[-1][1]:02d}/{months[-1][0]}" if months else None,
+            'tamanho': size,
+            'diretorio': self.directory
+        }
+
+    def clear(self):
+        """Remove todo o histórico (todas as estações)"""
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif name in (SEQUENCE_FILE, SOURCES_FILE, WATERMARKS_FILE):
+                os.remove(path)
+
+
+def get_history_store():
+    """Retorna o histórico do processo, na pasta MEDICOES_HISTORY_DIR"""
+    global _HISTORY
+    if _HISTORY is None:
+        _HISTORY = HistoryStore(os.environ.get('MEDICOES_HISTORY_DIR', DEFAULT_HISTORY_DIR))
+    return _HISTORY
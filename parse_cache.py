@@ -0,0 +1,153 @@
+"""
+Cache em disco dos arquivos .dat já lidos e normalizados
+
+Cada entrada é identificada pelo hash do conteúdo do arquivo, pela versão do leitor e pelo
+mapeamento de canais, e guarda as colunas já escaladas em formato binário colunar (.npz).
+Um novo upload do mesmo arquivo não passa pelo parser CSV. O tamanho total é limitado e as
+entradas menos usadas recentemente são removidas primeiro.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from dat_reader import PARSER_VERSION
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'medicoes_floriano_cache')
+DEFAULT_MAX_MB = 512
+
+ENTRY_SUFFIX = '.npz'
+VARIABLE_PREFIX = 'var__'
+
+_CACHE = None
+
+
+class ParsedFileCache:
+    """Cache LRU em disco de arquivos .dat normalizados, limitado por tamanho"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key_for(self, content, variable_scaling, compression=None):
+        """Chave da entrada: hash do conteúdo + versão do leitor + mapeamento de canais"""
+        digest = hashlib.sha256()
+        digest.update(PARSER_VERSION.encode())
+        digest.update(repr(sorted(variable_scaling.items())).encode())
+        digest.update(repr(compression).encode())
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Retorna o resultado normalizado armazenado ou None se não existir"""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                variables = {
+                    name[len(VARIABLE_PREFIX):]: entry[name]
+                    for name in entry.files if name.startswith(VARIABLE_PREFIX)
+                }
+                result = {
+                    'timestamps': entry['timestamps'],
+                    'records': entry['records'],
+                    'variables': variables,
+                    'metadata': json.loads(str(entry['metadata'])),
+                    'erro': None
+                }
+            # Marcar como usado recentemente (ordem LRU pelo mtime)
+            os.utime(path, None)
+            return result
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrada corrompida ou de formato antigo - descartar
+            self._remove(path)
+            return None
+
+    def put(self, key, result):
+        """Armazena um resultado normalizado com sucesso e aplica o limite de tamanho"""
+        if result.get('erro') is not None:
+            return
+
+        arrays = {
+            'timestamps': np.asarray(result['timestamps'], dtype='datetime64[ns]'),
+            'records': np.asarray(result['records'], dtype=np.int64)
+        }
+        for name, values in result['variables'].items():
+            # Canais estatísticos continuam float32
+            dtype = np.float32 if np.asarray(values).dtype == np.float32 else np.float64
+            arrays[VARIABLE_PREFIX + name] = np.asarray(values, dtype=dtype)
+        arrays['metadata'] = np.array(json.dumps(result['metadata']))
+
+        # Escrita atômica: arquivo temporário no mesmo diretório e depois rename
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                np.savez(tmp_file, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+        self._evict()
+
+    def _entries(self):
+        """Lista (mtime, tamanho, caminho) das entradas do cache"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Remove as entradas menos usadas até respeitar o limite de tamanho"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        """Resumo do cache para exibição"""
+        entries = self._entries()
+        return {
+            'arquivos': len(entries),
+            'tamanho': sum(size for _, size, _ in entries),
+            'limite': self.max_bytes,
+            'diretorio': self.directory
+        }
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        for _, _, path in self._entries():
+            self._remove(path)
+
+
+def get_parse_cache():
+    """Retorna o cache do processo, configurado por MEDICOES_CACHE_DIR e MEDICOES_CACHE_MAX_MB"""
+    global _CACHE
+    if _CACHE is None:
+        directory = os.environ.get('MEDICOES_CACHE_DIR', DEFAULT_CACHE_DIR)
+        max_mb = float(os.environ.get('MEDICOES_CACHE_MAX_MB', DEFAULT_MAX_MB))
+        _CACHE = ParsedFileCache(directory, int(max_mb * 1024 * 1024))
+    return _CACHE
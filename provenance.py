@@ -0,0 +1,73 @@
+"""
+Origem dos valores consolidados
+
+Cada linha da série já guarda, em colunas inteiras, a ordem global do arquivo que a gravou
+('sequencia') e o RECORD do logger ('record'). Este módulo mantém o índice ordem → nome do
+arquivo (persistido junto com o histórico local) e transforma um intervalo de linhas da série
+na tabela de origem: timestamp, valor, arquivo e RECORD.
+"""
+import numpy as np
+import pandas as pd
+
+UNKNOWN_SOURCE_LABEL = 'Arquivo não registrado'
+
+
+class SourceIndex:
+    """Arquivos de origem por ordem global de ingestão: {sequencia: (arquivo, estação)}"""
+
+    def __init__(self, sources=None):
+        self._sources = dict(sources or {})
+
+    def add(self, sequence, file_name, station=None):
+        self._sources[int(sequence)] = (file_name, station)
+
+    def update(self, sources):
+        """Acrescenta entradas de outro índice ou do histórico (dict sequencia → (arquivo, estação))"""
+        self._sources.update(sources.items() if isinstance(sources, dict) else sources._sources.items())
+
+    def file_name(self, sequence):
+        source = self._sources.get(int(sequence))
+        return source[0] if source else f"{UNKNOWN_SOURCE_LABEL} (nº {int(sequence)})"
+
+    def items(self):
+        return self._sources.items()
+
+    def __len__(self):
+        return len(self._sources)
+
+    def copy(self):
+        return SourceIndex(self._sources)
+
+
+def row_sources(store, start, stop, variable, sources, include=None, statistic=None):
+    """
+    Origem das linhas [start, stop) da série para uma variável (linhas sem valor são omitidas)
+
+    include: máscara booleana sobre [start, stop) com as linhas a considerar (padrão: todas)
+    statistic: canal estatístico cujos valores são mostrados (ex: 'Temperatura_Min'; padrão: a média)
+
+    Returns:
+        DataFrame com Timestamp, Valor, Arquivo e RECORD, em ordem cronológica
+    """
+    if statistic is None:
+        values = store.column(variable)[start:stop]
+    else:
+        # Canais estatísticos ficam em float32: valores mostrados com as casas da variável
+        values = store.statistic(statistic)[start:stop].astype(np.float64)
+        if variable in store.decimals:
+            values = values.round(store.decimals[variable])
+    present = ~np.isnan(values)
+    if include is not None:
+        present &= include
+    rows = np.flatnonzero(present)
+    sequences = store.attribute('sequencia')[start:stop][rows]
+
+    # Poucos arquivos distintos: o nome é resolvido uma vez por arquivo
+    unique, inverse = np.unique(sequences, return_inverse=True)
+    names = np.array([sources.file_name(sequence) for sequence in unique.tolist()], dtype=object)
+    return pd.DataFrame({
+        'Timestamp': store.index[start:stop][rows],
+        'Valor': values[rows],
+        'Arquivo': names[inverse] if len(rows) else np.empty(0, dtype=object),
+        'RECORD': store.attribute('record')[start:stop][rows]
+    })
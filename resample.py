@@ -0,0 +1,126 @@
+"""
+Detecção do intervalo de gravação e reamostragem da série consolidada
+
+A série é guardada na resolução nativa de cada arquivo (1, 5, 10, 15 minutos...) e cada linha
+guarda o intervalo de gravação do arquivo que a gravou. As visões de 10 minutos, horária e
+diária decidem linha a linha, pelo arquivo de origem: linhas de arquivos tão espaçados quanto a
+resolução pedida ficam como estão (o valor registrado, no seu timestamp), e só as linhas de
+arquivos mais rápidos viram médias por intervalo, arredondadas com as casas decimais de cada
+variável. Cada intervalo começa no instante que o rotula (10:00 = [10:00, 10:10)), então um
+intervalo nunca atravessa a virada do dia ou do mês. Sem linhas a agrupar, o próprio DataFrame é
+devolvido, sem cópia.
+"""
+import numpy as np
+import pandas as pd
+
+RESOLUTIONS = {
+    '10min': np.timedelta64(10, 'm'),
+    'hora': np.timedelta64(1, 'h'),
+    'dia': np.timedelta64(1, 'D')
+}
+
+
+def detect_interval(timestamps):
+    """
+    Intervalo de gravação de um arquivo: a diferença mais frequente entre timestamps consecutivos
+
+    Returns:
+        np.timedelta64 (segundos) ou None se houver menos de dois timestamps distintos
+    """
+    timestamps = np.sort(np.asarray(timestamps, dtype='datetime64[s]'))
+    steps = np.diff(timestamps)
+    steps = steps[steps > np.timedelta64(0, 's')]
+    if len(steps) == 0:
+        return None
+    values, counts = np.unique(steps, return_counts=True)
+    return values[np.argmax(counts)]
+
+
+def format_interval(interval):
+    """Texto do intervalo para exibição (ex: '10 min', '30 s', '1 h')"""
+    if interval is None:
+        return 'N/A'
+    seconds = int(interval.astype('timedelta64[s]').astype(np.int64))
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600} h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60} min"
+    return f"{seconds} s"
+
+
+def resample_mean(timestamps, values, step):
+    """
+    Média por intervalo de tamanho step (NaN ignorados; intervalo sem valores = NaN)
+
+    Args:
+        timestamps: array datetime64 ordenado
+        values: matriz linhas × variáveis
+        step: np.timedelta64
+
+    Returns:
+        (rótulos datetime64[ns], médias rótulos × variáveis)
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+    if len(timestamps) == 0:
+        return timestamps, np.empty((0, values.shape[1]))
+
+    step_ns = int(step.astype('timedelta64[ns]').astype(np.int64))
+    bins = timestamps.astype(np.int64) // step_ns
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return (bins[starts] * step_ns).astype('datetime64[ns]'), means
+
+
+def native_rows(timestamps, intervals, resolution):
+    """
+    Linhas mantidas como estão na resolução pedida: as de arquivos com intervalo nativo maior
+    ou igual a ela
+
+    intervals: intervalo de gravação do arquivo de origem de cada linha, em segundos (<= 0 =
+    desconhecido, ex: histórico gravado antes desta informação; para essas linhas vale o
+    intervalo mais frequente entre elas)
+    """
+    step_seconds = RESOLUTIONS[resolution] // np.timedelta64(1, 's')
+    intervals = np.asarray(intervals, dtype=np.int64)
+    unknown = intervals <= 0
+    if unknown.any():
+        detected = detect_interval(np.asarray(timestamps)[unknown])
+        fallback = step_seconds if detected is None else int(detected.astype(np.int64))
+        intervals = np.where(unknown, fallback, intervals)
+    return intervals >= step_seconds
+
+
+def resampled_frame(frame, resolution, intervals=None, decimals=None):
+    """
+    Visão de um DataFrame da série (índice Timestamp ordenado) na resolução pedida
+
+    intervals: intervalo nativo de cada linha em segundos (ver native_rows; None = desconhecido)
+    decimals: {variável: casas decimais} para arredondar as médias como os valores gravados
+    Se nenhuma linha vier de arquivo mais rápido que a resolução, o próprio DataFrame é devolvido.
+    """
+    index = frame.index.to_numpy()
+    if intervals is None:
+        intervals = np.zeros(len(frame), dtype=np.int64)
+    native = native_rows(index, intervals, resolution)
+    if native.all():
+        return frame
+
+    fast = ~native
+    labels, means = resample_mean(index[fast], frame.to_numpy()[fast], RESOLUTIONS[resolution])
+    for i, variable in enumerate(frame.columns):
+        if decimals and variable in decimals:
+            means[:, i] = np.round(means[:, i], decimals[variable])
+
+    # Registros nativos prevalecem sobre uma média rotulada no mesmo instante
+    native_index = index[native]
+    labels_kept = ~np.isin(labels, native_index)
+    timestamps = np.concatenate([native_index, labels[labels_kept]])
+    values = np.concatenate([frame.to_numpy()[native], means[labels_kept]])
+    order = np.argsort(timestamps, kind='stable')
+    return pd.DataFrame(values[order], index=pd.DatetimeIndex(timestamps[order], name='Timestamp'),
+                        columns=frame.columns)
@@ -0,0 +1,166 @@
+"""
+Orçamento de memória das sessões do Streamlit
+
+Cada sessão registra seu processador a cada execução do script. Acima do orçamento por sessão
+a série consolidada passa a usar arquivos mapeados em disco (ver TimeSeriesStore); acima do
+orçamento global, os dados compartilhados sem uso são descartados e as sessões ociosas são
+marcadas para liberação, da menos usada recentemente para a mais.
+
+Os dados de uma sessão só são alterados pela própria sessão: o despejo e a liberação marcada
+por outra sessão acontecem na próxima execução do script da sessão (track), nunca a partir
+da thread de outra sessão.
+"""
+import os
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import shared_datasets
+
+DEFAULT_SESSION_BUDGET_MB = 256
+DEFAULT_GLOBAL_BUDGET_MB = 1024
+DEFAULT_IDLE_SECONDS = 300
+DEFAULT_SPILL_DIR = os.path.join(tempfile.gettempdir(), 'medicoes_floriano_spill')
+
+_LOCK = threading.Lock()
+# {id da sessão: {'processor': weakref, 'last_used': float, 'busy': int, 'release': bool}}
+_SESSIONS = {}
+
+
+def session_budget_bytes():
+    """Orçamento por sessão (MEDICOES_SESSION_BUDGET_MB)"""
+    return int(float(os.environ.get('MEDICOES_SESSION_BUDGET_MB', DEFAULT_SESSION_BUDGET_MB)) * 1024 * 1024)
+
+
+def global_budget_bytes():
+    """Orçamento somado de todas as sessões (MEDICOES_GLOBAL_BUDGET_MB)"""
+    return int(float(os.environ.get('MEDICOES_GLOBAL_BUDGET_MB', DEFAULT_GLOBAL_BUDGET_MB)) * 1024 * 1024)
+
+
+def idle_seconds():
+    """Tempo sem uso para uma sessão poder ser liberada (MEDICOES_SESSION_IDLE_SECONDS)"""
+    return float(os.environ.get('MEDICOES_SESSION_IDLE_SECONDS', DEFAULT_IDLE_SECONDS))
+
+
+def spill_dir():
+    """Pasta dos arquivos mapeados das séries despejadas (MEDICOES_SPILL_DIR)"""
+    return os.environ.get('MEDICOES_SPILL_DIR', DEFAULT_SPILL_DIR)
+
+
+def _live_sessions():
+    """Sessões cujo processador ainda existe (abas fechadas somem com o session_state)"""
+    sessions = []
+    for session_id, entry in list(_SESSIONS.items()):
+        processor = entry['processor']()
+        if processor is None:
+            del _SESSIONS[session_id]
+            continue
+        sessions.append((session_id, entry, processor))
+    return sessions
+
+
+def track(session_id, processor):
+    """
+    Registra o uso da sessão e aplica os orçamentos
+
+    Chamado no início de cada execução do script da sessão: se outra sessão marcou esta para
+    liberação, os dados são liberados aqui (processor.evicted fica True).
+
+    Returns:
+        resumo de uso (ver usage)
+    """
+    with _LOCK:
+        entry = _SESSIONS.get(session_id)
+        if entry is None or entry['processor']() is not processor:
+            entry = {'processor': weakref.ref(processor), 'last_used': 0.0, 'busy': 0, 'release': False}
+            _SESSIONS[session_id] = entry
+        entry['last_used'] = time.time()
+        if entry['release']:
+            entry['release'] = False
+            processor.release_memory()
+            shared_datasets.drop_unused()
+        _enforce(session_id)
+        return _usage(session_id)
+
+
+@contextmanager
+def busy(session_id):
+    """Marca a sessão como em processamento (não pode ser liberada nesse intervalo)"""
+    with _LOCK:
+        entry = _SESSIONS.get(session_id)
+        if entry is not None:
+            entry['busy'] += 1
+    try:
+        yield
+    finally:
+        with _LOCK:
+            if entry is not None:
+                entry['busy'] -= 1
+                entry['last_used'] = time.time()
+                _enforce(session_id)
+
+
+def _enforce(current_id):
+    """
+    Despeja em disco a sessão atual acima do orçamento e marca ociosas para liberação se o
+    total passar do global
+
+    As demais sessões acima do orçamento são despejadas na próxima execução delas; as sessões
+    já marcadas não contam no total (serão liberadas na próxima execução).
+    """
+    sessions = _live_sessions()
+
+    # Sessão em processamento não é tocada (a série já se despeja sozinha ao crescer)
+    for session_id, entry, processor in sessions:
+        if (session_id == current_id and entry['busy'] == 0
+                and processor.memory_usage()['memoria'] > session_budget_bytes()):
+            processor.spill_to_disk()
+
+    def server_total():
+        return (sum(processor.memory_usage()['memoria'] for _, entry, processor in sessions if not entry['release'])
+                + shared_datasets.nbytes())
+
+    if server_total() <= global_budget_bytes():
+        return
+
+    # Primeiro os dados compartilhados que nenhuma sessão usa mais
+    shared_datasets.drop_unused()
+
+    now = time.time()
+    idle = sorted(
+        (entry['last_used'], session_id)
+        for session_id, entry, processor in sessions
+        if session_id != current_id and entry['busy'] == 0 and not entry['release']
+        and now - entry['last_used'] >= idle_seconds()
+        and (processor.memory_usage()['memoria'] > 0 or processor.shared_key is not None)
+    )
+    for _, session_id in idle:
+        if server_total() <= global_budget_bytes():
+            break
+        _SESSIONS[session_id]['release'] = True
+
+
+def _usage(session_id):
+    sessions = _live_sessions()
+    own = next((processor.memory_usage() for sid, _, processor in sessions if sid == session_id),
+               {'memoria': 0, 'disco': 0})
+    shared = shared_datasets.stats()
+    return {
+        'sessao_memoria': own['memoria'],
+        'sessao_disco': own['disco'],
+        'sessao_limite': session_budget_bytes(),
+        # Dados compartilhados entram uma única vez no total do servidor
+        'global_memoria': sum(processor.memory_usage()['memoria'] for _, _, processor in sessions) + shared['tamanho'],
+        'global_limite': global_budget_bytes(),
+        'compartilhada': shared['tamanho'],
+        'conjuntos_compartilhados': shared['conjuntos'],
+        'sessoes': len(sessions)
+    }
+
+
+def usage(session_id):
+    """Uso de memória da sessão e do servidor, em bytes"""
+    with _LOCK:
+        return _usage(session_id)
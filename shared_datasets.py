@@ -0,0 +1,136 @@
+"""
+Cache compartilhado de dados consolidados entre as sessões do Streamlit
+
+Quando uma sessão vazia processa um lote de arquivos, o resultado (séries por estação, com
+cobertura e visões reamostradas, conflitos e resumo) fica registrado aqui pelo hash do
+conteúdo dos arquivos, da política e do estado do histórico. Outra sessão que envie o mesmo
+lote recebe os mesmos objetos, sem reprocessar nem copiar. As séries compartilhadas ficam
+somente leitura; a sessão que precisar alterá-las (novo processamento, meses do histórico)
+trabalha sobre uma cópia própria.
+
+Cada sessão que usa uma entrada mantém uma referência. Entradas sem referências continuam
+disponíveis enquanto couberem no orçamento (MEDICOES_SHARED_CACHE_MB), as menos usadas
+recentemente saindo primeiro.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from dat_reader import PARSER_VERSION
+
+DEFAULT_SHARED_CACHE_MB = 512
+# Tamanho dos blocos lidos para o hash do lote
+HASH_CHUNK_BYTES = 1024 * 1024
+
+_LOCK = threading.Lock()
+_ENTRIES = {}  # {chave: {'dataset': dict, 'refs': int, 'last_used': float, 'nbytes': int}}
+
+
+def budget_bytes():
+    """Orçamento das entradas sem referências (MEDICOES_SHARED_CACHE_MB)"""
+    return int(float(os.environ.get('MEDICOES_SHARED_CACHE_MB', DEFAULT_SHARED_CACHE_MB)) * 1024 * 1024)
+
+
+def batch_digest(members, policy, variable_scaling):
+    """
+    Hash de um lote: conteúdo e nome dos arquivos na ordem de upload, política e canais
+
+    O conteúdo (já descompactado) é lido em blocos de HASH_CHUNK_BYTES pelo leitor de cada
+    membro, fechado em seguida: arquivos maiores que o orçamento de leitura nunca são
+    carregados inteiros.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([PARSER_VERSION, policy]).encode())
+    digest.update(repr(sorted(variable_scaling.items())).encode())
+    for member in members:
+        digest.update(json.dumps([member.name, member.size]).encode())
+        with member.reading() as reader:
+            for chunk in iter(lambda: reader.read(HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataset_key(digest, history_signature=None):
+    """Chave da entrada: hash do lote + estado do histórico local (None sem histórico)"""
+    if history_signature is None:
+        return digest
+    return digest + ':' + hashlib.sha256(json.dumps(history_signature).encode()).hexdigest()
+
+
+def _dataset_bytes(dataset):
+    return (sum(store.nbytes() for store in dataset['stores'].values())
+            + dataset['conflicts'].nbytes())
+
+
+def acquire(key):
+    """Dados da chave com uma referência a mais, ou None se não estiverem no cache"""
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is None:
+            return None
+        entry['refs'] += 1
+        entry['last_used'] = time.time()
+        return entry['dataset']
+
+
+def publish(key, dataset):
+    """
+    Registra os dados de um lote já com uma referência (da sessão que os produziu)
+
+    As séries passam a ser somente leitura. Se outra sessão publicou a mesma chave antes,
+    os dados já registrados são devolvidos no lugar dos novos.
+    """
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is None:
+            for store in dataset['stores'].values():
+                store.freeze()
+            entry = _ENTRIES[key] = {'dataset': dataset, 'refs': 0, 'nbytes': _dataset_bytes(dataset)}
+        entry['refs'] += 1
+        entry['last_used'] = time.time()
+        _trim()
+        return entry['dataset']
+
+
+def release(key):
+    """Remove uma referência (sessão que trocou de dados ou foi encerrada)"""
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is not None:
+            entry['refs'] = max(entry['refs'] - 1, 0)
+            entry['last_used'] = time.time()
+            _trim()
+
+
+def _trim():
+    """Descarta entradas sem referências, da menos usada para a mais, acima do orçamento"""
+    unused = sorted((entry['last_used'], key) for key, entry in _ENTRIES.items() if entry['refs'] == 0)
+    total = sum(_ENTRIES[key]['nbytes'] for _, key in unused)
+    for _, key in unused:
+        if total <= budget_bytes():
+            break
+        total -= _ENTRIES.pop(key)['nbytes']
+
+
+def drop_unused():
+    """Descarta todas as entradas sem referências (servidor acima do orçamento global)"""
+    with _LOCK:
+        for key in [key for key, entry in _ENTRIES.items() if entry['refs'] == 0]:
+            del _ENTRIES[key]
+
+
+def nbytes():
+    """Bytes de todas as entradas (contados uma única vez, por mais sessões que as usem)"""
+    with _LOCK:
+        return sum(entry['nbytes'] for entry in _ENTRIES.values())
+
+
+def stats():
+    with _LOCK:
+        return {
+            'conjuntos': len(_ENTRIES),
+            'referencias': sum(entry['refs'] for entry in _ENTRIES.values()),
+            'tamanho': sum(entry['nbytes'] for entry in _ENTRIES.values())
+        }
@@ -0,0 +1,157 @@
+"""
+Modelos das abas "Analise Diaria"
+
+Cada modelo define a grade de horários das linhas: a aba padrão tem 24 linhas (00:00 a 23:00,
+a partir da linha 3); as abas de alta resolução têm 48 linhas de 30 minutos ou 144 de
+10 minutos. As colunas são as mesmas em todos os modelos (31 dias por variável).
+
+O modelo de cada aba pode ser escolhido ou reconhecido pelos horários da coluna A
+(intervalo entre as duas primeiras linhas da grade ou, sem horários legíveis, número de linhas
+preenchidas da coluna). Aba sem modelo reconhecido fica como desconhecida (no modo automático
+é gravada com o modelo padrão de 24 linhas, com aviso), e um modelo escolhido com número de
+linhas diferente da coluna A é recusado.
+
+A gravação usa um plano por modelo (DailyWritePlan): linhas e colunas inteiras de cada
+horário/dia/variável calculadas uma vez, e os valores da grade gravados em uma passada por
+índice inteiro, sem montar endereços 'XX3' célula a célula.
+"""
+import re
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+# Primeira linha da grade (linha 3 = 00:00)
+FIRST_ROW = 3
+# Colunas por variável (um dia por coluna) e última coluna da aba (GE)
+DAYS_PER_VARIABLE = 31
+LAST_COLUMN = 187
+
+TIME_LABEL_PATTERN = re.compile(r'^\s*(\d{1,2}):(\d{2})')
+
+
+class DailySheetTemplate:
+    """Grade de linhas de uma aba diária: um horário a cada step_minutes, a partir de first_row"""
+
+    def __init__(self, label, step_minutes, first_row=FIRST_ROW):
+        self.label = label
+        self.step_minutes = step_minutes
+        self.step = np.timedelta64(step_minutes, 'm')
+        self.first_row = first_row
+
+    @property
+    def slots(self):
+        """Linhas (horários) por dia"""
+        return 24 * 60 // self.step_minutes
+
+    def row(self, slot):
+        return self.first_row + slot
+
+    def slot(self, row):
+        """Horário da linha (0 = 00:00) ou None fora da grade"""
+        slot = row - self.first_row
+        return slot if 0 <= slot < self.slots else None
+
+
+DAILY_SHEET_TEMPLATES = {
+    'horaria': DailySheetTemplate('24 linhas (1 hora)', 60),
+    'meia_hora': DailySheetTemplate('48 linhas (30 minutos)', 30),
+    'dez_minutos': DailySheetTemplate('144 linhas (10 minutos)', 10)
+}
+DEFAULT_DAILY_TEMPLATE = 'horaria'
+# Reconhece o modelo de cada aba pela coluna A
+AUTO_DAILY_TEMPLATE = 'automatico'
+# Aba cuja coluna A não corresponde a nenhum modelo
+UNKNOWN_DAILY_TEMPLATE = 'desconhecido'
+
+
+def _minutes_of_day(value):
+    """Minutos desde 00:00 de um horário da planilha (time, datetime, fração de dia ou 'HH:MM')"""
+    if isinstance(value, datetime):
+        value = value.time()
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    if isinstance(value, timedelta):
+        return int(value.total_seconds() // 60) % (24 * 60)
+    if isinstance(value, (int, float)) and 0 <= value < 1:
+        return int(round(value * 24 * 60))
+    if isinstance(value, str):
+        match = TIME_LABEL_PATTERN.match(value)
+        if match:
+            return int(match.group(1)) * 60 + int(match.group(2))
+    return None
+
+
+def time_rows(ws):
+    """Linhas preenchidas da coluna A a partir da primeira linha da grade (até a primeira vazia)"""
+    row = FIRST_ROW
+    while ws.cell(row=row, column=1).value not in (None, ''):
+        row += 1
+    return row - FIRST_ROW
+
+
+def detect_daily_template(ws):
+    """
+    Modelo da aba pelos horários da coluna A
+
+    O intervalo entre as duas primeiras linhas decide; sem horários legíveis, vale o número de
+    linhas preenchidas da coluna. Sem correspondência, UNKNOWN_DAILY_TEMPLATE.
+    """
+    first = _minutes_of_day(ws.cell(row=FIRST_ROW, column=1).value)
+    second = _minutes_of_day(ws.cell(row=FIRST_ROW + 1, column=1).value)
+    if first is not None and second is not None:
+        for key, template in DAILY_SHEET_TEMPLATES.items():
+            if second - first == template.step_minutes:
+                return key
+    rows = time_rows(ws)
+    for key, template in DAILY_SHEET_TEMPLATES.items():
+        if rows == template.slots:
+            return key
+    return UNKNOWN_DAILY_TEMPLATE
+
+
+def check_daily_template(ws, key):
+    """
+    Confere um modelo escolhido contra a coluna A da aba
+
+    Returns:
+        None se o modelo serve (ou a coluna A não permite conferir), ou a mensagem do conflito
+    """
+    detected = detect_daily_template(ws)
+    if detected in (UNKNOWN_DAILY_TEMPLATE, key):
+        return None
+    return (f"a coluna A tem a grade '{DAILY_SHEET_TEMPLATES[detected].label}', "
+            f"diferente da escolhida ('{DAILY_SHEET_TEMPLATES[key].label}')")
+
+
+class DailyWritePlan:
+    """
+    Coordenadas inteiras das células de uma aba diária, para as variáveis de uma grade
+
+    rows[horário] = linha; columns[dia - 1, variável] = coluna (0 = variável sem coluna na aba)
+    column_mapping: {variável: {'start_num': coluna do dia 1}}
+    """
+
+    def __init__(self, template, column_mapping, variables):
+        self.rows = template.row(np.arange(template.slots))
+        start = np.array([column_mapping[variable]['start_num'] if variable in column_mapping else 0
+                          for variable in variables], dtype=np.int64)
+        columns = start[np.newaxis, :] + np.arange(DAYS_PER_VARIABLE)[:, np.newaxis]
+        self.columns = np.where((start > 0) & (columns <= LAST_COLUMN), columns, 0)
+
+    def apply(self, ws, cube):
+        """
+        Grava os valores da grade (SnapshotCube do mesmo intervalo do modelo) na aba
+
+        Returns:
+            número de células preenchidas (valores NaN e variáveis sem coluna ficam de fora)
+        """
+        # Horários × dias × variáveis: a passada segue a ordem das linhas da aba
+        values = cube.values.transpose(1, 0, 2)
+        columns = self.columns[:cube.days]
+        slots, days, variables = np.nonzero(~np.isnan(values) & (columns > 0)[np.newaxis])
+
+        cell = ws.cell
+        for row, column, value in zip(self.rows[slots].tolist(), columns[days, variables].tolist(),
+                                      values[slots, days, variables].tolist()):
+            cell(row, column, value)
+        return len(slots)
@@ -0,0 +1,101 @@
+"""
+Alinhamento de horários alvo aos timestamps da série
+
+Para cada horário alvo (ex: as 24 × 31 horas cheias de um mês) encontra o timestamp candidato
+segundo a política de alinhamento (SNAPPING_POLICIES) com uma busca binária (np.searchsorted)
+sobre o índice ordenado, para a grade inteira de uma vez. Na política padrão (mais próximo),
+empates (um timestamp antes e outro depois, à mesma distância) ficam com o timestamp anterior,
+qualquer que seja a ordem de upload dos arquivos (a busca linear original ficava com o primeiro
+candidato na ordem de inserção); a tolerância é inclusiva.
+"""
+import numpy as np
+
+NO_MATCH = -1
+
+# Distância de alvos sem candidato (nenhuma tolerância a alcança)
+NO_DISTANCE = np.iinfo(np.int64).max
+
+DEFAULT_TOLERANCE = np.timedelta64(10, 'm')
+
+
+class SnappingPolicy:
+    """
+    Política de alinhamento: de que lado da hora o registro pode estar
+
+    backward aceita o último timestamp até o alvo, forward o primeiro a partir do alvo (com
+    os dois, vale o mais próximo). exact ignora a tolerância: só o timestamp igual ao alvo.
+    """
+
+    def __init__(self, label, backward, forward, exact=False):
+        self.label = label
+        self.backward = backward
+        self.forward = forward
+        self.exact = exact
+
+    def tolerance(self, tolerance):
+        """Tolerância efetiva em ns (0 na política exata)"""
+        return 0 if self.exact else int(np.timedelta64(tolerance, 'ns').astype(np.int64))
+
+
+SNAPPING_POLICIES = {
+    'mais_proximo': SnappingPolicy('Registro mais próximo da hora (antes ou depois)', True, True),
+    'anterior': SnappingPolicy('Último registro até a hora', True, False),
+    'posterior': SnappingPolicy('Primeiro registro a partir da hora', False, True),
+    'exato': SnappingPolicy('Somente registro exatamente na hora', True, True, exact=True)
+}
+DEFAULT_SNAPPING_POLICY = 'mais_proximo'
+
+
+def snap_candidates(timestamps, targets, policy=DEFAULT_SNAPPING_POLICY):
+    """
+    Timestamp candidato de cada alvo pela política, sem aplicar tolerância
+
+    Em empate exato de distância vence o timestamp anterior ao alvo.
+
+    Returns:
+        (posições int64 ou NO_MATCH, distâncias int64 em ns ou NO_DISTANCE)
+    """
+    policy = SNAPPING_POLICIES[policy]
+    index = np.asarray(timestamps, dtype='datetime64[ns]').astype(np.int64)
+    targets = np.asarray(targets, dtype='datetime64[ns]').astype(np.int64)
+    if len(index) == 0:
+        return np.full(len(targets), NO_MATCH, dtype=np.int64), np.full(len(targets), NO_DISTANCE)
+
+    # Candidatos: o último timestamp até o alvo e o primeiro a partir dele
+    before = np.searchsorted(index, targets, side='right') - 1
+    after = np.searchsorted(index, targets, side='left')
+    has_before = policy.backward & (before >= 0)
+    has_after = policy.forward & (after < len(index))
+
+    before_diff = np.where(has_before, targets - index[np.maximum(before, 0)], NO_DISTANCE)
+    after_diff = np.where(has_after, index[np.minimum(after, len(index) - 1)] - targets, NO_DISTANCE)
+
+    # Empate: o anterior prevalece
+    use_before = before_diff <= after_diff
+    diffs = np.where(use_before, before_diff, after_diff)
+    positions = np.where(diffs == NO_DISTANCE, NO_MATCH, np.where(use_before, before, after))
+    return positions.astype(np.int64), diffs
+
+
+def nearest_positions(timestamps, targets, tolerance, policy=DEFAULT_SNAPPING_POLICY):
+    """
+    Posição do timestamp candidato de cada alvo, dentro da tolerância
+
+    Args:
+        timestamps: datetime64 ordenados, sem repetição
+        targets: datetime64 (qualquer ordem)
+        tolerance: np.timedelta64 / pd.Timedelta / timedelta
+        policy: chave de SNAPPING_POLICIES (padrão: mais próximo, antes ou depois)
+
+    Returns:
+        array int64 com a posição em timestamps, ou NO_MATCH (-1) sem timestamp na tolerância
+    """
+    positions, diffs = snap_candidates(timestamps, targets, policy)
+    return np.where(diffs <= SNAPPING_POLICIES[policy].tolerance(tolerance), positions, NO_MATCH).astype(np.int64)
+
+
+def tolerance_vector(variables, tolerances=None):
+    """Tolerância de cada variável em ns ({variável: tolerância}; ausentes = DEFAULT_TOLERANCE)"""
+    tolerances = tolerances or {}
+    return np.array([int(np.timedelta64(tolerances.get(variable, DEFAULT_TOLERANCE), 'ns').astype(np.int64))
+                     for variable in variables], dtype=np.int64)
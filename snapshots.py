@@ -0,0 +1,135 @@
+"""
+Grade de horários de cada mês (os valores das abas "Analise Diaria")
+
+Para cada horário da grade (padrão: as horas cheias; as abas de 30 e de 10 minutos usam grades
+de 48 e 144 horários por dia, ver sheet_templates) de cada dia do mês, o registro da visão de
+10 minutos escolhido pela política de alinhamento (padrão: o mais próximo, ±10 minutos, ver
+snapping) e a diferença entre o registro encontrado e o horário. Cada variável tem sua
+tolerância: o candidato do horário é o mesmo para todas, e só é aceito nas variáveis cuja
+tolerância o alcança.
+A grade (dias × horários × variáveis) é calculada uma vez por gravação da série e
+reaproveitada pelo Excel, pelo dashboard, pela origem das células e pela exportação.
+"""
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from snapping import (
+    DEFAULT_SNAPPING_POLICY, NO_MATCH, SNAPPING_POLICIES, snap_candidates, tolerance_vector
+)
+
+# Intervalo entre horários da grade padrão (uma linha por hora)
+DEFAULT_STEP = np.timedelta64(60, 'm')
+
+
+def _grid_targets(year, month, days, step):
+    """Horários da grade do mês, dia a dia (datetime64[ns])"""
+    slots = days * (np.timedelta64(1, 'D') // step)
+    return np.datetime64(f"{year:04d}-{month:02d}-01T00:00", 'ns') + np.arange(slots) * step.astype('timedelta64[ns]')
+
+
+class SnapshotCube:
+    """Valores da grade de um mês: dias × horários × variáveis, mais o desvio do registro usado"""
+
+    def __init__(self, year, month, variables, values, offsets, accepted, step=DEFAULT_STEP):
+        self.year = year
+        self.month = month
+        self.variables = list(variables)
+        self.step = step
+        self.values = values      # float64 dias × horários × variáveis (NaN = sem valor)
+        self.offsets = offsets    # int64 dias × horários: segundos entre o registro candidato e o horário
+        self.accepted = accepted  # bool dias × horários × variáveis: candidato dentro da tolerância
+        self.matched = accepted.any(axis=2)  # horário com registro aceito em alguma variável
+
+    @property
+    def days(self):
+        return self.values.shape[0]
+
+    @property
+    def slots(self):
+        """Horários por dia"""
+        return self.values.shape[1]
+
+    def target(self, day, slot):
+        return pd.Timestamp(self.year, self.month, day) + pd.Timedelta(self.step) * slot
+
+    def matched_timestamp(self, day, slot, variable=None):
+        """Timestamp do registro usado para o dia/horário (na variável, se informada), ou None"""
+        accepted = self.matched if variable is None else self.accepted[..., self.variables.index(variable)]
+        if not accepted[day - 1, slot]:
+            return None
+        return self.target(day, slot) + pd.Timedelta(seconds=int(self.offsets[day - 1, slot]))
+
+    def hourly_means(self):
+        """Média de cada horário do dia sobre os dias do mês (DataFrame indexado por 'Hora', em horas)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            counts = (~np.isnan(self.values)).sum(axis=0)
+            means = np.nansum(self.values, axis=0) / counts
+        hours = np.arange(self.slots) * (self.step / np.timedelta64(1, 'h'))
+        if self.step % np.timedelta64(1, 'h') == np.timedelta64(0, 'm'):
+            hours = hours.astype(int)
+        return pd.DataFrame(means, index=pd.Index(hours, name='Hora'), columns=self.variables)
+
+    def frame(self):
+        """Horários com registro, uma linha por horário: Timestamp, variáveis e Desvio_s"""
+        slots = self.matched.reshape(-1)
+        targets = _grid_targets(self.year, self.month, self.days, self.step)
+        frame = pd.DataFrame(self.values.reshape(-1, len(self.variables))[slots], columns=self.variables)
+        frame.insert(0, 'Timestamp', targets[slots])
+        frame['Desvio_s'] = self.offsets.reshape(-1)[slots]
+        return frame
+
+    def report(self):
+        """
+        Resultado do alinhamento por variável (horários de dias inexistentes no mês ficam fora)
+
+        Returns:
+            DataFrame indexado por variável: 'Preenchidos' (horários com valor), 'Fora do horário'
+            (preenchidos com registro que não cai exatamente no horário) e 'Vazios'
+        """
+        filled = ~np.isnan(self.values)
+        off_slot = filled & (self.offsets != 0)[..., np.newaxis]
+        filled_count = filled.sum(axis=(0, 1))
+        return pd.DataFrame({
+            'Preenchidos': filled_count,
+            'Fora do horário': off_slot.sum(axis=(0, 1)),
+            'Vazios': self.days * self.slots - filled_count
+        }, index=pd.Index(self.variables, name='Variável'))
+
+    def nbytes(self):
+        return self.values.nbytes + self.offsets.nbytes + self.accepted.nbytes + self.matched.nbytes
+
+
+def build_snapshot_cube(view, year, month, policy=DEFAULT_SNAPPING_POLICY, tolerances=None, step=DEFAULT_STEP):
+    """
+    Grade de um mês a partir da visão de 10 minutos (DataFrame com índice ordenado)
+
+    policy: chave de snapping.SNAPPING_POLICIES; tolerances: {variável: tolerância} (ausentes: 10 min)
+    step: intervalo entre horários da grade (np.timedelta64 divisor de um dia; padrão: 1 hora)
+    """
+    days = calendar.monthrange(year, month)[1]
+    targets = _grid_targets(year, month, days, step)
+    slots = len(targets) // days
+    positions, distances = snap_candidates(view.index, targets, policy)
+    found = positions != NO_MATCH
+
+    # Um candidato por horário para todas as variáveis; a tolerância de cada uma decide se ele vale
+    tolerance = tolerance_vector(view.columns, tolerances)
+    if SNAPPING_POLICIES[policy].exact:
+        tolerance[:] = 0
+    accepted = distances[:, np.newaxis] <= tolerance[np.newaxis, :]
+
+    values = np.full((len(targets), view.shape[1]), np.nan)
+    values[found] = view.to_numpy()[positions[found]]
+    values[~accepted] = np.nan
+    offsets = np.zeros(len(targets), dtype=np.int64)
+    offsets[found] = (view.index.to_numpy()[positions[found]] - targets[found]) // np.timedelta64(1, 's')
+
+    return SnapshotCube(
+        year, month, view.columns,
+        values.reshape(days, slots, view.shape[1]),
+        offsets.reshape(days, slots),
+        accepted.reshape(days, slots, view.shape[1]),
+        step
+    )
@@ -0,0 +1,56 @@
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Os módulos ficam na raiz do repositório (sem pacote instalável)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Cache de leitura e histórico fora da pasta do usuário
+os.environ.setdefault('MEDICOES_CACHE_DIR', tempfile.mkdtemp(prefix='medicoes_cache_'))
+os.environ.setdefault('MEDICOES_HISTORY_DIR', tempfile.mkdtemp(prefix='medicoes_historico_'))
+
+SENSORS = [('Ane', 'm/s'), ('Temp', 'Deg C'), ('RH', '%'), ('Pir1', 'W/m^2'), ('Pir2', 'W/m^2'),
+           ('PirALB', 'W/m^2'), ('Batt', 'Volts'), ('LoggTemp', 'Deg C'), ('LitBatt', 'Volts')]
+STATISTICS = ['Min', 'Max', 'Avg', 'Std']
+
+
+class Upload(io.BytesIO):
+    """Arquivo enviado pelo st.file_uploader (BytesIO com nome)"""
+
+    def __init__(self, name, content):
+        super().__init__(content)
+        self.name = name
+        self.size = len(content)
+
+
+def toa5_content(start, periods, freq='10min', first_record=0, seed=0, station='Floriano'):
+    """Arquivo TOA5 com Min/Max/Avg/Std dos sensores da estação (alguns valores "NAN")"""
+    rng = np.random.default_rng(seed)
+    names = ['TIMESTAMP', 'RECORD'] + [f'{sensor}_{stat}' for sensor, _ in SENSORS for stat in STATISTICS]
+    units = ['TS', 'RN'] + [unit for _, unit in SENSORS for _ in STATISTICS]
+    processing = ['', ''] + [stat for _ in SENSORS for stat in STATISTICS]
+    lines = [
+        f'"TOA5","{station}","CR1000X","12345","CR1000X.Std.05.00","CPU:{station}.CR1X","12345","Tabela10min"',
+        ','.join(f'"{name}"' for name in names),
+        ','.join(f'"{unit}"' for unit in units),
+        ','.join(f'"{stat}"' for stat in processing)
+    ]
+    values = rng.normal(100, 50, size=(periods, len(names) - 2))
+    missing = rng.random(values.shape) < 0.02
+    for i, timestamp in enumerate(pd.date_range(start, periods=periods, freq=freq)):
+        row = [f'"{timestamp:%Y-%m-%d %H:%M:%S}"', str(first_record + i)]
+        row += ['"NAN"' if gap else f'{value:.4f}' for value, gap in zip(values[i], missing[i])]
+        lines.append(','.join(row))
+    return ('\n'.join(lines) + '\n').encode()
+
+
+@pytest.fixture
+def toa5_upload():
+    """Fábrica de uploads TOA5: toa5_upload(nome, início, registros, ...)"""
+    def make(name, start, periods, **kwargs):
+        return Upload(name, toa5_content(start, periods, **kwargs))
+    return make
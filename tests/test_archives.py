@@ -0,0 +1,63 @@
+import gzip
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+from conftest import Upload, toa5_content
+from dat_reader import COMPRESSION_DEFLATE, COMPRESSION_GZIP, expand_uploads, parse_and_normalize
+
+SCALING = {'Temp_Avg': ('Temperatura', 1, 2), 'Pir1_Avg': ('Piranometro_1', 1000, 3),
+           'RH_Avg': ('Umidade_Relativa', 1, 2)}
+
+
+def _assert_same_rows(result, expected):
+    assert result['erro'] is None
+    np.testing.assert_array_equal(result['timestamps'], expected['timestamps'])
+    np.testing.assert_array_equal(result['records'], expected['records'])
+    for name, values in expected['variables'].items():
+        np.testing.assert_array_equal(result['variables'][name], values)
+
+
+@pytest.fixture
+def plain():
+    content = toa5_content('2025-01-01', 500, seed=5)
+    return content, parse_and_normalize('a.dat', content, SCALING)
+
+
+def test_gzip_member_payload_matches_plain_file(plain):
+    content, expected = plain
+    members, errors = expand_uploads([Upload('a.dat.gz', gzip.compress(content))])
+
+    assert not errors
+    assert [(member.name, member.size) for member in members] == [('a.dat', len(content))]
+    payload, compression = members[0].payload()
+    assert compression == COMPRESSION_GZIP
+    _assert_same_rows(parse_and_normalize('a.dat', payload, SCALING, compression), expected)
+    with members[0].reading() as stream:
+        assert stream.read() == content
+
+
+@pytest.mark.parametrize('method', [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_zip_member_raw_payload_matches_plain_file(plain, method):
+    content, expected = plain
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', compression=method) as zip_file:
+        zip_file.writestr('leia-me.txt', b'ignorado')
+        zip_file.writestr('dados/a.dat', content)
+        zip_file.writestr('b.DAT', content[:len(content) // 2].rsplit(b'\n', 1)[0] + b'\n')
+    members, errors = expand_uploads([Upload('lote.zip', archive.getvalue())])
+
+    assert not errors
+    assert [member.name for member in members] == ['lote.zip/dados/a.dat', 'lote.zip/b.DAT']
+    payload, compression = members[0].payload()
+    assert compression == (COMPRESSION_DEFLATE if method == zipfile.ZIP_DEFLATED else None)
+    # Bytes brutos do membro, sem descompactar no processo principal
+    assert method == zipfile.ZIP_STORED or payload != content
+    _assert_same_rows(parse_and_normalize('a.dat', payload, SCALING, compression), expected)
+
+    payload, compression = members[1].payload()
+    half = parse_and_normalize('b.DAT', payload, SCALING, compression)
+    assert 0 < len(half['timestamps']) < len(expected['timestamps'])
+    np.testing.assert_array_equal(half['timestamps'], expected['timestamps'][:len(half['timestamps'])])
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from conflicts import CONFLICT_POLICIES, resolve_duplicates
+
+
+def _rows(seed, n_rows=400, n_timestamps=60):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, n_timestamps, n_rows), {
+        'sequencia': np.sort(rng.integers(0, 6, n_rows)),
+        'record': rng.integers(0, 50, n_rows),
+        'recente': rng.integers(0, 4, n_rows),
+        'preenchidos': rng.integers(0, 9, n_rows)
+    }
+
+
+def _sequential(group_codes, priority, replace_on_tie):
+    """Referência: linha a linha, o registro de maior prioridade visto até o momento fica"""
+    holders = {}
+    holder_before = np.full(len(group_codes), -1, dtype=np.int64)
+    took_over = np.zeros(len(group_codes), dtype=bool)
+    for row, code in enumerate(group_codes.tolist()):
+        holder = holders.get(code)
+        if holder is not None:
+            holder_before[row] = holder
+        if (holder is None or priority[row] > priority[holder]
+                or (priority[row] == priority[holder] and replace_on_tie)):
+            holders[code] = row
+            took_over[row] = True
+    is_final = np.zeros(len(group_codes), dtype=bool)
+    is_final[list(holders.values())] = True
+    return holder_before, took_over, is_final
+
+
+@pytest.mark.parametrize('policy', list(CONFLICT_POLICIES))
+@pytest.mark.parametrize('seed', range(5))
+def test_policy_matches_sequential_reference(policy, seed):
+    group_codes, attributes = _rows(seed)
+    rule = CONFLICT_POLICIES[policy]
+    priority = np.asarray(rule.priority(attributes), dtype=np.int64)
+
+    expected = _sequential(group_codes, priority, rule.replace_on_tie)
+    for result, reference in zip(resolve_duplicates(group_codes, priority, rule.replace_on_tie), expected):
+        np.testing.assert_array_equal(result, reference)
+
+
+def test_ties_follow_replace_on_tie():
+    group_codes = np.zeros(3, dtype=np.int64)
+    priority = np.zeros(3, dtype=np.int64)
+    _, _, last_wins = resolve_duplicates(group_codes, priority, True)
+    _, _, first_wins = resolve_duplicates(group_codes, priority, False)
+    np.testing.assert_array_equal(last_wins, [False, False, True])
+    np.testing.assert_array_equal(first_wins, [True, False, False])
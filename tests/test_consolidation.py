@@ -0,0 +1,53 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('streamlit')
+
+from app import ExactWeatherProcessor  # noqa: E402
+
+# Canais *_Avg consolidados: (variável, divisor, casas decimais), como no laço original
+AVERAGES = {
+    'Temp_Avg': ('Temperatura', 1, 2), 'Pir1_Avg': ('Piranometro_1', 1000, 3),
+    'Pir2_Avg': ('Piranometro_2', 1000, 3), 'PirALB_Avg': ('Piranometro_Alab', 1000, 3),
+    'RH_Avg': ('Umidade_Relativa', 1, 2), 'Ane_Avg': ('Velocidade_Vento', 1, 2),
+    'Batt_Avg': ('Bateria', 1, 2), 'LitBatt_Avg': ('LitBatt', 1, 2), 'LoggTemp_Avg': ('LogTemp', 1, 2)
+}
+
+
+def _row_by_row(uploads):
+    """Referência: linha a linha, o último arquivo sobrescreve o registro inteiro do timestamp"""
+    consolidated = {}
+    conflicts = 0
+    for upload in uploads:
+        data = pd.read_csv(io.BytesIO(upload.getvalue()), skiprows=[0, 2, 3], na_values=['NAN'])
+        for _, row in data.iterrows():
+            timestamp = pd.Timestamp(row['TIMESTAMP'])
+            conflicts += timestamp in consolidated
+            consolidated[timestamp] = {
+                variable: None if pd.isna(row[channel]) else round(row[channel] / divisor, decimals)
+                for channel, (variable, divisor, decimals) in AVERAGES.items()
+            }
+    return consolidated, conflicts
+
+
+def test_vectorized_consolidation_matches_row_by_row(toa5_upload):
+    uploads = [
+        toa5_upload('a.dat', '2025-05-01 00:00', 600, seed=4),
+        toa5_upload('b.dat', '2025-05-03 12:00', 400, seed=5, first_record=600),
+        toa5_upload('c.dat', '2025-05-02 00:00', 50, seed=6, first_record=10)
+    ]
+    expected, conflicts = _row_by_row(uploads)
+
+    processor = ExactWeatherProcessor()
+    processor.process_dat_files(uploads)
+    store = processor.consolidated_data
+
+    assert conflicts > 0 and len(processor.conflicts_detected) == conflicts
+    assert list(store.index) == sorted(expected)
+    for variable in store.variables:
+        reference = [expected[timestamp][variable] for timestamp in store.index]
+        np.testing.assert_array_equal(store.column(variable),
+                                      np.array([np.nan if value is None else value for value in reference]))
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from data_coverage import CoverageIndex
+
+
+def _index(*timestamps):
+    coverage = CoverageIndex()
+    coverage.add(pd.DatetimeIndex(list(timestamps)).to_numpy())
+    return coverage
+
+
+def test_counts_by_hour_day_and_month():
+    coverage = _index('2025-02-03 10:00', '2025-02-03 10:10', '2025-02-03 11:50', '2025-02-04 00:00')
+    assert coverage.hour_count(2025, 2, 3, 10) == 2
+    assert coverage.hour_count(2025, 2, 3, 11) == 1
+    assert coverage.hour_count(2025, 2, 3, 12) == 0
+    assert coverage.day_count(2025, 2, 3) == 3
+    assert coverage.month_count(2025, 2) == 4
+    assert coverage.month_count(2025, 3) == 0
+
+
+def test_window_queries_cross_month_boundary():
+    coverage = _index('2025-01-31 23:55', '2025-02-01 00:04')
+    assert coverage.count_between('2025-01-31 23:50', '2025-02-01 00:10') == 2
+    assert coverage.count_between('2025-02-01 00:00', '2025-02-01 00:09') == 1
+    # Resolução do slot: 23:40-23:49 não toca o slot de 23:50
+    assert not coverage.has_data('2025-01-31 23:40', '2025-01-31 23:49')
+    assert coverage.has_data(np.datetime64('2025-01-31T23:59'), np.datetime64('2025-02-01T00:00'))
+
+
+def _logger(start, periods, minutes):
+    coverage = CoverageIndex()
+    timestamps = pd.date_range(start, periods=periods, freq=f'{minutes}min').to_numpy()
+    coverage.add(timestamps, np.full(len(timestamps), minutes * 60))
+    return coverage
+
+
+def test_complete_fifteen_minute_logger_is_fully_covered():
+    coverage = _logger('2025-02-01', 28 * 96, 15)
+    assert coverage.month_completeness(2025, 2) == 1.0
+    assert (coverage.completeness(2025, 2) == 1.0).all()
+
+
+def test_fast_logger_gaps_are_not_hidden_by_slot_counts():
+    # Logger de 1 minuto com um registro a cada 10 minutos: 10% do esperado
+    coverage = CoverageIndex()
+    timestamps = pd.date_range('2025-02-01', periods=28 * 144, freq='10min').to_numpy()
+    coverage.add(timestamps, np.full(len(timestamps), 60))
+    np.testing.assert_allclose(coverage.completeness(2025, 2), 0.1)
+    assert abs(coverage.month_completeness(2025, 2) - 0.1) < 1e-12
+
+    # Logger de 5 minutos completo em um dia: as horas sem registro contam como 12 esperados
+    coverage = _logger('2025-02-03', 288, 5)
+    assert (coverage.completeness(2025, 2)[2] == 1.0).all()
+    assert coverage.completeness(2025, 2)[3].sum() == 0
+    assert abs(coverage.month_completeness(2025, 2) - 1 / 28) < 1e-12
+
+
+def test_unknown_interval_is_detected_from_timestamps():
+    coverage = CoverageIndex()
+    coverage.add(pd.date_range('2025-02-01', periods=28 * 96, freq='15min').to_numpy())
+    assert coverage.month_completeness(2025, 2) == 1.0
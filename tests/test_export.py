@@ -0,0 +1,70 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+
+import export
+from history_store import HistoryStore
+from timeseries_store import TimeSeriesStore
+
+VARIABLES = ['Temperatura', 'Umidade_Relativa']
+STATISTICS = ['Temperatura_Max']
+
+
+def _store():
+    timestamps = pd.date_range('2025-01-31 23:50', periods=4, freq='10min').to_numpy()
+    values = np.array([[25.5, 80.0], [np.nan, 81.25], [24.75, np.nan], [24.5, 82.0]])
+    statistics = np.array([[26.0], [np.nan], [25.5], [25.25]], dtype=np.float32)
+    store = TimeSeriesStore(VARIABLES, statistics=STATISTICS)
+    store.upsert(timestamps, values, {}, statistics)
+    return store, timestamps, values, statistics
+
+
+def _read(payload, fmt):
+    if fmt == 'parquet':
+        return pq.read_table(io.BytesIO(payload))
+    if fmt == 'arrow':
+        return pa.ipc.open_stream(payload).read_all()
+    return pa_csv.read_csv(io.BytesIO(payload))
+
+
+@pytest.mark.parametrize('fmt', list(export.EXPORT_FORMATS))
+def test_measurements_round_trip(fmt):
+    store, timestamps, values, statistics = _store()
+    with export.spooled_export(export.export_measurements(store, fmt)) as f:
+        table = _read(f.read(), fmt)
+
+    assert table.column_names == ['Timestamp'] + VARIABLES + STATISTICS
+    np.testing.assert_array_equal(table.column('Timestamp').to_numpy().astype('datetime64[ns]'), timestamps)
+    for i, variable in enumerate(VARIABLES):
+        np.testing.assert_array_equal(table.column(variable).to_numpy(zero_copy_only=False), values[:, i])
+    np.testing.assert_array_equal(table.column('Temperatura_Max').to_numpy(zero_copy_only=False).astype(np.float32),
+                                  statistics[:, 0])
+
+
+def test_empty_store_exports_schema_only():
+    store = TimeSeriesStore(VARIABLES, statistics=STATISTICS)
+    table = _read(b''.join(export.export_measurements(store, 'parquet')), 'parquet')
+    assert table.num_rows == 0
+    assert table.column_names == ['Timestamp'] + VARIABLES + STATISTICS
+
+
+def test_cli_exports_from_history(tmp_path):
+    store, timestamps, values, statistics = _store()
+    history = HistoryStore(str(tmp_path / 'historico')).station('Floriano')
+    attributes = {name: np.zeros(len(timestamps), dtype=np.int64)
+                  for name in ('sequencia', 'record', 'recente', 'intervalo')}
+    history.append(timestamps, values, VARIABLES, attributes, {'Temperatura_Max': statistics[:, 0]})
+    output = tmp_path / 'saida.csv'
+
+    assert export.main(['--historico', str(tmp_path / 'historico'), '--formato', 'csv', '--saida', str(output),
+                        '--inicio', '2025-02']) == 0
+
+    table = pa_csv.read_csv(str(output))
+    # Só fevereiro: os três registros a partir de 00:00 do dia 1
+    np.testing.assert_array_equal(table.column('Timestamp').to_numpy().astype('datetime64[ns]'), timestamps[1:])
+    np.testing.assert_array_equal(table.column('Umidade_Relativa').to_numpy(zero_copy_only=False), values[1:, 1])
@@ -0,0 +1,51 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import Upload, toa5_content
+from dat_reader import read_toa5, read_toa5_chunks
+from history_store import HistoryStore
+
+
+def _data_lines(content):
+    return content.split(b'\n', 4)[4]
+
+
+@pytest.mark.parametrize('reset', [False, True])
+def test_incremental_read_keeps_rows_after_record_reset(reset):
+    # 3000 registros já ingeridos e 400 novos; com reset o logger recomeça o RECORD em 0
+    content = toa5_content('2025-01-01', 3000) + _data_lines(
+        toa5_content('2025-01-21 20:00', 400, first_record=0 if reset else 3000, seed=1)
+    )
+    after = (2999, np.datetime64('2025-01-21T19:50', 'ns'))
+
+    data, _, _ = read_toa5(io.BytesIO(content), after)
+    chunks = [chunk for chunk, _, _ in read_toa5_chunks(io.BytesIO(content), 64 * 1024, after)]
+
+    first_record = 0 if reset else 3000
+    np.testing.assert_array_equal(data['RECORD'], np.arange(first_record, first_record + 400))
+    assert data['TIMESTAMP'].iloc[0] == pd.Timestamp('2025-01-21 20:00')
+    np.testing.assert_array_equal(pd.concat(chunks)['RECORD'], data['RECORD'])
+
+
+def test_watermarks_persist_in_history(tmp_path):
+    pytest.importorskip('streamlit')
+    from app import ExactWeatherProcessor
+
+    history = HistoryStore(str(tmp_path))
+    first = ExactWeatherProcessor()
+    first.history = history
+    first.process_dat_files([Upload('a.dat', toa5_content('2025-01-01', 1000))], incremental=True)
+
+    # Sessão nova com o mesmo histórico: só os registros acrescentados ao arquivo são lidos
+    second = ExactWeatherProcessor()
+    second.history = history
+    second.process_dat_files([Upload('a.dat', toa5_content('2025-01-01', 1200))], incremental=True)
+
+    assert [info['registros'] for info in second.file_processing_info] == [200]
+    assert list(history.watermarks().values()) == [(1199, np.datetime64('2025-01-09T07:50', 'ns'))]
+
+    history.clear()
+    assert history.watermarks() == {}
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+
+from conftest import toa5_content
+from dat_reader import parse_and_normalize, parse_files
+from parse_cache import ParsedFileCache
+
+SCALING = {'Temp_Avg': ('Temperatura', 1, 2), 'Pir1_Avg': ('Piranometro_1', 1000, 3)}
+
+
+def _result(name, periods, seed=0):
+    return parse_and_normalize(name, toa5_content('2025-01-01', periods, seed=seed), SCALING)
+
+
+def _put(cache, key, result, mtime):
+    cache.put(key, result)
+    os.utime(cache._path(key), (mtime, mtime))
+
+
+def test_least_recently_used_entry_is_evicted_at_byte_limit(tmp_path):
+    probe = ParsedFileCache(str(tmp_path / 'probe'), 10 ** 9)
+    probe.put('a', _result('a.dat', 500))
+    entry_bytes = probe.stats()['tamanho']
+
+    cache = ParsedFileCache(str(tmp_path / 'cache'), int(2.5 * entry_bytes))
+    _put(cache, 'a', _result('a.dat', 500, seed=1), 100)
+    _put(cache, 'b', _result('b.dat', 500, seed=2), 200)
+    # Leitura de "a" o torna o mais recente: "b" sai quando "c" passa do limite
+    assert cache.get('a') is not None
+    _put(cache, 'c', _result('c.dat', 500, seed=3), 10 ** 10)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['tamanho'] <= cache.max_bytes
+
+
+def test_changed_content_under_same_name_is_parsed_again(tmp_path):
+    cache = ParsedFileCache(str(tmp_path), 10 ** 9)
+    first = parse_files([('a.dat', toa5_content('2025-01-01', 100, seed=1), None, None)], SCALING, cache=cache)[0]
+    assert cache.stats()['arquivos'] == 1
+
+    second = parse_files([('a.dat', toa5_content('2025-01-01', 120, seed=2), None, None)], SCALING, cache=cache)[0]
+    assert len(second['timestamps']) == 120
+    assert not np.array_equal(second['variables']['Temperatura'][:100], first['variables']['Temperatura'],
+                              equal_nan=True)
+    assert cache.stats()['arquivos'] == 2
+
+    # Mesmo conteúdo de novo: resultado do cache, igual ao lido
+    again = parse_files([('a.dat', toa5_content('2025-01-01', 120, seed=2), None, None)], SCALING, cache=cache)[0]
+    np.testing.assert_array_equal(again['variables']['Temperatura'], second['variables']['Temperatura'])
+    assert cache.stats()['arquivos'] == 2
+
+
+def test_stats_and_clear(tmp_path):
+    cache = ParsedFileCache(str(tmp_path), 10 ** 9)
+    assert cache.stats() == {'arquivos': 0, 'tamanho': 0, 'limite': 10 ** 9, 'diretorio': str(tmp_path)}
+
+    cache.put('a', _result('a.dat', 50))
+    cache.put('b', _result('b.dat', 50))
+    # Resultados com erro não são guardados
+    cache.put('c', parse_and_normalize('c.dat', b'', SCALING))
+    stats = cache.stats()
+    assert stats['arquivos'] == 2
+    assert stats['tamanho'] == sum(os.path.getsize(cache._path(key)) for key in 'ab')
+
+    cache.clear()
+    assert cache.stats()['arquivos'] == 0
+    assert cache.get('a') is None
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import dat_reader
+from conftest import toa5_content
+
+SCALING = {'Temp_Avg': ('Temperatura', 1, 2)}
+
+
+def dying_parse(name, *args):
+    """parse_and_normalize cujo processo é encerrado à força ao ler "morre.dat" (roda no pool)"""
+    if name == 'morre.dat':
+        os._exit(1)
+    return dat_reader.parse_and_normalize(name, *args)
+
+
+class BrokenPool:
+    """Pool cujo processo morre ao ler o arquivo "morre.dat" (ex: encerrado por falta de memória)"""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, func, name, *args):
+        future = Future()
+        if name == 'morre.dat':
+            future.set_exception(BrokenProcessPool('processo encerrado'))
+        else:
+            future.set_result(func(name, *args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_worker_fails_only_its_file_and_resets_pool(monkeypatch):
+    pool = BrokenPool()
+    monkeypatch.setattr(dat_reader, '_EXECUTOR', pool)
+    monkeypatch.setattr(dat_reader.os, 'cpu_count', lambda: 4)
+    content = toa5_content('2025-01-01', 6)
+    named_contents = [('a.dat', content, None, None), ('morre.dat', content, None, None),
+                      ('b.dat', content, None, None)]
+
+    results = dat_reader.parse_files(named_contents, SCALING)
+
+    assert [result['arquivo'] for result in results] == ['a.dat', 'morre.dat', 'b.dat']
+    assert results[0]['erro'] is None and results[2]['erro'] is None
+    assert 'processo encerrado' in results[1]['erro']
+    assert pool.shut_down
+    assert dat_reader._EXECUTOR is None
+
+
+def test_killed_worker_fails_only_its_file(monkeypatch):
+    # Pool real de dois processos: os arquivos em andamento com "morre.dat" são repetidos
+    monkeypatch.setattr(dat_reader, '_EXECUTOR', None)
+    monkeypatch.setattr(dat_reader.os, 'cpu_count', lambda: 2)
+    monkeypatch.setattr(dat_reader, 'parse_and_normalize', dying_parse)
+    names = ['a.dat', 'morre.dat', 'b.dat', 'c.dat', 'd.dat']
+    named_contents = [(name, toa5_content('2025-01-01', 6, seed=n), None, None) for n, name in enumerate(names)]
+
+    try:
+        results = dat_reader.parse_files(named_contents, SCALING)
+    finally:
+        if dat_reader._EXECUTOR is not None:
+            dat_reader._EXECUTOR.shutdown()
+
+    assert [result['arquivo'] for result in results] == names
+    assert results[1]['erro'] is not None
+    for result in results[:1] + results[2:]:
+        assert result['erro'] is None
+        assert len(result['timestamps']) == 6
@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip('streamlit')
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from app import ExactWeatherProcessor  # noqa: E402
+from history_store import HistoryStore  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+@pytest.fixture
+def processed_app(toa5_upload):
+    """App já com dados consolidados de dois meses, como depois de "Processar Dados" """
+    processor = ExactWeatherProcessor()
+    processor.process_dat_files([toa5_upload('a.dat', '2025-01-20 00:00', 3000, seed=8)])
+    app = AppTest.from_file(APP, default_timeout=120)
+    app.session_state['processor'] = processor
+    app.session_state['processing_completed'] = True
+    return app.run()
+
+
+def test_completeness_month_survives_rerun(processed_app):
+    month = processed_app.selectbox(key='coverage_month')
+    assert month.value == (2025, 2)
+
+    processed_app = month.set_value((2025, 1)).run()
+    assert not processed_app.exception
+    assert processed_app.selectbox(key='coverage_month').value == (2025, 1)
+    # Janeiro: do dia 20 ao 31, 144 registros por dia
+    assert any('(1,728 registros)' in caption.value for caption in processed_app.caption)
+
+
+@pytest.mark.parametrize('resolution', ['hora', 'dia'])
+def test_chart_resolution_switch_keeps_preview(processed_app, resolution):
+    processed_app = processed_app.radio(key='preview_resolution').set_value(resolution).run()
+    assert not processed_app.exception
+
+    # Gráfico da temperatura: um ponto por linha completa da visão escolhida
+    temperature = json.loads(processed_app.get('plotly_chart')[1].proto.spec)
+    view = processed_app.session_state['processor'].consolidated_data.resampled(resolution)
+    assert len(temperature['data'][0]['x']) == len(view.dropna())
+
+
+def test_history_is_opt_in_and_merged_rows_are_reported(toa5_upload, tmp_path):
+    history = HistoryStore(str(tmp_path))
+    earlier = ExactWeatherProcessor()
+    earlier.history = history
+    earlier.process_dat_files([toa5_upload('a.dat', '2025-01-01 00:00', 1000)])
+
+    processor = ExactWeatherProcessor()
+    processor.history = history
+    processor.process_dat_files([toa5_upload('b.dat', '2025-01-08 00:00', 500, first_record=5000, seed=3)])
+
+    app = AppTest.from_file(APP, default_timeout=120)
+    app.session_state['processor'] = processor
+    app.session_state['processing_completed'] = True
+    app = app.run()
+
+    assert not app.exception
+    assert app.checkbox(key='use_history').value is False
+    assert any(info.value.startswith('Histórico local: 1,000 registro(s)') and '01/2025 (Floriano)' in info.value
+               for info in app.info)
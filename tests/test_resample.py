@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from resample import native_rows, resampled_frame
+from timeseries_store import TimeSeriesStore
+
+
+def _add_file(store, start, periods, freq, values, sequence):
+    timestamps = pd.date_range(start, periods=periods, freq=freq).to_numpy()
+    interval = pd.Timedelta(freq) // pd.Timedelta(seconds=1)
+    store.upsert(timestamps, np.asarray(values, dtype=np.float64).reshape(-1, 1), {
+        'sequencia': sequence, 'record': np.arange(periods), 'recente': 0, 'intervalo': interval, 'fonte': sequence
+    })
+    return timestamps
+
+
+def test_offset_ten_minute_files_keep_logged_values():
+    # Dois arquivos de 10 minutos deslocados em 3 minutos: no mês, o intervalo mais frequente
+    # fica abaixo de 10 minutos, mas cada linha vem de um arquivo de 10 minutos
+    store = TimeSeriesStore(['Temperatura'], decimals={'Temperatura': 2})
+    rng = np.random.default_rng(0)
+    _add_file(store, '2025-02-01 00:00', 4032, '10min', rng.normal(25, 3, 4032).round(2), 0)
+    _add_file(store, '2025-02-10 00:03', 1000, '10min', rng.normal(25, 3, 1000).round(2), 1)
+
+    view = store.resampled('10min')
+    assert view.index.equals(store.index)
+    np.testing.assert_array_equal(view['Temperatura'].to_numpy(), store.column('Temperatura'))
+
+
+def test_mixed_resolution_bins_only_fast_file_rows():
+    store = TimeSeriesStore(['Temperatura'], decimals={'Temperatura': 2})
+    # Arquivo de 1 minuto (00:00-00:59) e arquivo de 10 minutos em :03:30, no mesmo período
+    fast = _add_file(store, '2025-03-01 00:00', 60, '1min', np.arange(60) / 3, 0)
+    slow = _add_file(store, '2025-03-01 00:03:30', 6, '10min', [10.5, 11.25, 12.0, 13.75, 14.5, 15.0], 1)
+
+    view = store.resampled('10min')['Temperatura']
+    # Registros do arquivo de 10 minutos: exatos, no próprio timestamp
+    np.testing.assert_array_equal(view[slow].to_numpy(), [10.5, 11.25, 12.0, 13.75, 14.5, 15.0])
+    # Médias do arquivo de 1 minuto, arredondadas como os valores gravados (2 casas)
+    labels = fast[::10]
+    expected = np.round((np.arange(60) / 3).reshape(6, 10).mean(axis=1), 2)
+    np.testing.assert_array_equal(view[labels].to_numpy(), expected)
+    assert len(view) == 12
+
+
+def test_native_record_wins_over_bin_with_same_label():
+    frame = pd.DataFrame({'v': [1.0, 2.0, 3.0, 7.0]},
+                         index=pd.DatetimeIndex(['2025-01-01 00:00', '2025-01-01 00:01', '2025-01-01 00:02',
+                                                 '2025-01-01 00:10'], name='Timestamp'))
+    # 00:00 vem de um arquivo de 10 minutos; 00:01, 00:02 e 00:10 de um arquivo de 1 minuto
+    view = resampled_frame(frame, '10min', np.array([600, 60, 60, 60]))
+    assert view['v'].to_dict() == {pd.Timestamp('2025-01-01 00:00'): 1.0, pd.Timestamp('2025-01-01 00:10'): 7.0}
+
+
+def test_unknown_intervals_fall_back_to_detected_interval():
+    timestamps = pd.date_range('2025-01-01', periods=20, freq='1min').to_numpy()
+    assert not native_rows(timestamps, np.zeros(20), '10min').any()
+    timestamps = pd.date_range('2025-01-01', periods=20, freq='10min').to_numpy()
+    assert native_rows(timestamps, np.zeros(20), '10min').all()
@@ -0,0 +1,51 @@
+import csv
+
+import numpy as np
+
+import dat_reader
+from conftest import toa5_content
+from dat_reader import parse_and_normalize, read_data_file
+
+SCALING = {'Temp_Avg': ('Temperatura', 1, 2), 'Pir1_Avg': ('Piranometro_1', 1000, 3),
+           'RH_Avg': ('Umidade_Relativa', 1, 2), 'Ane_Avg': ('Velocidade_Vento', 1, 2)}
+
+
+def _reordered(content):
+    """Mesmo arquivo com os canais em ordem inversa e um canal a mais (Extra_Avg) no meio"""
+    lines = content.decode().splitlines()
+    rows = list(csv.reader(lines[1:]))
+    order = [0, 1] + list(range(len(rows[0]) - 1, 1, -1))
+    extra = ['Extra_Avg', 'V', 'Avg']
+    out = [lines[0]]
+    for i, row in enumerate(rows):
+        reordered = [row[j] for j in order]
+        reordered.insert(5, extra[i] if i < 3 else '12.5')
+        # Cabeçalho e TIMESTAMP entre aspas, como no arquivo do logger
+        quoted = range(len(reordered)) if i < 3 else [0]
+        out.append(','.join(f'"{value}"' if j in quoted or value == 'NAN' else value
+                            for j, value in enumerate(reordered)))
+    return ('\n'.join(out) + '\n').encode()
+
+def test_reordered_channels_land_in_the_same_variables(monkeypatch):
+    monkeypatch.setattr(dat_reader, '_SCHEMA_CACHE', {})
+    content = toa5_content('2025-01-01', 200, seed=8)
+    reordered = _reordered(content)
+
+    # Arquivo reordenado primeiro: o esquema dele não pode servir ao arquivo original
+    shuffled = parse_and_normalize('b.dat', reordered, SCALING)
+    original = parse_and_normalize('a.dat', content, SCALING)
+
+    assert shuffled['erro'] is None and original['erro'] is None
+    np.testing.assert_array_equal(shuffled['timestamps'], original['timestamps'])
+    np.testing.assert_array_equal(shuffled['records'], original['records'])
+    for variable in ('Temperatura', 'Piranometro_1', 'Umidade_Relativa', 'Velocidade_Vento'):
+        np.testing.assert_array_equal(shuffled['variables'][variable], original['variables'][variable])
+
+    # Mesmo logger, programa e tabela: um esquema por cabeçalho, cada um com os seus campos
+    assert len(dat_reader._SCHEMA_CACHE) == 2
+    _, _, original_schema = read_data_file(content)
+    _, _, shuffled_schema = read_data_file(reordered)
+    assert original_schema is not shuffled_schema
+    assert 'Extra_Avg' in shuffled_schema.fields and 'Extra_Avg' not in original_schema.fields
+    assert shuffled_schema.fields.index('Temp_Avg') != original_schema.fields.index('Temp_Avg')
+    assert shuffled_schema.units['Extra_Avg'] == 'V'
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip('streamlit')
+
+import session_memory  # noqa: E402
+import shared_datasets  # noqa: E402
+from app import ExactWeatherProcessor  # noqa: E402
+
+
+@pytest.fixture
+def sessions():
+    """Ids de sessão usados no teste, removidos do registro no fim"""
+    ids = ('ociosa', 'ativa')
+    yield ids
+    for session_id in ids:
+        session_memory._SESSIONS.pop(session_id, None)
+    shared_datasets.drop_unused()
+
+
+def test_idle_session_is_released_on_its_own_run(toa5_upload, monkeypatch, sessions):
+    monkeypatch.setenv('MEDICOES_GLOBAL_BUDGET_MB', '0')
+    monkeypatch.setenv('MEDICOES_SESSION_IDLE_SECONDS', '0')
+    idle = ExactWeatherProcessor()
+    idle.process_dat_files([toa5_upload('a.dat', '2025-03-01 00:00', 500, seed=11)])
+    active = ExactWeatherProcessor()
+
+    idle_id, active_id = sessions
+    session_memory.track(idle_id, idle)
+    session_memory.track(active_id, active)
+
+    # Outra sessão só marca a ociosa: os dados dela continuam intactos até a próxima execução
+    assert len(idle.consolidated_data) == 500
+    assert not idle.evicted
+
+    session_memory.track(idle_id, idle)
+    assert idle.evicted
+    assert len(idle.consolidated_data) == 0
+    assert idle.shared_key is None
@@ -0,0 +1,58 @@
+import gzip
+import io
+import zipfile
+
+import shared_datasets
+from conftest import Upload as _Upload
+from dat_reader import expand_uploads
+
+
+def _members(uploads):
+    members, errors = expand_uploads(uploads)
+    assert not errors
+    return members
+
+
+def test_batch_digest_streams_members_without_payload(monkeypatch):
+    content = b'"TOA5","Estacao"\n' + b'1,2,3\n' * 5000
+    upload = _Upload('a.dat', content)
+    members = _members([upload])
+    monkeypatch.setattr(shared_datasets, 'HASH_CHUNK_BYTES', 1000)
+    for member in members:
+        member.payload = None  # o hash não pode carregar o conteúdo inteiro
+
+    digest = shared_datasets.batch_digest(members, 'ultimo_arquivo', {})
+    assert digest == shared_datasets.batch_digest(_members([_Upload('a.dat', content)]), 'ultimo_arquivo', {})
+    # O upload continua legível do início
+    assert members[0].open().read() == content
+
+
+def test_batch_digest_depends_on_content_name_and_policy():
+    content = b'1,2,3\n' * 100
+    base = shared_datasets.batch_digest(_members([_Upload('a.dat', content)]), 'ultimo_arquivo', {})
+    assert base != shared_datasets.batch_digest(_members([_Upload('a.dat', content + b'4\n')]), 'ultimo_arquivo', {})
+    assert base != shared_datasets.batch_digest(_members([_Upload('b.dat', content)]), 'ultimo_arquivo', {})
+    assert base != shared_datasets.batch_digest(_members([_Upload('a.dat', content)]), 'primeiro_arquivo', {})
+    # Mesmo conteúdo compactado: mesmo tamanho descompactado e mesmos bytes lidos
+    gz = shared_datasets.batch_digest(_members([_Upload('a.dat.gz', gzip.compress(content))]), 'ultimo_arquivo', {})
+    assert gz == base
+
+
+def test_batch_digest_closes_archive_readers():
+    content = b'1,2,3\n' * 100
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_file:
+        zip_file.writestr('c.dat', content)
+    members = _members([_Upload('a.dat', content), _Upload('b.dat.gz', gzip.compress(content)),
+                        _Upload('lote.zip', archive.getvalue())])
+    readers = []
+    for member in members:
+        def open_reader(open_func=member.open):
+            readers.append(open_func())
+            return readers[-1]
+        member.open = open_reader
+
+    shared_datasets.batch_digest(members, 'ultimo_arquivo', {})
+
+    # Leitores do .gz e do .zip fechados; o upload direto continua aberto para a leitura
+    assert [reader.closed for reader in readers] == [False, True, True]
@@ -0,0 +1,137 @@
+from datetime import time
+
+import pytest
+from openpyxl import Workbook
+
+from sheet_templates import (
+    DEFAULT_DAILY_TEMPLATE, FIRST_ROW, UNKNOWN_DAILY_TEMPLATE, check_daily_template, detect_daily_template, time_rows
+)
+
+
+def _sheet(labels):
+    ws = Workbook().active
+    for offset, label in enumerate(labels):
+        ws.cell(row=FIRST_ROW + offset, column=1, value=label)
+    return ws
+
+
+def test_detects_template_from_time_step():
+    assert detect_daily_template(_sheet([time(h) for h in range(24)])) == 'horaria'
+    assert detect_daily_template(_sheet([f"{m // 60:02d}:{m % 60:02d}" for m in range(0, 1440, 30)])) == 'meia_hora'
+    assert detect_daily_template(_sheet([m / 1440 for m in range(0, 1440, 10)])) == 'dez_minutos'
+
+
+def test_unparseable_time_column_falls_back_to_row_count():
+    ws = _sheet([f"Hora {i}" for i in range(144)])
+    assert time_rows(ws) == 144
+    assert detect_daily_template(ws) == 'dez_minutos'
+    assert detect_daily_template(_sheet([f"Hora {i}" for i in range(24)])) == 'horaria'
+
+
+def test_unknown_sheet_is_not_guessed():
+    assert detect_daily_template(_sheet([])) == UNKNOWN_DAILY_TEMPLATE
+    assert detect_daily_template(_sheet([f"Hora {i}" for i in range(30)])) == UNKNOWN_DAILY_TEMPLATE
+
+
+def test_override_must_match_time_column():
+    hourly = _sheet([time(h) for h in range(24)])
+    assert check_daily_template(hourly, 'horaria') is None
+    assert check_daily_template(hourly, 'dez_minutos') is not None
+    # Coluna A sem grade reconhecida: o modelo escolhido não pode ser conferido
+    assert check_daily_template(_sheet([]), 'dez_minutos') is None
+
+
+def test_auto_mode_writes_unknown_sheet_with_default_template():
+    pytest.importorskip('streamlit')
+    from app import ExactWeatherProcessor
+
+    processor = ExactWeatherProcessor()
+    assert processor._daily_sheet_template(_sheet([]), '01-Analise Diaria') == DEFAULT_DAILY_TEMPLATE
+    assert len(processor.daily_template_warnings) == 1
+
+    # Grade escolhida diferente da coluna A: a aba continua sem ser gravada
+    processor.daily_template = 'dez_minutos'
+    assert processor._daily_sheet_template(_sheet([time(h) for h in range(24)]), '02-Analise Diaria') is None
+
+
+@pytest.mark.parametrize('template_key', ['horaria', 'dez_minutos'])
+def test_write_plan_hits_string_addressed_cells(template_key):
+    pytest.importorskip('streamlit')
+    import numpy as np
+    import pandas as pd
+    from openpyxl.utils import get_column_letter
+
+    from app import ExactWeatherProcessor
+    from sheet_templates import DAILY_SHEET_TEMPLATES
+    from snapshots import build_snapshot_cube
+
+    processor = ExactWeatherProcessor()
+    template = DAILY_SHEET_TEMPLATES[template_key]
+    variables = list(processor.column_mapping) + ['LogTemp']
+    index = pd.date_range('2025-05-01', '2025-05-31 23:50', freq='10min')
+    values = np.random.default_rng(3).normal(20, 5, (len(index), len(variables)))
+    values[1::7, 0] = np.nan
+    cube = build_snapshot_cube(pd.DataFrame(values, index=index, columns=variables), 2025, 5, step=template.step)
+
+    ws = Workbook().active
+    filled = processor._update_daily_analysis_exact(ws, cube, template_key)
+
+    # Referência: o endereçamento 'XX3' célula a célula da gravação original
+    expected = Workbook().active
+    for day in range(1, cube.days + 1):
+        for slot in range(template.slots):
+            for v, variable in enumerate(variables):
+                value = cube.values[day - 1, slot, v]
+                if variable in processor.column_mapping and not np.isnan(value):
+                    column = get_column_letter(processor.column_mapping[variable]['start_num'] + day - 1)
+                    expected[f"{column}{FIRST_ROW + slot}"] = value
+
+    assert filled == sum(1 for row in expected.iter_rows() for cell in row if cell.value is not None)
+    assert ws.max_row == expected.max_row == FIRST_ROW + template.slots - 1
+    assert ws.max_column == expected.max_column == 187
+    for row in range(1, expected.max_row + 2):
+        for column in range(1, expected.max_column + 2):
+            assert ws.cell(row, column).value == expected.cell(row, column).value, (row, column)
+    # Primeira linha após o cabeçalho e última coluna (GE, Velocidade_Vento do dia 31)
+    assert ws['B3'].value == cube.values[0, 0, 0]
+    assert ws['GE3'].value == cube.values[30, 0, variables.index('Velocidade_Vento')]
+
+
+@pytest.mark.parametrize('labels, template_key, last_row, warned', [
+    ([time(h) for h in range(24)], 'horaria', FIRST_ROW + 23, False),
+    ([f"{m // 60:02d}:{m % 60:02d}" for m in range(0, 1440, 10)], 'dez_minutos', FIRST_ROW + 143, False),
+    ([f"Hora {i}" for i in range(30)], 'horaria', FIRST_ROW + 23, True)
+])
+def test_excel_update_follows_detected_daily_grid(toa5_upload, labels, template_key, last_row, warned):
+    pytest.importorskip('streamlit')
+    import io
+
+    from openpyxl import load_workbook
+
+    import shared_datasets
+    from app import ExactWeatherProcessor
+
+    processor = ExactWeatherProcessor()
+    processor.process_dat_files([toa5_upload('a.dat', '2025-05-01 00:00', 288, seed=4)])
+    processor._release_shared()
+    shared_datasets.drop_unused()
+
+    wb = Workbook()
+    wb.active.title = '05-Analise Diaria'
+    for offset, label in enumerate(labels):
+        wb.active.cell(row=FIRST_ROW + offset, column=1, value=label)
+    content = io.BytesIO()
+    wb.save(content)
+    content.seek(0)
+
+    success, message = processor.update_excel_file(content)
+    assert success, message
+    assert processor.daily_sheet_templates['05-Analise Diaria'] == template_key
+    assert len(processor.daily_template_warnings) == (1 if warned else 0)
+    if warned:
+        assert 'não reconhecida' in processor.daily_template_warnings[0]
+
+    # Coluna da Velocidade_Vento do dia 1 (FA): última linha da grade preenchida, a seguinte não
+    sheet = load_workbook(processor.excel_path)['05-Analise Diaria']
+    assert sheet.cell(row=last_row, column=157).value is not None
+    assert sheet.cell(row=last_row + 1, column=157).value is None
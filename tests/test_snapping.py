@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from snapping import DEFAULT_SNAPPING_POLICY, NO_MATCH, SNAPPING_POLICIES, nearest_positions, snap_candidates
+
+TOLERANCE = np.timedelta64(10, 'm')
+
+
+def _times(*labels):
+    return np.array(labels, dtype='datetime64[ns]')
+
+
+def _sequential(timestamps, target, tolerance, policy):
+    """Referência: percorre a série inteira; empate fica com o timestamp anterior"""
+    rule = SNAPPING_POLICIES[policy]
+    best, best_distance = NO_MATCH, None
+    for position, timestamp in enumerate(timestamps):
+        if timestamp <= target and rule.backward:
+            distance = target - timestamp
+        elif timestamp >= target and rule.forward:
+            distance = timestamp - target
+        else:
+            continue
+        if best_distance is None or distance < best_distance:
+            best, best_distance = position, distance
+    limit = np.timedelta64(0, 'ns') if rule.exact else tolerance
+    return best if best_distance is not None and best_distance <= limit else NO_MATCH
+
+
+def test_binary_search_matches_linear_scan():
+    rng = np.random.default_rng(7)
+    offsets = np.unique(rng.integers(0, 48 * 60, 150)) * np.timedelta64(1, 'm')
+    timestamps = np.datetime64('2025-01-31T00:00', 'ns') + offsets
+    targets = np.datetime64('2025-01-31T00:00', 'ns') + np.arange(48) * np.timedelta64(1, 'h')
+
+    expected = [_sequential(timestamps, target, TOLERANCE, DEFAULT_SNAPPING_POLICY) for target in targets]
+    np.testing.assert_array_equal(nearest_positions(timestamps, targets, TOLERANCE), expected)
+
+
+@pytest.mark.parametrize('policy', list(SNAPPING_POLICIES))
+def test_policies_match_sequential_reference(policy):
+    rng = np.random.default_rng(7)
+    offsets = np.unique(rng.integers(0, 48 * 60, 150)) * np.timedelta64(1, 'm')
+    timestamps = np.datetime64('2025-01-31T00:00', 'ns') + offsets
+    targets = np.datetime64('2025-01-31T00:00', 'ns') + np.arange(48) * np.timedelta64(1, 'h')
+
+    expected = [_sequential(timestamps, target, TOLERANCE, policy) for target in targets]
+    np.testing.assert_array_equal(nearest_positions(timestamps, targets, TOLERANCE, policy), expected)
+
+
+def test_tie_goes_to_previous_record():
+    timestamps = _times('2025-03-01T09:55', '2025-03-01T10:05')
+    positions, distances = snap_candidates(timestamps, _times('2025-03-01T10:00'))
+    assert positions.tolist() == [0]
+    assert distances.tolist() == [np.timedelta64(5, 'm').astype('timedelta64[ns]').astype(np.int64)]
+
+
+def test_tolerance_is_inclusive():
+    timestamps = _times('2025-03-01T09:50', '2025-03-01T11:10:01')
+    targets = _times('2025-03-01T10:00', '2025-03-01T11:00')
+    assert nearest_positions(timestamps, targets, TOLERANCE).tolist() == [0, NO_MATCH]
+
+
+def test_policy_sides_and_exact():
+    timestamps = _times('2025-03-01T09:58', '2025-03-01T10:03')
+    target = _times('2025-03-01T10:00')
+    assert nearest_positions(timestamps, target, TOLERANCE, 'mais_proximo').tolist() == [0]
+    assert nearest_positions(timestamps, target, TOLERANCE, 'anterior').tolist() == [0]
+    assert nearest_positions(timestamps, target, TOLERANCE, 'posterior').tolist() == [1]
+    assert nearest_positions(timestamps, target, TOLERANCE, 'exato').tolist() == [NO_MATCH]
+    assert nearest_positions(timestamps[1:], _times('2025-03-01T10:03'), TOLERANCE, 'exato').tolist() == [0]
+
+
+def test_empty_series_has_no_match():
+    positions, _ = snap_candidates(np.array([], dtype='datetime64[ns]'), _times('2025-03-01T10:00'))
+    assert positions.tolist() == [NO_MATCH]
+
+
+def test_tie_goes_to_earlier_timestamp_not_first_upload(toa5_upload):
+    pytest.importorskip('streamlit')
+    import shared_datasets
+    from app import ExactWeatherProcessor
+
+    # O arquivo com 10:05 é enviado primeiro; a busca linear original ficaria com ele
+    processor = ExactWeatherProcessor()
+    processor.process_dat_files([toa5_upload('a.dat', '2025-03-01 10:05', 1, seed=1),
+                                 toa5_upload('b.dat', '2025-03-01 09:55', 1, seed=2)])
+    cube = processor._snapshot_cube(processor.consolidated_data, 2025, 3)
+    processor._release_shared()
+    shared_datasets.drop_unused()
+    assert cube.matched_timestamp(1, 10) == pd.Timestamp('2025-03-01 09:55')
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from snapshots import build_snapshot_cube
+from timeseries_store import TimeSeriesStore
+
+
+def test_cube_uses_records_across_month_boundaries():
+    # 23:55 do mês anterior vale para 00:00 do dia 1; 00:05 do mês seguinte fica a 65 minutos
+    # do último horário do mês (23:00) e não entra na grade
+    store = TimeSeriesStore(['Temperatura'])
+    store.upsert(pd.DatetimeIndex(['2025-01-31 23:55', '2025-02-28 23:04', '2025-03-01 00:05']).to_numpy(),
+                 np.array([[1.0], [2.0], [3.0]]), {})
+    cube = store.snapshot_cube(2025, 2)
+    assert cube.days == 28 and cube.slots == 24
+    assert cube.values[0, 0, 0] == 1.0
+    assert cube.offsets[0, 0] == -300
+    assert cube.matched_timestamp(1, 0) == pd.Timestamp('2025-01-31 23:55')
+    assert cube.values[27, 23, 0] == 2.0
+    # Nenhum horário de fevereiro fica com o registro de março
+    assert not (cube.values == 3.0).any()
+    assert cube.report().loc['Temperatura', 'Preenchidos'] == 2
+
+
+    # Tolerância de 30 minutos: a fatia se estende e 23:40 de janeiro vale para 00:00 do dia 1
+    store = TimeSeriesStore(['Temperatura'])
+    store.upsert(pd.DatetimeIndex(['2025-01-31 23:40', '2025-02-01 03:00']).to_numpy(), np.array([[4.0], [5.0]]), {})
+    assert np.isnan(store.snapshot_cube(2025, 2).values[0, 0, 0])
+    assert store.snapshot_cube(2025, 2, tolerances={'Temperatura': pd.Timedelta(minutes=30)}).values[0, 0, 0] == 4.0
+
+
+def test_cube_applies_tolerance_per_variable():
+    view = pd.DataFrame({'Temperatura': [20.0], 'Umidade_Relativa': [80.0]},
+                        index=pd.DatetimeIndex(['2025-04-01 10:20']))
+    cube = build_snapshot_cube(view, 2025, 4, tolerances={'Umidade_Relativa': pd.Timedelta(minutes=30)})
+    # Mesmo candidato para as duas variáveis; só a tolerância de 30 minutos o aceita
+    assert np.isnan(cube.values[0, 10, 0])
+    assert cube.values[0, 10, 1] == 80.0
+    assert cube.matched_timestamp(1, 10, 'Temperatura') is None
+    assert cube.matched_timestamp(1, 10, 'Umidade_Relativa') == pd.Timestamp('2025-04-01 10:20')
+    assert cube.report().loc['Umidade_Relativa', 'Fora do horário'] == 1
+
+    exact = build_snapshot_cube(view, 2025, 4, 'exato', {'Umidade_Relativa': pd.Timedelta(minutes=30)})
+    assert np.isnan(exact.values).all()
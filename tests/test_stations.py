@@ -0,0 +1,55 @@
+import io
+from datetime import time
+
+import numpy as np
+import pytest
+from openpyxl import Workbook, load_workbook
+
+pytest.importorskip('streamlit')
+
+import shared_datasets  # noqa: E402
+from app import ExactWeatherProcessor  # noqa: E402
+
+
+def _workbook():
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '05-Analise Diaria'
+    for hour in range(24):
+        ws.cell(row=3 + hour, column=1, value=time(hour))
+    content = io.BytesIO()
+    wb.save(content)
+    content.seek(0)
+    return content
+
+
+def test_stations_in_one_batch_are_kept_apart(toa5_upload):
+    # Mesmos timestamps nas duas estações: não são conflitos
+    processor = ExactWeatherProcessor()
+    processor.process_dat_files([
+        toa5_upload('floriano.dat', '2025-05-01 00:00', 288, seed=1, station='Floriano'),
+        toa5_upload('picos.dat', '2025-05-01 00:00', 288, seed=2, station='Picos')
+    ])
+    processor._release_shared()
+    shared_datasets.drop_unused()
+
+    assert processor.stations() == ['Floriano', 'Picos']
+    floriano, picos = processor.station_stores['Floriano'], processor.station_stores['Picos']
+    assert floriano is not picos
+    assert len(floriano) == len(picos) == 288
+    assert processor.conflicts_detected.summary()['conflitos'] == 0
+    assert {info['estacao'] for info in processor.file_processing_info} == {'Floriano', 'Picos'}
+
+    success, message = processor.update_excel_file(_workbook(), station='Picos')
+    assert success, message
+    assert processor.station == 'Picos'
+
+    # Temperatura (colunas B..AF): valores da grade de Picos, nunca os de Floriano
+    sheet = load_workbook(processor.excel_path)['05-Analise Diaria']
+    written = np.array([[sheet.cell(row=3 + hour, column=2 + day).value for day in range(2)]
+                        for hour in range(24)], dtype=float)
+    variable = picos.variables.index('Temperatura')
+    expected = processor._snapshot_cube(picos, 2025, 5).values[:2, :, variable].T
+    other = processor._snapshot_cube(floriano, 2025, 5).values[:2, :, variable].T
+    np.testing.assert_array_equal(written, expected)
+    assert not np.array_equal(written, other, equal_nan=True)
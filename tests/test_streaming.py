@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('streamlit')
+
+import shared_datasets  # noqa: E402
+from app import ExactWeatherProcessor  # noqa: E402
+from conflicts import CONFLICT_POLICIES, DEFAULT_POLICY  # noqa: E402
+
+
+def _uploads(toa5_upload):
+    # Arquivo base, um segundo arquivo sobreposto (RECORDs e valores diferentes) e um
+    # arquivo de 10 minutos deslocado em 7 minutos
+    return [
+        toa5_upload('a.dat', '2025-01-01 00:00', 3000, seed=1),
+        toa5_upload('b.dat', '2025-01-15 00:00', 2000, seed=2, first_record=9000),
+        toa5_upload('c.dat', '2025-01-20 00:07', 1500, seed=3, first_record=500)
+    ]
+
+
+def _consolidate(uploads, policy, budget_bytes=None):
+    processor = ExactWeatherProcessor()
+    if budget_bytes is not None:
+        processor.ingest_budget_bytes = budget_bytes
+    processor.process_dat_files(uploads, policy=policy)
+    store = processor.consolidated_data.copy()
+    summary = processor.conflicts_detected.summary()
+    # Sem a entrada compartilhada, o próximo processamento do mesmo lote é refeito do zero
+    processor._release_shared()
+    shared_datasets.drop_unused()
+    return store, summary
+
+
+@pytest.mark.parametrize('policy', list(CONFLICT_POLICIES))
+def test_streamed_consolidation_matches_full_read(toa5_upload, policy):
+    full, full_summary = _consolidate(_uploads(toa5_upload), policy)
+    streamed, streamed_summary = _consolidate(_uploads(toa5_upload), policy, budget_bytes=64 * 1024)
+
+    assert full_summary['conflitos'] > 0
+    np.testing.assert_array_equal(streamed.index, full.index)
+    np.testing.assert_array_equal(streamed.values(), full.values())
+    np.testing.assert_array_equal(streamed.statistic_values(), full.statistic_values())
+    for name in ('sequencia', 'record', 'intervalo', 'fonte'):
+        np.testing.assert_array_equal(streamed.attribute(name), full.attribute(name))
+    assert streamed_summary == full_summary
+
+
+def test_many_small_files_are_parsed_in_budgeted_batches(toa5_upload, monkeypatch):
+    import app
+
+    def uploads():
+        return [toa5_upload(f'{n:02d}.dat', f'2025-02-{n + 1:02d} 00:00', 60, seed=n, first_record=60 * n)
+                for n in range(12)]
+
+    full, full_summary = _consolidate(uploads(), DEFAULT_POLICY)
+
+    batches = []
+    parse_files = app.parse_files
+
+    def recording_parse_files(named_contents, *args, **kwargs):
+        batches.append(sum(len(content) for _, content, _, _ in named_contents))
+        return parse_files(named_contents, *args, **kwargs)
+
+    monkeypatch.setattr(app, 'parse_files', recording_parse_files)
+    budget = 3 * uploads()[0].size
+    batched, batched_summary = _consolidate(uploads(), DEFAULT_POLICY, budget_bytes=budget)
+
+    assert len(batches) > 1
+    assert max(batches) <= budget
+    np.testing.assert_array_equal(batched.index, full.index)
+    np.testing.assert_array_equal(batched.values(), full.values())
+    for name in ('sequencia', 'record', 'fonte'):
+        np.testing.assert_array_equal(batched.attribute(name), full.attribute(name))
+    assert batched_summary == full_summary
+
+
+def test_archive_readers_are_closed_and_upload_stations_cached(toa5_upload, monkeypatch):
+    import gzip
+
+    from conftest import Upload
+    from dat_reader import DataMember
+
+    readers = []
+    open_member = DataMember.open
+
+    def recording_open(member):
+        readers.append(open_member(member))
+        return readers[-1]
+
+    monkeypatch.setattr(DataMember, 'open', recording_open)
+    uploads = [Upload('a.dat.gz', gzip.compress(toa5_upload('a.dat', '2025-01-01 00:00', 3000).getvalue()))]
+
+    processor = ExactWeatherProcessor()
+    assert processor.stations_in_uploads(uploads) == ['Floriano']
+    opened = len(readers)
+    # Rerun com os mesmos uploads: nenhum arquivo reaberto
+    assert processor.stations_in_uploads(uploads) == ['Floriano']
+    assert len(readers) == opened
+
+    processor.ingest_budget_bytes = 64 * 1024
+    processor.process_dat_files(uploads, incremental=True, policy='arquivo_recente')
+    processor._release_shared()
+    shared_datasets.drop_unused()
+
+    assert len(processor.consolidated_data) == 3000
+    assert len(readers) > opened and all(reader.closed for reader in readers)
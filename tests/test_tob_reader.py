@@ -0,0 +1,137 @@
+import gzip
+import io
+import struct
+
+import numpy as np
+
+from tob_reader import read_tob, read_tob_chunks
+
+# Frames montados byte a byte pelo layout do rodapé TOB3 da Campbell (bits 0-10 offset,
+# 11 marca de arquivo, 12 marca de remoção, 13 vazio, 14 frame menor, 16-31 carimbo),
+# sem passar por nenhum codificador do próprio módulo
+STAMP = 0x1A2B
+RECORDS_PER_FRAME = 6
+RECORD_SIZE = 8
+FRAME_SIZE = 12 + RECORDS_PER_FRAME * RECORD_SIZE + 4
+START_SECONDS = 1_104_537_600  # 2025-01-01 00:00 desde 1990-01-01
+
+
+def _header_lines(table_info):
+    lines = ['"TOB3","Floriano","CR1000X","1234","CR1000X.Std.07","CPU:medicoes.CR1X","4321",'
+             '"2025-01-01 00:00:00"',
+             table_info,
+             '"Temp_Avg","RH_Avg"',
+             '"Deg C","%"',
+             '"Avg","Avg"',
+             '"IEEE4","IEEE4"']
+    return ('\r\n'.join(lines) + '\r\n').encode()
+
+
+def _record(number):
+    return struct.pack('<ff', number * 1.5, 50.0 + number)
+
+
+def _frame_header(number):
+    return struct.pack('<III', START_SECONDS + number * 600, 0, number)
+
+
+def _frame(first, count, flags=0, stamp=STAMP):
+    body = b''.join(_record(first + k) for k in range(count))
+    body += b'\x00' * ((RECORDS_PER_FRAME - count) * RECORD_SIZE)
+    return _frame_header(first) + body + struct.pack('<I', (stamp << 16) | flags)
+
+
+def _minor_frame(first, sub_frames):
+    # Frames menores em sequência, cada um terminando com o rodapé cujo offset é o seu
+    # tamanho; o rodapé do frame guarda os bytes não usados no fim
+    content = b''
+    for count in sub_frames:
+        size = 12 + count * RECORD_SIZE + 4
+        body = b''.join(_record(first + k) for k in range(count))
+        content += _frame_header(first) + body + struct.pack('<I', (STAMP << 16) | size)
+        first += count
+    unused = FRAME_SIZE - len(content)
+    return content + b'\xff' * (unused - 4) + struct.pack('<I', (STAMP << 16) | 0x4000 | unused)
+
+
+def _tob3_sample():
+    table_info = f'"Tabela10","10 MIN","{FRAME_SIZE}","100","{STAMP}","SecMsec","1","0","0"'
+    return _header_lines(table_info) + b''.join([
+        _frame(0, 6),
+        _frame(6, 6, flags=0x1000),                      # marca de remoção: frame completo
+        _frame(12, 6, flags=0x0800),                     # marca de arquivo: frame completo
+        b'\x00' * (FRAME_SIZE - 4) + struct.pack('<I', (STAMP << 16) | 0x2000),  # vazio
+        _frame(90, 6, stamp=0x9999),                     # carimbo inválido
+        _minor_frame(18, [1, 2]),
+        _frame(21, 4, flags=2 * RECORD_SIZE),            # 16 bytes não usados no fim
+        _frame(25, 6, stamp=~STAMP & 0xFFFF)             # volta do buffer circular
+    ])
+
+
+def _assert_sample(data, numbers):
+    np.testing.assert_array_equal(data['RECORD'], numbers)
+    np.testing.assert_allclose(data['Temp_Avg'], numbers * 1.5)
+    np.testing.assert_allclose(data['RH_Avg'], 50.0 + numbers)
+    expected = np.datetime64('2025-01-01T00:00', 'ns') + numbers * np.timedelta64(10, 'm')
+    np.testing.assert_array_equal(data['TIMESTAMP'].to_numpy(), expected)
+
+
+def test_tob3_footer_flags():
+    data, metadata, _ = read_tob(_tob3_sample())
+
+    assert metadata['tabela'] == 'Tabela10'
+    _assert_sample(data, np.arange(31))
+
+
+class _RecordingGzip(gzip.GzipFile):
+    """Fluxo .gz que registra o tamanho das leituras"""
+
+    reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+def _gzip_stream(content):
+    _RecordingGzip.reads = []
+    return _RecordingGzip(fileobj=io.BytesIO(gzip.compress(content)))
+
+
+def test_tob3_stream_matches_buffer_and_reads_by_block():
+    table_info = f'"Tabela10","10 MIN","{FRAME_SIZE}","100","{STAMP}","SecMsec","1","0","0"'
+    content = _header_lines(table_info) + b''.join(
+        _frame(first, RECORDS_PER_FRAME) for first in range(0, 3000, RECORDS_PER_FRAME)
+    )
+    full, _, _ = read_tob(content)
+
+    chunks = [data for data, _, _ in read_tob_chunks(_gzip_stream(content), 64 * 1024)]
+
+    assert len(chunks) > 1
+    assert all(0 < size < 64 * 1024 for size in _RecordingGzip.reads)
+    streamed = np.concatenate([chunk['RECORD'] for chunk in chunks])
+    np.testing.assert_array_equal(streamed, full['RECORD'])
+    _assert_sample(full, np.arange(3000))
+
+    data, _, _ = read_tob(_gzip_stream(_tob3_sample()))
+    _assert_sample(data, np.arange(31))
+
+
+def test_tob1_stream_matches_buffer():
+    lines = ['"TOB1","Floriano","CR1000X","1234","CR1000X.Std.07","CPU:medicoes.CR1X","4321","Tabela10"',
+             '"SECONDS","NANOSECONDS","RECORD","Temp_Avg","RH_Avg"',
+             '"SECONDS","NANOSECONDS","RN","Deg C","%"',
+             '"","","","Avg","Avg"',
+             '"ULONG","ULONG","ULONG","IEEE4","IEEE4"']
+    content = ('\r\n'.join(lines) + '\r\n').encode() + b''.join(
+        struct.pack('<III', START_SECONDS + number * 600, 0, number) + _record(number)
+        for number in range(2500)
+    )
+
+    full, _, _ = read_tob(content)
+    chunks = [data for data, _, _ in read_tob_chunks(_gzip_stream(content), 64 * 1024)]
+
+    assert len(chunks) > 1
+    _assert_sample(full, np.arange(2500))
+    streamed = np.concatenate([chunk['Temp_Avg'] for chunk in chunks])
+    np.testing.assert_array_equal(streamed, full['Temp_Avg'])
@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+import pytest
+from openpyxl import Workbook, load_workbook
+
+pytest.importorskip('streamlit')
+
+from app import ExactWeatherProcessor  # noqa: E402
+
+
+def _workbook(std_header):
+    wb = Workbook()
+    wb.active.title = '05-Analise Diaria'
+    ws = wb.create_sheet('05-Analise Mensal')
+    if std_header:
+        ws['F2'] = 'Desvio padrão'
+    content = io.BytesIO()
+    wb.save(content)
+    content.seek(0)
+    return content
+
+
+@pytest.fixture
+def processor(toa5_upload):
+    processor = ExactWeatherProcessor()
+    processor.daily_template = 'horaria'
+    processor.process_dat_files([toa5_upload('a.dat', '2025-05-01 00:00', 288, seed=9)])
+    return processor
+
+
+def test_std_written_only_to_labelled_column(processor):
+    processor.update_excel_file(_workbook(std_header=False), true_extremes=True)
+    assert load_workbook(processor.excel_path)['05-Analise Mensal']['F3'].value is None
+    assert processor.cell_provenance('05-Analise Mensal', 'F3') is None
+
+    processor.update_excel_file(_workbook(std_header=True), true_extremes=True)
+    assert load_workbook(processor.excel_path)['05-Analise Mensal']['F3'].value is not None
+    origin = processor.cell_provenance('05-Analise Mensal', 'F3')['origem']
+    assert len(origin) > 1
+
+
+def test_provenance_follows_true_extremes(processor):
+    processor.update_excel_file(_workbook(std_header=True), true_extremes=True)
+    sheet = load_workbook(processor.excel_path)['05-Analise Mensal']
+    for cell, channel in (('B3', 'Temperatura_Min'), ('C3', 'Temperatura_Max')):
+        result = processor.cell_provenance('05-Analise Mensal', cell)
+        assert 'canal' in result['descricao']
+        # Uma medição: a do extremo do canal do logger, com o valor gravado na célula
+        assert len(result['origem']) == 1
+        assert result['origem']['Valor'].iloc[0] == pytest.approx(sheet[cell].value, abs=1e-3)
+        store = processor.consolidated_data
+        row = store.index.get_loc(result['origem']['Timestamp'].iloc[0])
+        assert not np.isnan(store.statistic(channel)[row])
+
+    processor.update_excel_file(_workbook(std_header=True), true_extremes=False)
+    assert 'canal' not in processor.cell_provenance('05-Analise Mensal', 'B3')['descricao']
+    assert processor.cell_provenance('05-Analise Mensal', 'F3') is None
@@ -0,0 +1,323 @@
+"""
+Série temporal consolidada em formato colunar
+
+Um índice datetime64 ordenado e sem repetições, uma coluna float64 contígua por variável
+(NaN = dado ausente) e colunas inteiras com os atributos usados na resolução de conflitos.
+Os canais estatísticos do logger (Min/Max/Std de cada média) ficam em um bloco float32 à parte,
+gravado junto com os valores e sem entrar nas visões reamostradas.
+Fatias por intervalo, mês ou dia são views dos arrays, sem cópia. Os dados ficam na resolução
+nativa dos arquivos; visões de 10 minutos, horárias e diárias e a grade de horários de cada
+mês (ver snapshots) são geradas sob demanda e guardadas até a próxima gravação.
+
+Com um orçamento de memória, arrays que passariam do limite são criados como arquivos
+mapeados em memória (np.memmap) em disco, com a mesma interface.
+"""
+import copy
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_coverage import CoverageIndex
+from resample import resampled_frame
+from snapping import DEFAULT_SNAPPING_POLICY, tolerance_vector
+from snapshots import DEFAULT_STEP, build_snapshot_cube
+
+# Atributos por timestamp: ordem global do arquivo de origem, RECORD, último TIMESTAMP do
+# arquivo (ns), intervalo de gravação do arquivo (segundos, <= 0 = desconhecido; decide se a
+# linha entra nas visões de 10 minutos como está, ver resample) e id do arquivo no
+# processamento atual (-1 = processamento anterior).
+# Ordem global + RECORD identificam a origem de cada valor (ver provenance)
+ATTRIBUTE_DTYPES = {
+    'sequencia': np.int32,
+    'record': np.int64,
+    'recente': np.int64,
+    'intervalo': np.int32,
+    'fonte': np.int32
+}
+MISSING_SOURCE = -1
+
+# Canais estatísticos: os valores têm 2-3 casas decimais, float32 basta
+STATISTIC_DTYPE = np.float32
+
+# Capacidade inicial dos arrays (crescem dobrando, como uma lista)
+MIN_CAPACITY = 1024
+
+
+class TimeSeriesStore:
+    """Série consolidada: índice ordenado + uma coluna float64 por variável"""
+
+    def __init__(self, variables, memory_budget=None, spill_dir=None, statistics=(), decimals=None):
+        self.variables = list(variables)
+        # Casas decimais de cada variável: as médias das visões reamostradas são arredondadas igual
+        self.decimals = dict(decimals or {})
+        # Canais estatísticos por linha (ex: 'Temperatura_Max'), NaN quando o arquivo não os tem
+        self.statistics = list(statistics)
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.spilled = False
+        # Série compartilhada entre sessões: arrays somente leitura (ver freeze/copy)
+        self.frozen = False
+        # Cobertura por slot de 10 minutos (com o intervalo de gravação), atualizada a cada timestamp novo
+        self.coverage = CoverageIndex()
+        # Visões já calculadas: {(resolução, início, fim): DataFrame,
+        #                         ('grade_horaria', ano, mês, intervalo, política, tolerâncias): SnapshotCube}
+        self._views = {}
+        self._size = 0
+        self._allocate(0)
+
+    def _row_bytes(self):
+        row_bytes = np.dtype('datetime64[ns]').itemsize + np.dtype(np.float64).itemsize * len(self.variables)
+        row_bytes += np.dtype(STATISTIC_DTYPE).itemsize * len(self.statistics)
+        return row_bytes + sum(np.dtype(dtype).itemsize for dtype in ATTRIBUTE_DTYPES.values())
+
+    def _new_array(self, shape, dtype, order='C'):
+        """Array em memória ou, se a série foi despejada, mapeado em um arquivo temporário"""
+        if not self.spilled or int(np.prod(shape)) == 0:
+            return np.empty(shape, dtype=dtype, order=order)
+
+        os.makedirs(self.spill_dir or tempfile.gettempdir(), exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.spill_dir, suffix='.mmap')
+        os.close(fd)
+        array = np.memmap(path, dtype=dtype, mode='w+', shape=shape, order=order)
+        try:
+            # O mapeamento continua válido; o espaço em disco é liberado quando o array é descartado
+            os.remove(path)
+        except OSError:
+            pass
+        return array
+
+    def _allocate(self, capacity):
+        """Cria arrays com a capacidade pedida, copiando as linhas atuais"""
+        if self.memory_budget is not None and capacity * self._row_bytes() > self.memory_budget:
+            self.spilled = True
+
+        index = self._new_array(capacity, 'datetime64[ns]')
+        # Ordem Fortran: cada variável ocupa um bloco contíguo de memória
+        values = self._new_array((capacity, len(self.variables)), np.float64, order='F')
+        statistics = self._new_array((capacity, len(self.statistics)), STATISTIC_DTYPE, order='F')
+        attributes = {name: self._new_array(capacity, dtype) for name, dtype in ATTRIBUTE_DTYPES.items()}
+
+        if self._size > 0:
+            index[:self._size] = self._index[:self._size]
+            values[:self._size] = self._values[:self._size]
+            statistics[:self._size] = self._statistics[:self._size]
+            for name, column in attributes.items():
+                column[:self._size] = self._attributes[name][:self._size]
+
+        self._index, self._values, self._statistics, self._attributes = index, values, statistics, attributes
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def index(self):
+        """Índice ordenado (view)"""
+        return pd.DatetimeIndex(self._index[:self._size], name='Timestamp', copy=False)
+
+    def column(self, variable):
+        """Valores de uma variável (view contígua)"""
+        return self._values[:self._size, self.variables.index(variable)]
+
+    def values(self, start=0, stop=None):
+        """Matriz linhas × variáveis do intervalo [start, stop) (view)"""
+        stop = self._size if stop is None else stop
+        return self._values[start:stop]
+
+    def statistic(self, name):
+        """Valores de um canal estatístico (view float32 contígua)"""
+        return self._statistics[:self._size, self.statistics.index(name)]
+
+    def statistic_values(self, start=0, stop=None):
+        """Matriz linhas × canais estatísticos do intervalo [start, stop) (view)"""
+        stop = self._size if stop is None else stop
+        return self._statistics[start:stop]
+
+    def attribute(self, name):
+        return self._attributes[name][:self._size]
+
+    def frame(self, start=0, stop=None):
+        """DataFrame do intervalo [start, stop) sobre os próprios arrays, sem cópia"""
+        stop = self._size if stop is None else stop
+        return pd.DataFrame(
+            self._values[start:stop],
+            index=pd.DatetimeIndex(self._index[start:stop], name='Timestamp', copy=False),
+            columns=self.variables,
+            copy=False
+        )
+
+    def resampled(self, resolution, start=0, stop=None):
+        """Intervalo [start, stop) na resolução '10min', 'hora' ou 'dia' (ver resample)"""
+        stop = self._size if stop is None else stop
+        key = (resolution, start, stop)
+        if key not in self._views:
+            self._views[key] = resampled_frame(self.frame(start, stop), resolution,
+                                               self._attributes['intervalo'][start:stop], self.decimals)
+        return self._views[key]
+
+    def snapshot_cube(self, year, month, policy=DEFAULT_SNAPPING_POLICY, tolerances=None, step=DEFAULT_STEP):
+        """
+        Grade de horários do mês (SnapshotCube) sobre a visão de 10 minutos, ou None sem dados
+
+        Uma grade por intervalo entre horários (padrão: 1 hora), política de alinhamento e
+        tolerâncias ({variável: tolerância}, ver snapping). A fatia do mês é estendida pela maior
+        tolerância (arredondada para slots inteiros de 10 minutos) dos dois lados: 00:00 do dia 1
+        pode ficar com o registro de 23:55 do mês anterior.
+        """
+        tolerance = tolerance_vector(self.variables, tolerances)
+        key = ('grade_horaria', year, month, int(step.astype('timedelta64[m]').astype(np.int64)), policy,
+               tuple(tolerance.tolist()))
+        if key not in self._views:
+            month_number = np.datetime64(f"{year:04d}-{month:02d}", 'M')
+            month_start = month_number.astype('datetime64[ns]')
+            month_end = (month_number + 1).astype('datetime64[ns]') - 1
+            start, stop = self.range_bounds(month_start, month_end)
+            if start == stop:
+                return None
+            slot = np.timedelta64(10, 'm').astype('timedelta64[ns]').astype(np.int64)
+            padding = np.timedelta64(-(-int(tolerance.max(initial=0)) // slot) * slot, 'ns')
+            start, stop = self.range_bounds(month_start - padding, month_end + padding)
+            self._views[key] = build_snapshot_cube(self.resampled('10min', start, stop), year, month,
+                                                   policy, tolerances, step)
+        return self._views[key]
+
+    def locate(self, timestamps):
+        """(posições, encontrados): posição de cada timestamp no índice e se já existe"""
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        index = self._index[:self._size]
+        positions = np.searchsorted(index, timestamps)
+        found = np.zeros(len(timestamps), dtype=bool)
+        inside = positions < self._size
+        found[inside] = index[positions[inside]] == timestamps[inside]
+        return positions, found
+
+    def range_bounds(self, start, end):
+        """Posições [início, fim) dos timestamps em [start, end]"""
+        index = self._index[:self._size]
+        return (int(np.searchsorted(index, np.datetime64(start, 'ns'), side='left')),
+                int(np.searchsorted(index, np.datetime64(end, 'ns'), side='right')))
+
+    def _groups(self, unit, start, stop):
+        """Limites dos grupos consecutivos do índice truncado na unidade (ex: 'M', 'D')"""
+        periods = self._index[start:stop].astype(f'datetime64[{unit}]')
+        if len(periods) == 0:
+            return periods, np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        stops = np.r_[starts[1:], len(periods)]
+        return periods[starts], starts + start, stops + start
+
+    def month_slices(self):
+        """(ano, mês, início, fim) de cada mês com dados, em ordem cronológica"""
+        months, starts, stops = self._groups('M', 0, self._size)
+        month_numbers = months.astype(np.int64)
+        for number, start, stop in zip(month_numbers.tolist(), starts.tolist(), stops.tolist()):
+            yield 1970 + number // 12, number % 12 + 1, start, stop
+
+    def day_slices(self, start=0, stop=None):
+        """(dia do mês, início, fim) de cada dia com dados no intervalo [start, stop)"""
+        stop = self._size if stop is None else stop
+        days, starts, stops = self._groups('D', start, stop)
+        day_numbers = pd.DatetimeIndex(days).day
+        for day, day_start, day_stop in zip(day_numbers.tolist(), starts.tolist(), stops.tolist()):
+            yield day, day_start, day_stop
+
+    def reset_sources(self):
+        """Marca todas as linhas como vindas de um processamento anterior"""
+        self._attributes['fonte'][:self._size] = MISSING_SOURCE
+
+    def upsert(self, timestamps, values, attributes, statistics=None):
+        """
+        Grava linhas com timestamps sem repetição: substitui as existentes e insere as novas
+
+        Args:
+            timestamps: array datetime64
+            values: matriz linhas × variáveis (mesma ordem de self.variables)
+            attributes: {atributo: array ou escalar}
+            statistics: matriz linhas × canais estatísticos (mesma ordem de self.statistics)
+                        ou None (canais ausentes = NaN)
+        """
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        values = np.asarray(values, dtype=np.float64)
+        if statistics is None:
+            statistics = np.full((len(timestamps), len(self.statistics)), np.nan, dtype=STATISTIC_DTYPE)
+        statistics = np.asarray(statistics, dtype=STATISTIC_DTYPE)
+        attributes = {name: np.broadcast_to(np.asarray(value, dtype=ATTRIBUTE_DTYPES[name]), len(timestamps))
+                      for name, value in attributes.items()}
+
+        self._views = {}
+        positions, found = self.locate(timestamps)
+        if found.any():
+            self._values[positions[found]] = values[found]
+            self._statistics[positions[found]] = statistics[found]
+            for name, value in attributes.items():
+                self._attributes[name][positions[found]] = value[found]
+
+        new = ~found
+        n_new = int(new.sum())
+        if n_new == 0:
+            return
+
+        order = np.argsort(timestamps[new], kind='stable')
+        new_timestamps = timestamps[new][order]
+        new_values = values[new][order]
+        new_statistics = statistics[new][order]
+        new_attributes = {name: value[new][order] for name, value in attributes.items()}
+
+        size = self._size
+        total = size + n_new
+        if size == 0 or new_timestamps[0] > self._index[size - 1]:
+            # Caso comum (dados mais novos que os consolidados): acrescentar no final
+            if total > len(self._index):
+                self._allocate(max(MIN_CAPACITY, total, 2 * len(self._index)))
+            destination = np.arange(size, total)
+        else:
+            # Inserção no meio: redistribuir linhas antigas e novas em arrays novos
+            insert_at = np.searchsorted(self._index[:size], new_timestamps)
+            old_destination = np.arange(size) + np.searchsorted(insert_at, np.arange(size), side='right')
+            destination = insert_at + np.arange(n_new)
+
+            old_index, old_values, old_statistics = self._index, self._values, self._statistics
+            old_attributes = self._attributes
+            self._size = 0
+            self._allocate(max(MIN_CAPACITY, total + total // 8))
+            self._index[old_destination] = old_index[:size]
+            self._values[old_destination] = old_values[:size]
+            self._statistics[old_destination] = old_statistics[:size]
+            for name, column in self._attributes.items():
+                column[old_destination] = old_attributes[name][:size]
+
+        self._index[destination] = new_timestamps
+        self._values[destination] = new_values
+        self._statistics[destination] = new_statistics
+        for name, column in self._attributes.items():
+            column[destination] = new_attributes[name] if name in new_attributes else MISSING_SOURCE
+        self._size = total
+        self.coverage.add(new_timestamps, new_attributes.get('intervalo'))
+
+    def nbytes(self):
+        """Bytes reservados pelos arrays (capacidade total, em memória ou em disco)"""
+        return self._row_bytes() * len(self._index)
+
+    def freeze(self):
+        """Torna os arrays somente leitura (série compartilhada entre sessões)"""
+        self.frozen = True
+        for array in [self._index, self._values, self._statistics, *self._attributes.values()]:
+            array.flags.writeable = False
+
+    def copy(self):
+        """Cópia gravável da série, com a mesma cobertura"""
+        store = TimeSeriesStore(self.variables, self.memory_budget, self.spill_dir, self.statistics, self.decimals)
+        store._index, store._values, store._attributes = self._index, self._values, self._attributes
+        store._statistics = self._statistics
+        store._size = self._size
+        store._allocate(max(MIN_CAPACITY, self._size))
+        store.coverage = copy.deepcopy(self.coverage)
+        return store
+
+    def spill(self):
+        """Move os arrays para arquivos mapeados em disco"""
+        if not self.spilled and not self.frozen:
+            self.spilled = True
+            self._views = {}
+            self._allocate(max(self._size, 1))
@@ -0,0 +1,512 @@
+"""
+Leitura dos formatos binários TOB1 e TOB3 do datalogger Campbell Scientific
+
+Os registros são decodificados direto para arrays NumPy a partir do buffer do arquivo
+(np.memmap para caminhos locais, np.frombuffer para uploads), sem conversão para texto.
+O resultado usa os mesmos nomes de campo do TOA5 (TIMESTAMP, RECORD, Temp_Avg...), então
+o restante do processamento não muda.
+
+Fluxos descompactados (membros .zip/.gz) não são carregados inteiros: os frames são lidos
+do fluxo bloco a bloco, dentro do orçamento de memória da leitura.
+
+TOB1: 5 linhas de cabeçalho ASCII (ambiente, campos, unidades, processamento, tipos) seguidas
+de registros de tamanho fixo, com o horário nos campos SECONDS/NANOSECONDS.
+
+TOB3: 6 linhas de cabeçalho ASCII (a 2ª descreve a tabela e os frames) seguidas de frames de
+tamanho fixo. Cada frame tem cabeçalho de 12 bytes (segundos, sub-segundos, nº do primeiro
+registro), registros consecutivos no intervalo da tabela e rodapé de 4 bytes: bits 0-10 com
+o offset (bytes não usados no fim do frame), bit 11 marca de arquivo, bit 12 marca de
+remoção/anel, bit 13 frame vazio, bit 14 frame menor e bits 16-31 o carimbo de validação.
+"""
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+TOB_FORMATS = ('TOB1', 'TOB3')
+
+# Horários binários são contados a partir de 1990-01-01
+TOB_EPOCH = np.datetime64('1990-01-01T00:00:00', 'ns')
+
+# Tipos de dado Campbell → dtype NumPy (FP2 é decodificado à parte)
+DATA_TYPES = {
+    'IEEE4': '<f4', 'IEEE4L': '<f4', 'IEEE4B': '>f4',
+    'IEEE8': '<f8', 'IEEE8L': '<f8', 'IEEE8B': '>f8',
+    'FP2': '>u2',
+    'ULONG': '<u4', 'UINT4': '>u4', 'LONG': '<i4', 'INT4': '>i4',
+    'USHORT': '<u2', 'UINT2': '>u2', 'SHORT': '<i2', 'INT2': '>i2',
+    'BOOL': '<i4', 'BOOL4': '<i4', 'BOOL2': '<i2', 'BOOL8': 'u1'
+}
+
+# Resolução dos sub-segundos no cabeçalho dos frames TOB3 (em nanossegundos)
+FRAME_RESOLUTIONS = {
+    'SecMsec': 1_000_000,
+    'Sec10Msec': 10_000_000,
+    'Sec100Usec': 100_000,
+    'Sec10Usec': 10_000,
+    'SecUsec': 1_000
+}
+
+# Unidades do intervalo de registro TOB3 (em nanossegundos)
+INTERVAL_UNITS = {
+    'NSEC': 1,
+    'USEC': 1_000,
+    'MSEC': 1_000_000,
+    'SEC': 1_000_000_000,
+    'MIN': 60_000_000_000,
+    'HR': 3_600_000_000_000,
+    'HOUR': 3_600_000_000_000,
+    'DAY': 86_400_000_000_000
+}
+
+TOB3_FRAME_HEADER = 12
+TOB3_FRAME_FOOTER = 4
+
+# Flags do rodapé do frame TOB3 (as marcas de arquivo e de remoção não mudam a leitura do frame)
+FOOTER_OFFSET_MASK = 0x07FF
+FOOTER_FILE_MARK = 0x0800
+FOOTER_REMOVE_MARK = 0x1000
+FOOTER_EMPTY_FRAME = 0x2000
+FOOTER_MINOR_FRAME = 0x4000
+
+# Campos de controle que não viram canais
+TIME_FIELDS = ('SECONDS', 'NANOSECONDS')
+
+# Memória estimada por registro decodificado: cada campo em float64 mais temporários
+BYTES_PER_FIELD_ESTIMATE = 16
+MIN_BLOCK_ROWS = 1000
+
+# Tamanho máximo de cada leitura de um fluxo descompactado
+STREAM_READ_BYTES = 8 * 1024 * 1024
+
+# Layouts compilados por assinatura do programa do logger
+_LAYOUT_CACHE = {}
+
+
+class TOBLayout:
+    """Layout binário compilado de uma tabela TOB1/TOB3 (dtype estruturado do registro)"""
+
+    def __init__(self, signature, fields, units, processing, types):
+        self.signature = signature
+        self.fields = fields
+        self.units = dict(zip(fields, units))
+        self.processing = dict(zip(fields, processing))
+        self.types = dict(zip(fields, types))
+
+        dtype_fields = []
+        self.fp2_fields = []
+        self.text_fields = []
+        for field, data_type in zip(fields, types):
+            data_type = data_type.strip()
+            if data_type.upper().startswith('ASCII'):
+                # ASCII(n): texto de tamanho fixo
+                length = int(data_type[data_type.index('(') + 1:data_type.index(')')])
+                dtype_fields.append((field, f'S{length}'))
+                self.text_fields.append(field)
+            elif data_type in DATA_TYPES:
+                dtype_fields.append((field, DATA_TYPES[data_type]))
+                if data_type == 'FP2':
+                    self.fp2_fields.append(field)
+            else:
+                raise ValueError(f"Tipo de dado binário não suportado: {data_type} ({field})")
+
+        self.record_dtype = np.dtype(dtype_fields)
+        self.record_size = self.record_dtype.itemsize
+
+    def block_rows(self, budget_bytes):
+        """Registros por bloco para caber no orçamento de memória"""
+        bytes_per_row = self.record_size + len(self.fields) * BYTES_PER_FIELD_ESTIMATE
+        return max(MIN_BLOCK_ROWS, int(budget_bytes // bytes_per_row))
+
+
+def decode_fp2(raw):
+    """
+    Decodifica o ponto flutuante de 2 bytes da Campbell (FP2)
+
+    bit 15: sinal | bits 13-14: expoente decimal negativo | bits 0-12: mantissa
+    """
+    raw = raw.astype(np.uint16)
+    sign = np.where(raw & 0x8000, -1.0, 1.0)
+    exponent = (raw >> 13) & 0x3
+    mantissa = (raw & 0x1FFF).astype(np.float64)
+    values = sign * mantissa / np.power(10.0, exponent)
+
+    # Valores especiais: +INF (0x1FFF), -INF (0x9FFF), NAN (0x9FFE)
+    values[raw == 0x1FFF] = np.inf
+    values[raw == 0x9FFF] = -np.inf
+    values[raw == 0x9FFE] = np.nan
+    return values
+
+
+def is_tob(first_bytes):
+    """Indica se o início do arquivo corresponde a um TOB1/TOB3"""
+    return any(first_bytes.startswith(f'"{name}"'.encode()) for name in TOB_FORMATS)
+
+
+def load_buffer(source):
+    """
+    Obtém os bytes do arquivo como array uint8 sem cópia
+
+    Caminhos locais são mapeados em memória; uploads (BytesIO) e bytes usam o buffer existente.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return np.memmap(source, dtype=np.uint8, mode='r')
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return np.frombuffer(source, dtype=np.uint8)
+    return np.frombuffer(source.getbuffer(), dtype=np.uint8)
+
+
+class _ByteReader:
+    """
+    Leitura sequencial do arquivo TOB
+
+    Caminhos, bytes e BytesIO são lidos como visões do buffer (sem cópia); os demais arquivos
+    (fluxos de .zip/.gz) são lidos do fluxo, só os bytes do bloco pedido.
+    """
+
+    def __init__(self, source):
+        self.stream = None
+        self.buf = None
+        self.position = 0
+        if isinstance(source, (str, os.PathLike, bytes, bytearray, memoryview)) or hasattr(source, 'getbuffer'):
+            self.buf = load_buffer(source)
+        else:
+            source.seek(0)
+            self.stream = source
+
+    def readline(self):
+        """Próxima linha do cabeçalho ASCII (sem o fim de linha)"""
+        if self.stream is not None:
+            line = self.stream.readline()
+            if not line.endswith(b'\n'):
+                raise ValueError("Cabeçalho binário incompleto")
+            return line[:-1]
+
+        end = self.position
+        # Procurar o fim de linha em janelas para não converter o arquivo inteiro
+        while True:
+            window = bytes(self.buf[end:end + 4096])
+            if not window:
+                raise ValueError("Cabeçalho binário incompleto")
+            newline = window.find(b'\n')
+            if newline >= 0:
+                end += newline
+                break
+            end += len(window)
+        line = bytes(self.buf[self.position:end])
+        self.position = end + 1
+        return line
+
+    def read(self, n_units, unit_size):
+        """Até n_units unidades (registros ou frames) completas, como array uint8 (n, unit_size)"""
+        if self.buf is not None:
+            count = min(n_units, (len(self.buf) - self.position) // unit_size)
+            raw = self.buf[self.position:self.position + count * unit_size]
+        else:
+            remaining = n_units * unit_size
+            pieces = []
+            while remaining > 0:
+                piece = self.stream.read(min(remaining, STREAM_READ_BYTES))
+                if not piece:
+                    break
+                pieces.append(piece)
+                remaining -= len(piece)
+            data = b''.join(pieces)
+            count = len(data) // unit_size
+            raw = np.frombuffer(data, dtype=np.uint8, count=count * unit_size)
+        self.position += count * unit_size
+        return raw.reshape(count, unit_size)
+
+
+def _header_lines(reader, n_lines):
+    """Lê n_lines linhas ASCII do cabeçalho, já separadas em campos"""
+    lines = []
+    for _ in range(n_lines):
+        line = reader.readline().decode('ascii', errors='replace').rstrip('\r')
+        lines.append(next(csv.reader([line])) if line else [])
+    return lines
+
+
+def environment_metadata(environment, table_name):
+    """Metadados da 1ª linha do cabeçalho (mesmo formato para TOA5, TOB1 e TOB3)"""
+    environment = environment + [''] * (8 - len(environment))
+    return {
+        'formato': environment[0],
+        'estacao': environment[1],
+        'logger': environment[2],
+        'serie': environment[3],
+        'versao_so': environment[4],
+        'programa': environment[5],
+        'assinatura': environment[6],
+        'tabela': table_name
+    }
+
+
+def _get_layout(metadata, fields, units, processing, types):
+    """Retorna o layout compilado da assinatura, criando-o na primeira vez"""
+    signature = (
+        metadata['formato'],
+        metadata['logger'],
+        metadata['programa'],
+        metadata['assinatura'],
+        metadata['tabela'],
+        tuple(fields),
+        tuple(types)
+    )
+    layout = _LAYOUT_CACHE.get(signature)
+    if layout is None:
+        layout = TOBLayout(signature, fields, units, processing, types)
+        _LAYOUT_CACHE[signature] = layout
+    return layout
+
+
+def _parse_interval(text):
+    """Converte o intervalo da tabela TOB3 (ex: '10 MIN') para nanossegundos"""
+    parts = text.split()
+    if len(parts) != 2 or parts[1].upper() not in INTERVAL_UNITS:
+        raise ValueError(f"Intervalo de registro TOB3 não reconhecido: {text}")
+    return int(float(parts[0]) * INTERVAL_UNITS[parts[1].upper()])
+
+
+def _to_frame(records, layout, timestamps, record_numbers):
+    """Monta o DataFrame com os nomes de campo do cabeçalho e canais em float64"""
+    columns = {'TIMESTAMP': timestamps, 'RECORD': record_numbers.astype(np.int64)}
+    for field in layout.fields:
+        if field in TIME_FIELDS or field in columns:
+            continue
+        values = records[field]
+        if field in layout.fp2_fields:
+            columns[field] = decode_fp2(values)
+        elif field in layout.text_fields:
+            columns[field] = np.char.decode(values, 'ascii', errors='replace')
+        else:
+            columns[field] = values.astype(np.float64)
+    return pd.DataFrame(columns)
+
+
+def _seen_mask(record_numbers, nanoseconds, after):
+    """Registros já ingeridos: RECORD e horário até a marca (último RECORD, último TIMESTAMP)"""
+    after_record, after_timestamp = after
+    after_ns = (np.datetime64(after_timestamp, 'ns') - TOB_EPOCH).astype(np.int64)
+    return (record_numbers <= after_record) & (nanoseconds <= after_ns)
+
+
+def _tob1_blocks(reader, layout, rows_per_block, after=None):
+    """Decodifica registros TOB1 em blocos de rows_per_block"""
+    if 'SECONDS' not in layout.fields:
+        raise ValueError("Arquivo TOB1 sem campo SECONDS")
+
+    start = 0
+    while True:
+        raw = reader.read(rows_per_block, layout.record_size)
+        count = len(raw)
+        if count == 0:
+            break
+        records = raw.reshape(-1).view(layout.record_dtype)
+
+        nanoseconds = records['SECONDS'].astype(np.int64) * 1_000_000_000
+        if 'NANOSECONDS' in layout.fields:
+            nanoseconds += records['NANOSECONDS'].astype(np.int64)
+
+        if 'RECORD' in layout.fields:
+            record_numbers = records['RECORD'].astype(np.int64)
+        else:
+            record_numbers = np.arange(start, start + count)
+        start += count
+
+        if after is not None:
+            # Só os campos RECORD/SECONDS são consultados antes de decodificar os canais
+            keep = ~_seen_mask(record_numbers, nanoseconds, after)
+            if not keep.any():
+                continue
+            records, nanoseconds, record_numbers = records[keep], nanoseconds[keep], record_numbers[keep]
+
+        timestamps = TOB_EPOCH + nanoseconds.astype('timedelta64[ns]')
+        yield _to_frame(records, layout, timestamps, record_numbers)
+
+
+def _valid_stamps(stamp):
+    """
+    Carimbos aceitos no rodapé: o do cabeçalho e o complemento (alternam a cada volta do buffer
+    circular), com tolerância de ±1 como no camp2ascii
+    """
+    return (stamp, ~stamp & 0xFFFF, (stamp - 1) & 0xFFFF, (stamp + 1) & 0xFFFF)
+
+
+def _tob3_minor_frames(frame, stamps, layout):
+    """
+    Percorre os frames menores dentro de um frame TOB3 (gravados ao parar/retirar o cartão)
+
+    O offset do rodapé do frame indica os bytes não usados no fim; antes deles, cada frame
+    menor termina com seu próprio rodapé, cujo offset é o tamanho do frame menor. A leitura é
+    feita do fim para o início e frames menores com carimbo inválido são descartados.
+    """
+    pieces = []
+    end = len(frame) - (int(frame[-TOB3_FRAME_FOOTER:].view('<u4')[0]) & FOOTER_OFFSET_MASK)
+    while end > TOB3_FRAME_HEADER + TOB3_FRAME_FOOTER:
+        footer = int(frame[end - TOB3_FRAME_FOOTER:end].view('<u4')[0])
+        size = footer & FOOTER_OFFSET_MASK
+        if size < TOB3_FRAME_HEADER + TOB3_FRAME_FOOTER or size > end:
+            break
+        start = end - size
+        n_records = (size - TOB3_FRAME_HEADER - TOB3_FRAME_FOOTER) // layout.record_size
+        if (footer >> 16) in stamps and n_records > 0 and not footer & FOOTER_EMPTY_FRAME:
+            header = frame[start:start + TOB3_FRAME_HEADER].view('<u4')
+            body = frame[start + TOB3_FRAME_HEADER:start + TOB3_FRAME_HEADER + n_records * layout.record_size]
+            pieces.append((header.copy(), body.view(layout.record_dtype)))
+        end = start
+    return pieces[::-1]
+
+
+def _tob3_partial_frame(frame, footer, layout):
+    """Frame completo com offset: só os registros antes dos bytes não usados"""
+    n_records = (len(frame) - TOB3_FRAME_HEADER - TOB3_FRAME_FOOTER
+                 - (footer & FOOTER_OFFSET_MASK)) // layout.record_size
+    if n_records <= 0:
+        return []
+    body = frame[TOB3_FRAME_HEADER:TOB3_FRAME_HEADER + n_records * layout.record_size]
+    return [(frame[:TOB3_FRAME_HEADER].view('<u4').copy(), body.view(layout.record_dtype))]
+
+
+def _tob3_blocks(reader, layout, table_info, rows_per_block, after=None):
+    """Decodifica frames TOB3 em blocos de aproximadamente rows_per_block registros"""
+    table_info = table_info + [''] * (6 - len(table_info))
+    interval_ns = _parse_interval(table_info[1])
+    frame_size = int(table_info[2])
+    stamp = int(table_info[4])
+    resolution_ns = FRAME_RESOLUTIONS.get(table_info[5])
+    if resolution_ns is None:
+        raise ValueError(f"Resolução de frame TOB3 não reconhecida: {table_info[5]}")
+
+    stamps = _valid_stamps(stamp)
+    records_per_frame = (frame_size - TOB3_FRAME_HEADER - TOB3_FRAME_FOOTER) // layout.record_size
+    if records_per_frame <= 0:
+        raise ValueError("Tamanho de frame TOB3 menor que um registro")
+    frames_per_block = max(1, rows_per_block // records_per_frame)
+
+    while True:
+        frames = reader.read(frames_per_block, frame_size)
+        if len(frames) == 0:
+            break
+
+        headers = np.ascontiguousarray(frames[:, :TOB3_FRAME_HEADER]).view('<u4')
+        footers = np.ascontiguousarray(frames[:, -TOB3_FRAME_FOOTER:]).view('<u4').ravel()
+        valid = np.isin(footers >> 16, stamps) & ((footers & FOOTER_EMPTY_FRAME) == 0)
+        minor = valid & ((footers & FOOTER_MINOR_FRAME) != 0)
+        partial = valid & ~minor & ((footers & FOOTER_OFFSET_MASK) != 0)
+        major = valid & ~minor & ~partial
+
+        if after is not None:
+            # Frames inteiros já ingeridos são pulados pelo cabeçalho, sem decodificar registros
+            last_record = headers[:, 2].astype(np.int64) + records_per_frame - 1
+            last_ns = (headers[:, 0].astype(np.int64) * 1_000_000_000
+                       + headers[:, 1].astype(np.int64) * resolution_ns
+                       + (records_per_frame - 1) * interval_ns)
+            major &= ~_seen_mask(last_record, last_ns, after)
+
+        # Frames completos: todos os registros decodificados de uma vez
+        body = np.ascontiguousarray(
+            frames[major, TOB3_FRAME_HEADER:TOB3_FRAME_HEADER + records_per_frame * layout.record_size]
+        )
+        pieces = [(headers[major], body.view(layout.record_dtype).reshape(-1, records_per_frame))]
+
+        # Frames menores e frames parciais (raros) percorridos individualmente
+        for index in np.flatnonzero(minor | partial):
+            if minor[index]:
+                frame_pieces = _tob3_minor_frames(frames[index], stamps, layout)
+            else:
+                frame_pieces = _tob3_partial_frame(frames[index], int(footers[index]), layout)
+            for header, records in frame_pieces:
+                pieces.append((header.reshape(1, 3), records.reshape(1, -1)))
+
+        all_timestamps = []
+        all_records = []
+        all_numbers = []
+        for header, records in pieces:
+            if records.size == 0:
+                continue
+            per_frame = records.shape[1]
+            offsets = np.arange(per_frame, dtype=np.int64)
+            frame_ns = (header[:, 0].astype(np.int64) * 1_000_000_000
+                        + header[:, 1].astype(np.int64) * resolution_ns)
+            all_timestamps.append((frame_ns[:, None] + offsets[None, :] * interval_ns).ravel())
+            all_numbers.append((header[:, 2].astype(np.int64)[:, None] + offsets[None, :]).ravel())
+            all_records.append(records.ravel())
+
+        if not all_records:
+            continue
+
+        record_numbers = np.concatenate(all_numbers)
+        nanoseconds = np.concatenate(all_timestamps)
+        records = np.concatenate(all_records)
+
+        if after is not None:
+            keep = ~_seen_mask(record_numbers, nanoseconds, after)
+            record_numbers, nanoseconds, records = record_numbers[keep], nanoseconds[keep], records[keep]
+            if len(records) == 0:
+                continue
+
+        order = np.argsort(record_numbers, kind='stable')
+        timestamps = TOB_EPOCH + nanoseconds[order].astype('timedelta64[ns]')
+
+        yield _to_frame(records[order], layout, timestamps, record_numbers[order])
+
+
+def _open_tob(source, after=None):
+    """Lê o cabeçalho e devolve (metadata, layout, gerador de blocos)"""
+    reader = _ByteReader(source)
+    environment = _header_lines(reader, 1)[0]
+    file_format = environment[0] if environment else ''
+
+    if file_format == 'TOB1':
+        fields, units, processing, types = _header_lines(reader, 4)
+        metadata = environment_metadata(environment, environment[7] if len(environment) > 7 else '')
+        layout = _get_layout(metadata, fields, units, processing, types)
+
+        def blocks(rows_per_block):
+            return _tob1_blocks(reader, layout, rows_per_block, after)
+    elif file_format == 'TOB3':
+        table_info, fields, units, processing, types = _header_lines(reader, 5)
+        metadata = environment_metadata(environment, table_info[0] if table_info else '')
+        layout = _get_layout(metadata, fields, units, processing, types)
+
+        def blocks(rows_per_block):
+            return _tob3_blocks(reader, layout, table_info, rows_per_block, after)
+    else:
+        raise ValueError("Arquivo não está no formato TOB1/TOB3")
+
+    return metadata, layout, blocks
+
+
+def read_tob(source, after=None):
+    """
+    Lê um arquivo TOB1/TOB3 completo
+
+    Args:
+        source: caminho local, bytes ou arquivo aberto
+        after: marca (último RECORD, último TIMESTAMP) - registros já ingeridos são pulados
+
+    Returns:
+        (data, metadata, layout) - DataFrame com TIMESTAMP, RECORD e os canais do cabeçalho
+    """
+    metadata, layout, blocks = _open_tob(source, after)
+    frames = list(blocks(np.iinfo(np.int64).max))
+    if not frames:
+        data = _to_frame(np.zeros(0, dtype=layout.record_dtype), layout,
+                         np.zeros(0, dtype='datetime64[ns]'), np.zeros(0, dtype=np.int64))
+    else:
+        data = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return data, metadata, layout
+
+
+def read_tob_chunks(source, budget_bytes, after=None):
+    """
+    Lê um arquivo TOB1/TOB3 em blocos limitados pelo orçamento de memória
+
+    Yields:
+        (data, metadata, layout) para cada bloco
+    """
+    metadata, layout, blocks = _open_tob(source, after)
+    for data in blocks(layout.block_rows(budget_bytes)):
+        yield data, metadata, layout